@@ -0,0 +1,79 @@
+"""Times create_ai_opponent as the player_monsters table grows.
+
+    python benchmarks/bench_ai_opponent.py --scales 10000,100000,1000000,10000000
+
+Latency should stay flat across scales because every pick is an index seek
+on player_monsters(level, id).
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from lib.models import Base, MonsterSpecies, Player, PlayerMonster
+from lib.helpers import create_ai_opponent
+from seed import seed_monster_species_data
+
+INSERT_BATCH = 50000
+
+
+def grow_player_monsters(session, player_id, species_ids, count):
+    """Appends count random PlayerMonster rows in large executemany batches."""
+    while count > 0:
+        batch = min(count, INSERT_BATCH)
+        session.execute(insert(PlayerMonster), [
+            {
+                "player_id": player_id,
+                "species_id": random.choice(species_ids),
+                "level": random.randint(1, 30),
+                "current_hp": 50, "max_hp": 50, "attack": 50, "defense": 50, "speed": 50,
+            }
+            for _ in range(batch)
+        ])
+        session.commit()
+        count -= batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="create_ai_opponent latency benchmark")
+    parser.add_argument('--scales', default="10000,100000,1000000",
+                        help='Comma-separated PlayerMonster row counts')
+    parser.add_argument('--calls', type=int, default=200, help='Opponents generated per scale')
+    args = parser.parse_args()
+    scales = sorted(int(s) for s in args.scales.split(","))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+
+        session.add_all(MonsterSpecies(**data) for data in seed_monster_species_data)
+        player = Player(username="bench")
+        session.add(player)
+        session.commit()
+        player_id = player.id
+        species_ids = [s.id for s in session.query(MonsterSpecies.id)]
+
+        rows = 0
+        for scale in scales:
+            grow_player_monsters(session, player_id, species_ids, scale - rows)
+            rows = scale
+            for difficulty in ("easy", "medium", "hard"):
+                start = time.perf_counter()
+                for _ in range(args.calls):
+                    create_ai_opponent(session, difficulty)
+                    session.expunge_all()
+                elapsed = (time.perf_counter() - start) / args.calls
+                print(f"{scale:>10} rows  {difficulty:<6}  {elapsed * 1000:.3f} ms/opponent")
+
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Measures CLI startup with `python -X importtime` and enforces an import budget.
+
+    python benchmarks/bench_cli_startup.py --runs 5 --budget-ms 60
+
+Light invocations (--help, forwarding to a `serve` socket) must not import
+SQLAlchemy, NumPy or the models at all, and their total import time must
+stay under --budget-ms. Game commands are reported for comparison. Also
+checks that the option choices cli.py hard-codes still match lib/. Exits 1
+on any failure.
+"""
+import sys
+import os
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+# Modules that mean the ORM (or the battle engine) was loaded
+HEAVY_MODULES = ('sqlalchemy', 'numpy', 'lib.models', 'lib.config')
+
+
+def import_profile(argv, cwd):
+    """Runs cli.py once; returns (total import ms, wall ms, imported module names)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT, "cli.py"), *argv],
+        capture_output=True, text=True, cwd=cwd, stdin=subprocess.DEVNULL,
+    )
+    wall = (time.perf_counter() - start) * 1000
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        modules.add(name.strip())
+    return total / 1000, wall, modules
+
+
+def check_choices():
+    """Returns mismatches between cli.py's hard-coded choices and the lib modules."""
+    import cli
+    from lib.encounters import BIOME_TYPE_WEIGHTS
+    from lib.collection import SORT_COLUMNS, DEFAULT_PAGE_SIZE
+    from lib.leaderboard import BOARD_QUERIES
+    from lib.helpers import AI_LEVEL_LIMITS
+    from lib.export import FORMATS, EXPORT_TABLES, DEFAULT_CHUNK_SIZE
+    pairs = [
+        ('BIOMES', cli.BIOMES, tuple(sorted(BIOME_TYPE_WEIGHTS))),
+        ('COLLECTION_SORTS', cli.COLLECTION_SORTS, tuple(sorted(SORT_COLUMNS))),
+        ('LEADERBOARDS', cli.LEADERBOARDS, tuple(sorted(BOARD_QUERIES))),
+        ('DIFFICULTIES', cli.DIFFICULTIES, tuple(sorted(AI_LEVEL_LIMITS))),
+        ('EXPORT_FORMATS', cli.EXPORT_FORMATS, tuple(sorted(FORMATS))),
+        ('EXPORT_TABLES', cli.EXPORT_TABLES, tuple(sorted(EXPORT_TABLES))),
+        ('DEFAULT_PAGE_SIZE', cli.DEFAULT_PAGE_SIZE, DEFAULT_PAGE_SIZE),
+        ('EXPORT_CHUNK_SIZE', cli.EXPORT_CHUNK_SIZE, DEFAULT_CHUNK_SIZE),
+    ]
+    return [f"cli.{name} is {mine!r}, lib has {theirs!r}" for name, mine, theirs in pairs if mine != theirs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup benchmark")
+    parser.add_argument('--runs', type=int, default=5, help='Runs per scenario; the median is reported')
+    parser.add_argument('--budget-ms', type=float, default=60.0, help='Import time allowed for light invocations')
+    args = parser.parse_args()
+
+    failures = check_choices()
+    with tempfile.TemporaryDirectory() as tmp:
+        scenarios = [
+            ("--help", ["--help"], True),
+            ("forward to socket", ["--socket", os.path.join(tmp, "missing.sock"), "status", "ash"], True),
+            ("status (full game)", ["status", "ash"], False),
+        ]
+        for label, argv, light in scenarios:
+            runs = [import_profile(argv, tmp) for _ in range(args.runs)]
+            imports = statistics.median(run[0] for run in runs)
+            wall = statistics.median(run[1] for run in runs)
+            heavy = sorted(m for m in runs[0][2] if m in HEAVY_MODULES)
+            print(f"{label:<20} imports {imports:8.1f} ms  wall {wall:8.1f} ms  "
+                  f"{len(runs[0][2])} modules" + (f"  heavy: {', '.join(heavy)}" if heavy else ""))
+            if light and heavy:
+                failures.append(f"{label} imported {', '.join(heavy)}")
+            if light and imports > args.budget_ms:
+                failures.append(f"{label} spent {imports:.1f} ms importing (budget {args.budget_ms:.1f} ms)")
+
+    for message in failures:
+        print(f"❌ {message}")
+    if failures:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Times snapshot exports and checks that memory stays bounded by the chunk size.
+
+    python benchmarks/bench_export.py --monsters 1000000 --chunk-size 50000
+
+Exports the same database in each format and reports rows/s and the peak
+Python allocation seen while exporting (tracemalloc), then times an
+incremental run after appending a few battles.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine, insert
+from lib.models import Base, MonsterSpecies, Player, PlayerMonster, Battle
+from lib.export import FORMATS, export_snapshot
+from seed import seed_monster_species_data
+
+INSERT_BATCH = 50000
+
+
+def insert_in_batches(connection, model, count, make_row):
+    for start in range(0, count, INSERT_BATCH):
+        connection.execute(insert(model), [make_row() for _ in range(min(INSERT_BATCH, count - start))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot export benchmark")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--monsters', type=int, default=300000)
+    parser.add_argument('--battles', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(MonsterSpecies), seed_monster_species_data)
+            connection.execute(insert(Player), [{"username": f"bench{i}"} for i in range(args.players)])
+            insert_in_batches(connection, PlayerMonster, args.monsters, lambda: {
+                "player_id": random.randint(1, args.players), "species_id": random.randint(1, 19),
+                "nickname": f"mon{random.randint(0, 10 ** 6)}", "level": random.randint(1, 50),
+                "current_hp": 50, "max_hp": 50, "attack": 50, "defense": 50, "speed": 50,
+            })
+            insert_in_batches(connection, Battle, args.battles, lambda: {
+                "player1_id": random.randint(1, args.players), "player2_id": random.randint(1, args.players),
+                "winner_id": random.randint(1, args.players), "battle_log": "x" * 200,
+            })
+
+        for fmt in FORMATS:
+            out_dir = os.path.join(tmp, fmt)
+            tracemalloc.start()
+            start = time.perf_counter()
+            counts = export_snapshot(engine, out_dir, fmt=fmt, chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows = sum(counts.values())
+            size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(out_dir) for f in files)
+            print(f"{fmt:<8} {rows} rows in {elapsed:6.2f} s ({rows / elapsed:9.0f} rows/s)  "
+                  f"peak {peak / 2 ** 20:6.1f} MiB  on disk {size / 2 ** 20:6.1f} MiB")
+
+        with engine.begin() as connection:
+            insert_in_batches(connection, Battle, 1000, lambda: {"player1_id": 1, "player2_id": 2, "winner_id": 1})
+        start = time.perf_counter()
+        counts = export_snapshot(engine, os.path.join(tmp, 'parquet'), fmt='parquet', chunk_size=args.chunk_size,
+                                 tables=['battles', 'player_achievements'])
+        print(f"incremental: {counts['battles']} new battles in {time.perf_counter() - start:.3f} s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Times every CLI hot path against a synthetic database and reports percentiles.
+
+    python benchmarks/bench_hot_paths.py --players 1000 --monsters-per-player 50 --output results.json
+    python benchmarks/bench_hot_paths.py --baseline results.json --tolerance 0.25
+
+CLI commands run in-process through lib.server.run_command with scripted
+answers to their prompts; helpers are called directly. With --baseline,
+any operation whose p50 or p90 is more than --tolerance slower than the
+baseline's is reported and the script exits with status 1.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+import lib.config
+from lib.config import make_engine
+from lib.models import Base, Player, PlayerMonster, Trade, Battle
+from lib.helpers import accept_trade, create_ai_opponent, check_achievements, AI_LEVEL_LIMITS
+from lib.importer import import_species, import_player_monsters
+from lib.server import run_command
+from seed import seed_monster_species_data
+from cli import build_parser
+
+PERCENTILES = (50, 90, 99)
+COMPARED = ('p50_ms', 'p90_ms')
+
+
+# ---- Synthetic Database ----
+def build_database(url, players, per_player, trades, battles, seed=0):
+    """Fills a fresh database at url; returns the engine and the usernames."""
+    rng = random.Random(seed)
+    engine = make_engine(url, profile='bulk-load')
+    Base.metadata.create_all(engine)
+    session = Session(bind=engine)
+
+    import_species(session, seed_monster_species_data)
+    usernames = [f"trainer{i}" for i in range(players)]
+    species = [data['name'] for data in seed_monster_species_data]
+    import_player_monsters(session, (
+        {'username': username, 'species': rng.choice(species), 'level': rng.randint(1, 30),
+         'nickname': f"{username}_{k}"}
+        for username in usernames for k in range(per_player)
+    ))
+
+    player_ids = dict(session.execute(select(Player.username, Player.id)).all())
+    owned = {}
+    for monster_id, player_id in session.execute(select(PlayerMonster.id, PlayerMonster.player_id)):
+        owned.setdefault(player_id, []).append(monster_id)
+    ids = [player_ids[username] for username in usernames]
+
+    # Neighbouring players swap their k-th monsters, so no monster is in two trades
+    trade_rows = []
+    for k in range(per_player):
+        for i in range(0, len(ids) - 1, 2):
+            if len(trade_rows) == trades:
+                break
+            a, b = ids[i], ids[i + 1]
+            trade_rows.append({'from_player_id': a, 'to_player_id': b, 'status': 'pending',
+                               'offered_monster_id': owned[a][k], 'requested_monster_id': owned[b][k]})
+    if trade_rows:
+        session.execute(insert(Trade), trade_rows)
+
+    battle_rows = []
+    for _ in range(battles):
+        a, b = rng.sample(ids, 2)
+        battle_rows.append({'player1_id': a, 'player2_id': b, 'winner_id': rng.choice((a, b)),
+                            'battle_log': "synthetic"})
+    if battle_rows:
+        session.execute(insert(Battle), battle_rows)
+    session.commit()
+    session.close()
+    return engine, usernames
+
+
+# ---- Operations ----
+def cli_operation(parser, argv, answers=()):
+    def run(username):
+        scripted = list(answers)
+        output, ok = run_command(parser, [argv[0], username, *argv[1:]], lambda prompt, out: scripted.pop(0))
+        if not ok:
+            raise RuntimeError(f"{argv[0]} failed: {output.strip()}")
+    return run
+
+
+def operations(engine, rng):
+    """Returns {name: callable(username)}; every call is one timed sample."""
+    parser = build_parser()
+    with Session(bind=engine) as session:
+        pending = iter(session.scalars(
+            select(Trade.id).where(Trade.status == "pending").order_by(Trade.id)
+        ).all())
+
+    def with_session(fn):
+        def run(username):
+            with lib.config.session_scope() as session:
+                player_id = session.scalar(select(Player.id).where(Player.username == username))
+                fn(session, player_id)
+        return run
+
+    def trade(session, player_id):
+        trade_id = next(pending, None)
+        if trade_id is None:
+            raise RuntimeError("Out of pending trades; raise --trades")
+        accept_trade(session, trade_id)
+
+    return {
+        'explore': cli_operation(parser, ['explore'], ["yes", "Benchmon"]),
+        'view_collection': cli_operation(parser, ['collection']),
+        'level_up': cli_operation(parser, ['level-up'], ["1"]),
+        'handle_status': cli_operation(parser, ['status']),
+        'accept_trade': with_session(trade),
+        'create_ai_opponent': with_session(
+            lambda session, player_id: create_ai_opponent(session, rng.choice(sorted(AI_LEVEL_LIMITS)))),
+        'check_achievements': with_session(check_achievements),
+    }
+
+
+def time_operation(run, usernames, iterations, warmup, rng):
+    for _ in range(warmup):
+        run(rng.choice(usernames))
+    samples = []
+    for _ in range(iterations):
+        username = rng.choice(usernames)
+        start = time.perf_counter()
+        run(username)
+        samples.append((time.perf_counter() - start) * 1000)
+    result = {f"p{p}_ms": round(float(np.percentile(samples, p)), 4) for p in PERCENTILES}
+    result['mean_ms'] = round(float(np.mean(samples)), 4)
+    result['n'] = iterations
+    return result
+
+
+# ---- Regression Check ----
+def find_regressions(results, baseline, tolerance):
+    """Returns messages for operations slower than baseline by more than tolerance."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        for key in COMPARED:
+            limit = previous[key] * (1 + tolerance)
+            if current[key] > limit:
+                regressions.append(f"{name} {key}: {current[key]:.3f} ms > {limit:.3f} ms "
+                                   f"(baseline {previous[key]:.3f} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI hot path benchmarks")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--monsters-per-player', type=int, default=50)
+    parser.add_argument('--trades', type=int, default=None, help='Pending trades (default: enough for every sample)')
+    parser.add_argument('--battles', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=200, help='Timed samples per operation')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed calls per operation')
+    parser.add_argument('--only', help='Comma-separated operations to run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown, 0.25 = 25%%')
+    args = parser.parse_args()
+    trades = args.trades if args.trades is not None else args.iterations + args.warmup
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        engine, usernames = build_database(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.players, args.monsters_per_player,
+            trades, args.battles, args.seed,
+        )
+        build_seconds = time.perf_counter() - start
+        engine.dispose()
+        # Time against the profile the CLI runs with
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        lib.config.Session.configure(bind=engine)
+
+        ops = operations(engine, rng)
+        selected = args.only.split(",") if args.only else list(ops)
+        unknown = set(selected) - set(ops)
+        if unknown:
+            parser.error(f"unknown operations: {', '.join(sorted(unknown))} (choose from {', '.join(ops)})")
+        results = {}
+        for name in selected:
+            results[name] = time_operation(ops[name], usernames, args.iterations, args.warmup, rng)
+            print(f"{name:<20} p50 {results[name]['p50_ms']:>9.3f} ms  p99 {results[name]['p99_ms']:>9.3f} ms",
+                  file=sys.stderr)
+        engine.dispose()
+
+    report = {
+        'meta': {
+            'players': args.players, 'monsters_per_player': args.monsters_per_player,
+            'trades': trades, 'battles': args.battles, 'iterations': args.iterations,
+            'seed': args.seed, 'build_seconds': round(build_seconds, 3),
+            'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"❌ Regression: {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
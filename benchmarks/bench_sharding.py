@@ -0,0 +1,71 @@
+"""Measures catch throughput with concurrent writers against 1..N shard files.
+
+    python benchmarks/bench_sharding.py --shards 1 2 4 --writers 4 --catches 2000
+
+Each writer process inserts monsters for its own player, one commit per
+catch, as `explore` does. With one shard every commit queues on the same
+database lock; with more shards, writers whose players live on different
+shards commit in parallel.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from lib.models import PlayerMonster
+from lib.sharding import ShardSet, shard_urls
+from lib.importer import import_species
+from seed import seed_monster_species_data
+
+
+def catch_loop(urls, profile, player_id, catches):
+    shards = ShardSet(urls, profile=profile, begin_immediate=True)
+    with shards.session_for_player(player_id) as session:
+        for i in range(catches):
+            session.add(PlayerMonster(
+                player_id=player_id, species_id=i % 19 + 1, nickname=f"bench{i}", level=1,
+                current_hp=50, max_hp=50, attack=50, defense=50, speed=50,
+            ))
+            session.commit()
+    shards.dispose()
+    return catches
+
+
+def run(tmp, shard_count, writers, catches, profile):
+    urls = shard_urls(f"sqlite:///{os.path.join(tmp, f'bench{shard_count}.db')}", shard_count)
+    shards = ShardSet(urls, profile=profile)
+    shards.create_all()
+    with shards.session(0) as session:
+        import_species(session, seed_monster_species_data)
+        session.commit()
+    shards.replicate_reference_data()
+    player_ids = [shards.create_player(f"writer{i}")[0] for i in range(writers)]
+    shards.dispose()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=writers) as pool:
+        total = sum(pool.map(catch_loop, [urls] * writers, [profile] * writers, player_ids, [catches] * writers))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded write throughput benchmark")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--catches', type=int, default=1000, help='Commits per writer')
+    parser.add_argument('--profile', default='durable', help='SQLite profile from lib.config')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for count in args.shards:
+            rate = run(tmp, count, args.writers, args.catches, args.profile)
+            baseline = baseline or rate
+            print(f"{count} shard(s): {rate:9.0f} catches/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compares catch/read throughput across the SQLite tuning profiles.
+
+    python benchmarks/bench_sqlite_profiles.py --writes 2000 --reads 20000
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import random
+import tempfile
+import time
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from lib.config import make_engine, SQLITE_PROFILES
+from lib.models import Base, MonsterSpecies, Player, PlayerMonster
+from seed import seed_monster_species_data
+
+
+def bench_profile(path, profile, writes, reads):
+    engine = make_engine(f"sqlite:///{path}", profile=profile)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(MonsterSpecies(**data) for data in seed_monster_species_data)
+        session.add(Player(username="bench"))
+        session.commit()
+
+    # One commit per catch, like explore
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        for i in range(writes):
+            connection.execute(insert(PlayerMonster), {
+                "player_id": 1, "species_id": random.randint(1, 19), "level": 1, "nickname": f"m{i}",
+                "current_hp": 50, "max_hp": 50, "attack": 50, "defense": 50, "speed": 50,
+            })
+            connection.commit()
+    write_rate = writes / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        for _ in range(reads):
+            connection.execute(
+                select(PlayerMonster.level).where(PlayerMonster.id == random.randint(1, writes))
+            ).scalar()
+    read_rate = reads / (time.perf_counter() - start)
+
+    engine.dispose()
+    return write_rate, read_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite profile throughput benchmark")
+    parser.add_argument('--writes', type=int, default=2000, help='Single-row commits per profile')
+    parser.add_argument('--reads', type=int, default=20000, help='Point lookups per profile')
+    args = parser.parse_args()
+
+    for profile in SQLITE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_rate, read_rate = bench_profile(os.path.join(tmp, 'bench.db'), profile, args.writes, args.reads)
+        print(f"{profile:<10} {write_rate:10.0f} commits/s {read_rate:10.0f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
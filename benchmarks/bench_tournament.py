@@ -0,0 +1,77 @@
+"""Times run_tournament across worker counts.
+
+    python benchmarks/bench_tournament.py --teams 65536 --workers 1,2,4,8
+
+Matches per second should grow close to linearly with workers up to the
+core count; the champion must be the same on every line, since results
+only depend on the teams and the seed.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, delete
+from sqlalchemy.orm import sessionmaker
+from lib.models import Base, MonsterSpecies, Player, PlayerMonster, Battle
+from lib.tournament import run_tournament
+from seed import seed_monster_species_data
+
+INSERT_BATCH = 50000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournament throughput benchmark")
+    parser.add_argument('--teams', type=int, default=16384)
+    parser.add_argument('--team-size', type=int, default=3)
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}", help='Comma-separated worker counts')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    worker_counts = sorted({int(w) for w in args.workers.split(",")})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+
+        session.add_all(MonsterSpecies(**data) for data in seed_monster_species_data)
+        session.add_all(Player(username=f"bench{i}") for i in range(100))
+        session.commit()
+        species_ids = [s.id for s in session.query(MonsterSpecies.id)]
+
+        monsters = args.teams * args.team_size
+        for start in range(0, monsters, INSERT_BATCH):
+            session.execute(insert(PlayerMonster), [
+                {
+                    "player_id": random.randint(1, 100), "species_id": random.choice(species_ids),
+                    "level": random.randint(1, 30),
+                    "current_hp": 50, "max_hp": 50, "attack": 50, "defense": 50, "speed": 50,
+                }
+                for _ in range(min(INSERT_BATCH, monsters - start))
+            ])
+        session.commit()
+        ids = list(range(1, monsters + 1))
+        teams = [ids[i:i + args.team_size] for i in range(0, monsters, args.team_size)]
+
+        baseline = None
+        for workers in worker_counts:
+            session.execute(delete(Battle))
+            session.commit()
+            start = time.perf_counter()
+            result = run_tournament(session, teams, seed=args.seed, workers=workers)
+            elapsed = time.perf_counter() - start
+            matches = len(teams) - 1
+            rate = matches / elapsed
+            baseline = baseline or rate
+            print(f"{workers:>3} workers  {rate:>10.0f} matches/s  "
+                  f"x{rate / baseline:.2f}  {result['battles']} battles  champion {result['champion']}")
+
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
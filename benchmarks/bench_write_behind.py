@@ -0,0 +1,134 @@
+"""Compares one commit per catch with write-behind group commits, then checks crash recovery.
+
+    python benchmarks/bench_write_behind.py --catches 5000 --profile durable
+
+The direct run commits every catch and level-up on its own, as `explore`
+and `level-up` do by default. The write-behind run queues the same
+operations and lets lib.write_behind commit them in batches. The recovery
+check kills a child process mid-run and makes sure a new queue replays
+every journaled operation exactly once.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import signal
+import subprocess
+import tempfile
+import time
+from sqlalchemy import insert, func, select
+from sqlalchemy.orm import Session
+from lib.config import make_engine
+from lib.models import Base, MonsterSpecies, Player, PlayerMonster
+from lib.progression import grant_xp, XP_REWARDS
+from lib.stats import stats_for
+from lib.write_behind import WriteBehindQueue
+from seed import seed_monster_species_data
+
+CHILD = """
+import sys, os
+sys.path.insert(0, {root!r})
+from lib.config import make_engine
+from lib.write_behind import WriteBehindQueue
+queue = WriteBehindQueue(make_engine({url!r}), max_batch=50, max_delay=10)
+for i in range({catches}):
+    queue.catch(1, i % 19 + 1, f"crash{{i}}")
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def make_db(path, profile):
+    engine = make_engine(f"sqlite:///{path}", profile=profile)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(MonsterSpecies), seed_monster_species_data)
+        connection.execute(insert(Player), [{"username": "bench"}])
+    return engine
+
+
+def direct(engine, catches):
+    with Session(engine) as session:
+        for i in range(catches):
+            stats = stats_for(session, i % 19 + 1, 1)
+            monster = PlayerMonster(player_id=1, species_id=i % 19 + 1, nickname=f"bench{i}", level=1,
+                                    current_hp=stats.hp, max_hp=stats.hp, attack=stats.attack,
+                                    defense=stats.defense, speed=stats.speed)
+            session.add(monster)
+            session.flush()
+            grant_xp(session, [(monster.id, 1, XP_REWARDS['catch'], 'catch')])
+            session.commit()
+            monster.level += 1
+            session.commit()
+
+
+def write_behind(engine, catches, max_batch, max_delay):
+    queue = WriteBehindQueue(engine, max_batch=max_batch, max_delay=max_delay)
+    for i in range(catches):
+        queue.catch(1, i % 19 + 1, f"bench{i}")
+        # Level up monsters already committed, as a player would
+        queue.level_up(i // 2 + 1)
+    queue.close()
+
+
+def count_monsters(engine):
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count(PlayerMonster.id)))
+
+
+def check_recovery(tmp, catches):
+    path = os.path.join(tmp, "crash.db")
+    make_db(path, "balanced").dispose()
+    url = f"sqlite:///{path}"
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    child = subprocess.Popen([sys.executable, "-c", CHILD.format(root=root, url=url, catches=catches)],
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    child.stdout.readline()
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+
+    engine = make_engine(url)
+    before = count_monsters(engine)
+    queue = WriteBehindQueue(engine)
+    queue.close()
+    after = count_monsters(engine)
+    WriteBehindQueue(engine).close()
+    again = count_monsters(engine)
+    engine.dispose()
+    ok = after == catches and again == after
+    print(f"recovery: {before} committed before the crash, {queue.recovered} replayed, "
+          f"{after}/{catches} after ({'ok' if ok else 'MISMATCH'})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write-behind queue benchmark")
+    parser.add_argument('--catches', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--delay-ms', type=float, default=50)
+    parser.add_argument('--profile', default='durable', help='SQLite profile from lib.config')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_db(os.path.join(tmp, "direct.db"), args.profile)
+        start = time.perf_counter()
+        direct(engine, args.catches)
+        base = args.catches / (time.perf_counter() - start)
+        engine.dispose()
+        print(f"direct:       {base:9.0f} catches/s")
+
+        engine = make_db(os.path.join(tmp, "queued.db"), args.profile)
+        start = time.perf_counter()
+        write_behind(engine, args.catches, args.batch, args.delay_ms / 1000)
+        rate = args.catches / (time.perf_counter() - start)
+        assert count_monsters(engine) == args.catches
+        engine.dispose()
+        print(f"write-behind: {rate:9.0f} catches/s  ({rate / base:.1f}x)")
+
+        if not check_recovery(tmp, 500):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Drives N scripted players concurrently through the asyncio front-end.
+
+    python benchmarks/load_async_players.py --players 1000 --rounds 5
+
+Every player registers, then repeats explore+catch, level-up and status;
+adjacent players also trade. Prints p50/p99 latency per command.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import defaultdict
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from lib.models import Base, MonsterSpecies
+from lib import async_game
+from seed import seed_monster_species_data
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def timed(latencies, command, coroutine):
+    start = time.perf_counter()
+    result = await coroutine
+    latencies[command].append(time.perf_counter() - start)
+    return result
+
+
+async def run_player(session_factory, latencies, index, rounds, caught):
+    username = f"bot_{index}"
+    async with session_factory() as session:
+        await timed(latencies, 'start', async_game.start_game(session, async_game.ScriptedIO(), username))
+    for round_number in range(rounds):
+        async with session_factory() as session:
+            io = async_game.ScriptedIO(["yes", f"{username}_{round_number}"])
+            monster = await timed(latencies, 'explore', async_game.explore(session, io, username))
+            if monster is not None:
+                caught[index] = monster.id
+        async with session_factory() as session:
+            await timed(latencies, 'level-up', async_game.level_up(session, async_game.ScriptedIO(["1"]), username))
+        async with session_factory() as session:
+            await timed(latencies, 'status', async_game.status(session, async_game.ScriptedIO(), username))
+
+
+async def run_trades(session_factory, latencies, players, caught):
+    async def trade_pair(a, b):
+        async with session_factory() as session:
+            await timed(latencies, 'trade', async_game.trade(
+                session, async_game.ScriptedIO(["yes"]), f"bot_{a}", f"bot_{b}", caught[a], caught[b]
+            ))
+    await asyncio.gather(*(trade_pair(a, a + 1) for a in range(0, players - 1, 2) if a in caught and a + 1 in caught))
+
+
+async def run(db_url, players, rounds):
+    async_engine = async_game.make_async_engine(db_url)
+    session_factory = async_game.make_async_session_factory(async_engine)
+    latencies = defaultdict(list)
+    caught = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_player(session_factory, latencies, i, rounds, caught) for i in range(players)))
+    await run_trades(session_factory, latencies, players, caught)
+    elapsed = time.perf_counter() - start
+    await async_engine.dispose()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent scripted player load generator")
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'load.db')
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(MonsterSpecies(**data) for data in seed_monster_species_data)
+            session.commit()
+        engine.dispose()
+
+        latencies, elapsed = asyncio.run(run(f"sqlite+aiosqlite:///{path}", args.players, args.rounds))
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{args.players} players, {total} commands in {elapsed:.2f}s ({total / elapsed:.0f} cmd/s)")
+    for command, samples in latencies.items():
+        print(f"{command:<9} n={len(samples):<6} p50={percentile(samples, 50) * 1000:8.2f} ms"
+              f"  p99={percentile(samples, 99) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
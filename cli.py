@@ -3,177 +3,173 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
 
 import argparse
-import random
-import re
-from sqlalchemy.orm import joinedload
-from lib.config import Session
-from lib.models import Player, MonsterSpecies, PlayerMonster, Battle, Trade, Achievement
-from lib.helpers import get_type_effectiveness_multiplier, calculate_current_stats
-
-def start_game(args):
-    session = Session()
-    username = input("Enter your desired username: ").strip()
-
-    if not re.match("^[A-Za-z0-9_]{3,20}$", username):
-        print("Username must be 3-20 characters, letters/numbers/underscores only.")
-        session.close()
-        return
-
-    existing_player = session.query(Player).filter_by(username=username).first()
-    if existing_player:
-        print(f"Welcome back, {username}!")
-    else:
-        new_player = Player(username=username)
-        session.add(new_player)
-        session.commit()
-        print(f"New player '{username}' created successfully!")
-
-    session.close()
-
-
-def explore(args):
-    session = Session()
-    player = get_player_by_username(session, args.username)
-    if not player:
-        print(f"Player '{args.username}' not found.")
-        session.close()
-        return
-
-    species = session.query(MonsterSpecies).order_by(func.random()).first()
-    print(f"\n🌿 A wild {species.name} appeared!")
-
-    stats = calculate_current_stats(species.base_hp, species.base_attack, species.base_defense, 1)
-    print(f"HP: {stats['hp']}, ATK: {stats['attack']}, DEF: {stats['defense']}")
-
-    choice = input("Do you want to catch it? (yes/no): ").strip().lower()
-    if choice == 'yes':
-        nickname = input("Give it a nickname: ").strip()
-        if not nickname:
-            print("Nickname cannot be empty.")
-        else:
-            new_monster = PlayerMonster(
-                player_id=player.id,
-                species_id=species.id,
-                level=1,
-                nickname=nickname
-            )
-            session.add(new_monster)
-            session.commit()
-            print(f"🎉 {nickname} was caught successfully!")
-    else:
-        print("You let it go.")
-
-    session.close()
-
-
-def view_collection(args):
-    session = Session()
-    player = get_player_by_username(session, args.username)
-    if not player:
-        print(f"Player '{args.username}' not found.")
-        session.close()
-        return
-
-    player_monsters = session.query(PlayerMonster).options(joinedload(PlayerMonster.species)).filter_by(player_id=player.id).all()
-    if not player_monsters:
-        print("You have no monsters. Try 'explore' to catch one.")
-    else:
-        print(f"\n{player.username}'s Monster Collection:")
-        for i, pm in enumerate(player_monsters, 1):
-            stats = calculate_current_stats(pm.species.base_hp, pm.species.base_attack, pm.species.base_defense, pm.level)
-            print(f"{i}. {pm.nickname} ({pm.species.name}, Lv.{pm.level}) - HP: {stats['hp']} ATK: {stats['attack']} DEF: {stats['defense']}")
-
-    session.close()
-
-
-def level_up(args):
-    session = Session()
-    player = get_player_by_username(session, args.username)
-    if not player:
-        print(f"Player '{args.username}' not found.")
-        session.close()
-        return
-
-    player_monsters = session.query(PlayerMonster).options(joinedload(PlayerMonster.species)).filter_by(player_id=player.id).all()
-    if not player_monsters:
-        print("You have no monsters to level up.")
-        session.close()
-        return
-
-    print("\nSelect a monster to level up:")
-    for i, pm in enumerate(player_monsters, 1):
-        print(f"{i}. {pm.nickname} (Lv.{pm.level})")
-
-    while True:
-        try:
-            index = int(input("Enter monster number: ")) - 1
-            if 0 <= index < len(player_monsters):
-                break
-            print("Invalid number. Try again.")
-        except ValueError:
-            print("Please enter a valid number.")
-
-    monster = player_monsters[index]
-    old_level = monster.level
-    old_stats = calculate_current_stats(monster.species.base_hp, monster.species.base_attack, monster.species.base_defense, old_level)
-    monster.level += 1
-    session.commit()
-
-    new_stats = calculate_current_stats(monster.species.base_hp, monster.species.base_attack, monster.species.base_defense, monster.level)
-    print(f"\n🎉 {monster.nickname} leveled up from Lv.{old_level} ➜ Lv.{monster.level}!")
-    print(f"✨ HP: +{new_stats['hp'] - old_stats['hp']}, ATK: +{new_stats['attack'] - old_stats['attack']}, DEF: +{new_stats['defense'] - old_stats['defense']}")
-
-    session.close()
-
-
-def handle_status(args):
-    session = Session()
-    player = get_player_by_username(session, args.username)
-    if not player:
-        print(f"Player '{args.username}' not found.")
-        session.close()
-        return
-
-    print(f"\n👤 Player: {player.username} | Lv.{player.level}")
-    monsters = session.query(PlayerMonster).filter_by(player_id=player.id).all()
-    print(f"🧟 Monsters Owned: {len(monsters)}")
-    if monsters:
-        highest = max(monsters, key=lambda m: m.level)
-        print(f"⚔️ Highest Monster: {highest.nickname} (Lv.{highest.level})")
-
-    session.close()
-
-
-def get_player_by_username(session, username):
-    return session.query(Player).filter_by(username=username).first()
-
+import importlib
+
+# Option choices, kept here so building the parser imports nothing heavy;
+# benchmarks/bench_cli_startup.py checks they match the lib modules
+BIOMES = ('forest', 'lake', 'mountain', 'plains', 'volcano')
+COLLECTION_SORTS = ('id', 'level', 'nickname')
+LEADERBOARDS = ('collection', 'level', 'wins', 'xp')
+DIFFICULTIES = ('easy', 'hard', 'medium')
+DEFAULT_PAGE_SIZE = 20
+EXPORT_FORMATS = ('arrow', 'npz', 'parquet')
+EXPORT_TABLES = ('battles', 'player_achievements', 'player_monsters', 'players', 'trades')
+EXPORT_CHUNK_SIZE = 50000
+
+
+def command(name):
+    """Returns a handler that imports lib.commands (and the ORM) on first call."""
+    def run(args):
+        return getattr(importlib.import_module('lib.commands'), name)(args)
+    run.__name__ = name
+    return run
+
+
+def run_profiled(args):
+    import json
+    from lib.instrumentation import instrument, profile_command, format_report, format_cprofile
+    # Every engine, so shard and write-behind queries are counted too
+    instrument()
+    with profile_command(args.command, use_cprofile=bool(args.cprofile)) as stats:
+        args.func(args)
 
-def main():
+    report = stats.report()
+    print(format_report(report), file=sys.stderr)
+    if args.profile_output:
+        with open(args.profile_output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Profile written to {args.profile_output}", file=sys.stderr)
+    if stats.profiler:
+        stats.profiler.dump_stats(args.cprofile)
+        print(format_cprofile(stats.profiler), file=sys.stderr)
+        print(f"📝 cProfile stats written to {args.cprofile}", file=sys.stderr)
+
+
+def trade_ref(text):
+    """TRADE_ID, or SHARD:TRADE_ID on a sharded database; returns (shard or None, trade id)."""
+    shard, _, trade_id = text.rpartition(':')
+    try:
+        return (int(shard) if shard else None), int(trade_id)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid trade id {text!r}")
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def strip_socket_option(argv):
+    """Removes --socket PATH / --socket=PATH so the rest can be forwarded."""
+    forwarded = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--socket':
+            skip = True
+        elif not arg.startswith('--socket='):
+            forwarded.append(arg)
+    return forwarded
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Monster Collector CLI Game")
+    parser.add_argument('--socket', help='Unix socket of a running `serve` process to send the command to')
+    parser.add_argument('--profile', action='store_true', help='Print query counts, DB time and slow statements')
+    parser.add_argument('--profile-output', metavar='FILE', help='Write the profile as JSON to FILE')
+    parser.add_argument('--cprofile', metavar='FILE', help='Also run cProfile and dump its stats to FILE')
     subparsers = parser.add_subparsers(dest="command")
 
     start_parser = subparsers.add_parser('start', help='Start a new game')
-    start_parser.set_defaults(func=start_game)
+    start_parser.set_defaults(func=command('start_game'))
 
     explore_parser = subparsers.add_parser('explore', help='Explore and catch monsters')
     explore_parser.add_argument('username', type=str)
-    explore_parser.set_defaults(func=explore)
+    explore_parser.add_argument('--biome', choices=BIOMES, help='Favor monster types native to this biome')
+    explore_parser.set_defaults(func=command('explore'))
 
     collection_parser = subparsers.add_parser('collection', help='View your monster collection')
     collection_parser.add_argument('username', type=str)
-    collection_parser.set_defaults(func=view_collection)
+    collection_parser.add_argument('--page', type=positive_int, default=0, help=f'Show one page (default size {DEFAULT_PAGE_SIZE})')
+    collection_parser.add_argument('--limit', type=positive_int, default=0, help='Monsters per page')
+    collection_parser.add_argument('--after', metavar='CURSOR', help='Show the page after this cursor (printed with each page)')
+    collection_parser.add_argument('--filter', action='append', metavar='KEY=VALUE',
+                                   help='type=Fire, rarity=Rare, level=5-10 or name=PREFIX (repeatable)')
+    collection_parser.add_argument('--sort', choices=COLLECTION_SORTS, default='id')
+    collection_parser.add_argument('--desc', action='store_true', help='Sort in descending order')
+    collection_parser.set_defaults(func=command('view_collection'))
 
     level_up_parser = subparsers.add_parser('level-up', help='Level up your monsters')
     level_up_parser.add_argument('username', type=str)
-    level_up_parser.set_defaults(func=level_up)
+    level_up_parser.set_defaults(func=command('level_up'))
+
+    trades_parser = subparsers.add_parser('trades', help='List trade offers to you, or accept some')
+    trades_parser.add_argument('username', type=str)
+    trades_parser.add_argument('--accept', type=trade_ref, action='append', metavar='TRADE_ID',
+                               help='Accept this offer (repeatable), as listed; accepted trades are then settled together')
+    trades_parser.set_defaults(func=command('trades'))
 
     status_parser = subparsers.add_parser('status', help='View player status')
     status_parser.add_argument('username', type=str)
-    status_parser.set_defaults(func=handle_status)
+    status_parser.set_defaults(func=command('handle_status'))
+
+    leaderboard_parser = subparsers.add_parser('leaderboard', help='Show top players')
+    leaderboard_parser.add_argument('--board', choices=LEADERBOARDS, default='level')
+    leaderboard_parser.add_argument('--limit', type=int, default=10, help='Entries to show')
+    leaderboard_parser.add_argument('--around', metavar='USERNAME', help='Show the entries around this player')
+    leaderboard_parser.set_defaults(func=command('show_leaderboard'))
+
+    tournament_parser = subparsers.add_parser('tournament', help='Run an AI-vs-AI elimination bracket')
+    tournament_parser.add_argument('--teams', type=int, default=16, help='Number of AI teams to draft')
+    tournament_parser.add_argument('--team-size', type=int, default=3)
+    tournament_parser.add_argument('--difficulty', choices=DIFFICULTIES, default='medium')
+    tournament_parser.add_argument('--seed', type=int, default=0, help='Same teams and seed give the same bracket')
+    tournament_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    tournament_parser.set_defaults(func=command('tournament'))
+
+    progress_parser = subparsers.add_parser('progress', help='Apply pending XP grants and level up monsters in bulk')
+    progress_parser.add_argument('--max-grants', type=int, default=None, help='Apply at most this many grants')
+    progress_parser.set_defaults(func=command('progress'))
+
+    export_parser = subparsers.add_parser('export', help='Write columnar snapshots of the game tables for analytics')
+    export_parser.add_argument('out_dir', type=str, help='Snapshot directory; later runs add to it incrementally')
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='parquet')
+    export_parser.add_argument('--table', action='append', choices=EXPORT_TABLES, help='Export only this table (repeatable)')
+    export_parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows read and written at a time')
+    export_parser.add_argument('--full', action='store_true', help='Ignore the watermarks and re-export everything')
+    export_parser.add_argument('--replica', metavar='PATH', help='Refresh a copy of the database at PATH and export from it')
+    export_parser.set_defaults(func=command('export'))
+
+    play_parser = subparsers.add_parser('play', help='Play interactively on the asyncio front-end')
+    play_parser.add_argument('username', type=str)
+    play_parser.set_defaults(func=command('play_async'))
+
+    serve_parser = subparsers.add_parser('serve', help='Keep the game loaded and serve commands')
+    serve_parser.add_argument('--socket', dest='serve_socket', help='Unix socket path to listen on')
+    serve_parser.add_argument('--stdio', action='store_true', help='Read JSON-lines requests from stdin')
+    serve_parser.set_defaults(func=command('serve'))
+
+    return parser
+
 
+def main():
+    parser = build_parser()
     args = parser.parse_args()
 
-    if hasattr(args, 'func'):
+    if args.socket and args.command not in (None, 'serve'):
+        from lib.client import send_command
+        ok = send_command(args.socket, strip_socket_option(sys.argv[1:]))
+        sys.exit(0 if ok else 1)
+    elif hasattr(args, 'func') and (args.profile or args.profile_output or args.cprofile):
+        run_profiled(args)
+    elif hasattr(args, 'func'):
         args.func(args)
     else:
         parser.print_help()
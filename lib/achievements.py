@@ -0,0 +1,234 @@
+# achievements.py
+
+import threading
+from collections import namedtuple
+from sqlalchemy import event, func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from lib.models import Achievement, PlayerAchievement, PlayerMonster, Trade, Battle
+
+# A rule unlocks `name` once the player's `counter` reaches `threshold`
+AchievementRule = namedtuple('AchievementRule', ['name', 'description', 'counter', 'threshold'])
+
+ACHIEVEMENT_RULES = [
+    AchievementRule("Collector", "Own 5 monsters", 'monster_count', 5),
+    AchievementRule("Trainer", "Raise a monster to Lv.10", 'highest_level', 10),
+    AchievementRule("Dealer", "Complete a trade", 'trades_completed', 1),
+    AchievementRule("Champion", "Win 10 battles", 'battles_won', 10),
+]
+
+# Which counters each game event moves
+EVENT_COUNTERS = {
+    'catch': ('monster_count',),
+    'level_up': ('highest_level',),
+    'trade': ('trades_completed',),
+    'battle_win': ('battles_won',),
+}
+
+RULES_BY_COUNTER = {}
+for _rule in ACHIEVEMENT_RULES:
+    RULES_BY_COUNTER.setdefault(_rule.counter, []).append(_rule)
+
+# Process-wide caches of committed state; sessions only touch them from after_commit
+_achievement_ids = {}
+_player_counters = {}
+_player_unlocked = {}
+_event_listeners = []
+_cache_lock = threading.Lock()
+
+
+# ---- Per-session State ----
+def _session_state(session):
+    """Working copies, queued unlocks and recorded events of session's current transaction."""
+    state = session.info.get('achievements')
+    if state is None:
+        state = session.info['achievements'] = {
+            'players': {}, 'unlocks': [], 'events': [], 'achievement_ids': {},
+        }
+    return state
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish(session):
+    """Folds a committed transaction's counters and unlocks into the process caches."""
+    state = session.info.pop('achievements', None)
+    if state is None:
+        return
+    with _cache_lock:
+        _achievement_ids.update(state['achievement_ids'])
+        for player_id, player in state['players'].items():
+            cached = _player_counters.get(player_id)
+            if player['reseeded'] or cached is None:
+                _player_counters[player_id] = player['counters']
+                _player_unlocked[player_id] = player['unlocked']
+            else:
+                # Apply only this transaction's changes; others may have committed meanwhile
+                for counter, value in player['counters'].items():
+                    if counter == 'highest_level':
+                        cached[counter] = max(cached[counter], value)
+                    else:
+                        cached[counter] += value - player['base'][counter]
+                _player_unlocked[player_id].update(player['unlocked'])
+    for player_id, event_name, level in state['events']:
+        for listener in _event_listeners:
+            listener(player_id, event_name, _player_counters[player_id], level)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard(session, transaction):
+    # Rolled back or closed without committing (after_commit already took a committed state)
+    if transaction.parent is None:
+        session.info.pop('achievements', None)
+
+
+# ---- Caches ----
+def get_achievement_ids(session):
+    """Returns {name: id} for every rule, creating missing Achievement rows once."""
+    state = _session_state(session)
+    ids = {**_achievement_ids, **state['achievement_ids']}
+    if any(rule.name not in ids for rule in ACHIEVEMENT_RULES):
+        state['achievement_ids'].update(dict(session.query(Achievement.name, Achievement.id).all()))
+        missing = [rule for rule in ACHIEVEMENT_RULES if rule.name not in state['achievement_ids']]
+        if missing:
+            new_rows = [Achievement(name=rule.name, description=rule.description) for rule in missing]
+            session.add_all(new_rows)
+            session.flush()
+            state['achievement_ids'].update({row.name: row.id for row in new_rows})
+        ids.update(state['achievement_ids'])
+    return ids
+
+
+def _seed_player(session, player_id):
+    """Reads a player's counters and unlocked achievements from indexed aggregates."""
+    monster_count, highest_level = session.query(
+        func.count(PlayerMonster.id), func.max(PlayerMonster.level)
+    ).filter(PlayerMonster.player_id == player_id).one()
+    trades_completed = session.query(func.count(Trade.id)).filter(
+        Trade.status == "completed",
+        or_(Trade.from_player_id == player_id, Trade.to_player_id == player_id),
+    ).scalar()
+    battles_won = session.query(func.count(Battle.id)).filter(Battle.winner_id == player_id).scalar()
+    counters = {
+        'monster_count': monster_count,
+        'highest_level': highest_level or 0,
+        'trades_completed': trades_completed,
+        'battles_won': battles_won,
+    }
+    unlocked = {
+        achievement_id for (achievement_id,) in
+        session.query(PlayerAchievement.achievement_id).filter_by(player_id=player_id)
+    }
+    return {'counters': counters, 'base': dict(counters), 'unlocked': unlocked, 'reseeded': True}
+
+
+def _load_player(session, player_id, reseed=False):
+    """The session's working copy of a player's counters, from the cache or seeded from the database."""
+    players = _session_state(session)['players']
+    if reseed or player_id not in players:
+        with _cache_lock:
+            cached = None if reseed else _player_counters.get(player_id)
+            if cached is not None:
+                players[player_id] = {
+                    'counters': dict(cached), 'base': dict(cached),
+                    'unlocked': set(_player_unlocked[player_id]), 'reseeded': False,
+                }
+        if cached is None:
+            players[player_id] = _seed_player(session, player_id)
+    return players[player_id]
+
+
+def reset_player_counters(player_id=None):
+    """Forgets cached counters so they are re-read from the database."""
+    with _cache_lock:
+        if player_id is None:
+            _player_counters.clear()
+            _player_unlocked.clear()
+        else:
+            _player_counters.pop(player_id, None)
+            _player_unlocked.pop(player_id, None)
+
+
+def add_event_listener(listener):
+    """Calls listener(player_id, event, counters, level) for every event, once its transaction commits."""
+    _event_listeners.append(listener)
+
+
+# ---- Evaluation ----
+def _evaluate(session, player_id, player, rules):
+    achievement_ids = get_achievement_ids(session)
+    newly_unlocked = []
+    for rule in rules:
+        achievement_id = achievement_ids[rule.name]
+        if achievement_id not in player['unlocked'] and player['counters'][rule.counter] >= rule.threshold:
+            player['unlocked'].add(achievement_id)
+            _session_state(session)['unlocks'].append({'player_id': player_id, 'achievement_id': achievement_id})
+            newly_unlocked.append(rule.name)
+    return newly_unlocked
+
+
+def record_event(session, player_id, event, level=None, flushed=True):
+    """Updates a player's counters for one event and queues any unlocks.
+
+    Call after the change behind the event has been flushed: a player seen
+    for the first time is seeded from the database, which already includes
+    it. Pass flushed=False when the change has not been written yet (queued
+    in lib.write_behind, or inserted after the events are recorded) so it is
+    counted on top. Only the rules watching the counters that event touches
+    are checked. Call flush_unlocks() to write the queued unlocks; counters
+    reach other sessions and the listeners once the transaction commits.
+    """
+    if event not in EVENT_COUNTERS:
+        raise ValueError(f"Unknown achievement event '{event}'")
+    players = _session_state(session)['players']
+    loaded = player_id in players or player_id in _player_counters
+    player = _load_player(session, player_id)
+    if loaded or not flushed:
+        counters = player['counters']
+        if event == 'catch':
+            counters['monster_count'] += 1
+        elif event == 'level_up':
+            counters['highest_level'] = max(counters['highest_level'], level or 0)
+        elif event == 'trade':
+            counters['trades_completed'] += 1
+        elif event == 'battle_win':
+            counters['battles_won'] += 1
+
+    _session_state(session)['events'].append((player_id, event, level))
+    rules = [rule for counter in EVENT_COUNTERS[event] for rule in RULES_BY_COUNTER.get(counter, [])]
+    return _evaluate(session, player_id, player, rules)
+
+
+def evaluate_all(session, player_id):
+    """Re-reads a player's counters from the database and checks every rule against them."""
+    return _evaluate(session, player_id, _load_player(session, player_id, reseed=True), ACHIEVEMENT_RULES)
+
+
+def queue_unlock(session, player_id, achievement_name):
+    """Queues a named achievement for a player, skipping ones already held."""
+    player = _load_player(session, player_id)
+    achievement_id = get_achievement_ids(session).get(achievement_name)
+    if achievement_id is None:
+        achievement_id = session.query(Achievement.id).filter_by(name=achievement_name).scalar()
+        if achievement_id is None:
+            return False
+        _session_state(session)['achievement_ids'][achievement_name] = achievement_id
+    if achievement_id in player['unlocked']:
+        return False
+    player['unlocked'].add(achievement_id)
+    _session_state(session)['unlocks'].append({'player_id': player_id, 'achievement_id': achievement_id})
+    return True
+
+
+def flush_unlocks(session, commit=True):
+    """Writes the session's queued unlocks in one batch; returns how many were queued.
+
+    Unlocks another process already wrote are skipped rather than failing
+    the whole transaction.
+    """
+    state = _session_state(session)
+    rows, state['unlocks'] = state['unlocks'], []
+    if rows:
+        session.execute(sqlite_insert(PlayerAchievement).on_conflict_do_nothing(), rows)
+    if commit:
+        session.commit()
+    return len(rows)
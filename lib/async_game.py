@@ -0,0 +1,225 @@
+# async_game.py
+
+import asyncio
+import re
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from lib.config import engine as sync_engine, apply_sqlite_profile, SQLITE_PROFILES, DEFAULT_PROFILE
+from lib.models import Player, PlayerMonster
+from lib.helpers import get_player_summary, propose_trade, accept_trade
+from lib.stats import stats_for
+from lib.encounters import random_encounter
+from lib.achievements import record_event, flush_unlocks
+from lib.progression import grant_xp, XP_REWARDS
+from lib.sharding import add_player
+
+
+# ---- Engine ----
+def make_async_engine(url=None, pool_size=4, max_overflow=0, profile=DEFAULT_PROFILE):
+    """Builds an aiosqlite engine, defaulting to the same database as lib.config."""
+    url = url or sync_engine.url.set(drivername="sqlite+aiosqlite")
+    async_engine = create_async_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={"cached_statements": SQLITE_PROFILES[profile]["cached_statements"]},
+    )
+    # Concurrent tasks all write through this engine, so take the write lock up front
+    apply_sqlite_profile(async_engine.sync_engine, profile, begin_immediate=True)
+    return async_engine
+
+
+def make_async_session_factory(async_engine):
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+# ---- Player I/O ----
+class TerminalIO:
+    """Prompts on the real terminal without blocking the event loop."""
+
+    async def ask(self, prompt):
+        return (await asyncio.get_running_loop().run_in_executor(None, input, prompt)).strip()
+
+    def say(self, text):
+        print(text)
+
+
+class ScriptedIO:
+    """Answers prompts from a list and collects output, for bots and load tests."""
+
+    def __init__(self, answers=()):
+        self.answers = list(answers)
+        self.output = []
+
+    async def ask(self, prompt):
+        if not self.answers:
+            raise EOFError(f"no answer for prompt {prompt.strip()!r}")
+        return self.answers.pop(0)
+
+    def say(self, text):
+        self.output.append(text)
+
+
+# ---- Game Commands ----
+async def _get_player(session, username):
+    return (await session.execute(select(Player).filter_by(username=username))).scalars().first()
+
+
+async def start_game(session, io, username):
+    if not re.match("^[A-Za-z0-9_]{3,20}$", username):
+        io.say("Username must be 3-20 characters, letters/numbers/underscores only.")
+        return None
+    player = await _get_player(session, username)
+    if player:
+        io.say(f"Welcome back, {username}!")
+    else:
+        # Through the player directory, like every other way of creating a player
+        player = await session.run_sync(add_player, username)
+        await session.commit()
+        io.say(f"New player '{username}' created successfully!")
+    return player
+
+
+async def explore(session, io, username, biome=None):
+    player = await _get_player(session, username)
+    if not player:
+        io.say(f"Player '{username}' not found.")
+        return None
+
+    species = await session.run_sync(random_encounter, biome)
+    if not species:
+        io.say("No wild monsters around. Seed the database first.")
+        return None
+    stats = await session.run_sync(stats_for, species.id, 1)
+    io.say(f"🌿 A wild {species.name} appeared!")
+    io.say(f"HP: {stats.hp}, ATK: {stats.attack}, DEF: {stats.defense}")
+
+    if (await io.ask("Do you want to catch it? (yes/no): ")).lower() != 'yes':
+        io.say("You let it go.")
+        return None
+    return await catch(session, io, player, species, await io.ask("Give it a nickname: "))
+
+
+async def catch(session, io, player, species, nickname):
+    if not nickname:
+        io.say("Nickname cannot be empty.")
+        return None
+    # Stat columns are filled in by lib.stats on insert
+    monster = PlayerMonster(player_id=player.id, species_id=species.id, level=1, nickname=nickname)
+    session.add(monster)
+    await session.flush()
+    await session.run_sync(grant_xp, [(monster.id, player.id, XP_REWARDS['catch'], 'catch')])
+    unlocked = await session.run_sync(record_event, player.id, 'catch')
+    await session.run_sync(flush_unlocks, False)
+    await session.commit()
+    io.say(f"🎉 {nickname} was caught successfully!")
+    for name in unlocked:
+        io.say(f"🏆 Achievement unlocked: {name}!")
+    return monster
+
+
+async def level_up(session, io, username):
+    player = await _get_player(session, username)
+    if not player:
+        io.say(f"Player '{username}' not found.")
+        return None
+    rows = (await session.execute(
+        select(PlayerMonster).where(PlayerMonster.player_id == player.id)
+    )).scalars().all()
+    if not rows:
+        io.say("You have no monsters to level up.")
+        return None
+
+    io.say("Select a monster to level up:")
+    for i, pm in enumerate(rows, 1):
+        io.say(f"{i}. {pm.nickname} (Lv.{pm.level})")
+    while True:
+        try:
+            index = int(await io.ask("Enter monster number: ")) - 1
+            if 0 <= index < len(rows):
+                break
+            io.say("Invalid number. Try again.")
+        except ValueError:
+            io.say("Please enter a valid number.")
+
+    monster = rows[index]
+    old_level = monster.level
+    old_stats = await session.run_sync(stats_for, monster.species_id, old_level)
+    monster.level += 1
+    await session.flush()
+    unlocked = await session.run_sync(record_event, player.id, 'level_up', monster.level)
+    await session.run_sync(flush_unlocks, False)
+    await session.commit()
+
+    new_stats = await session.run_sync(stats_for, monster.species_id, monster.level)
+    io.say(f"🎉 {monster.nickname} leveled up from Lv.{old_level} ➜ Lv.{monster.level}!")
+    io.say(f"✨ HP: +{new_stats.hp - old_stats.hp}, ATK: +{new_stats.attack - old_stats.attack}, DEF: +{new_stats.defense - old_stats.defense}")
+    for name in unlocked:
+        io.say(f"🏆 Achievement unlocked: {name}!")
+    return monster
+
+
+async def trade(session, io, from_username, to_username, offered_monster_id, requested_monster_id):
+    """Proposes a trade and asks the receiving player to accept it."""
+    from_player = await _get_player(session, from_username)
+    to_player = await _get_player(session, to_username)
+    if not from_player or not to_player:
+        io.say("Both players must exist to trade.")
+        return False
+    pending = await session.run_sync(
+        propose_trade, from_player.id, to_player.id, offered_monster_id, requested_monster_id
+    )
+    answer = (await io.ask(f"{to_username}, accept trade #{pending.id}? (yes/no): ")).lower()
+    if answer != 'yes':
+        io.say("Trade left pending.")
+        return False
+    accepted = await session.run_sync(accept_trade, pending.id)
+    io.say("🤝 Trade completed!" if accepted else "Trade could not be completed.")
+    return accepted
+
+
+async def status(session, io, username):
+    player = await _get_player(session, username)
+    if not player:
+        io.say(f"Player '{username}' not found.")
+        return None
+    summary = await session.run_sync(get_player_summary, player.id)
+    io.say(f"👤 Player: {player.username} | Lv.{player.level}")
+    io.say(f"🧟 Monsters Owned: {summary['monster_count']}")
+    highest = summary['highest_monster']
+    if highest:
+        io.say(f"⚔️ Highest Monster: {highest['nickname']} (Lv.{highest['level']})")
+    return summary
+
+
+# ---- Interactive Front-End ----
+async def play(username, session_factory=None):
+    """Runs an interactive command loop for one player on the event loop."""
+    async_engine = None
+    if session_factory is None:
+        async_engine = make_async_engine()
+        session_factory = make_async_session_factory(async_engine)
+    io = TerminalIO()
+    commands = {
+        'explore': lambda session: explore(session, io, username),
+        'level-up': lambda session: level_up(session, io, username),
+        'status': lambda session: status(session, io, username),
+    }
+    try:
+        async with session_factory() as session:
+            if not await start_game(session, io, username):
+                return
+        while True:
+            command = await io.ask(f"[{username}] {'/'.join(commands)}/quit > ")
+            if command == 'quit':
+                break
+            if command not in commands:
+                io.say("Unknown command.")
+                continue
+            async with session_factory() as session:
+                await commands[command](session)
+    except EOFError:
+        pass
+    finally:
+        if async_engine is not None:
+            await async_engine.dispose()
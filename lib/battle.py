@@ -0,0 +1,209 @@
+# battle.py
+
+import numpy as np
+from sqlalchemy import insert, select
+from lib.models import PlayerMonster, MonsterType, Battle
+from lib.helpers import calculate_current_stats, get_type_effectiveness_multiplier
+from lib.achievements import record_event, flush_unlocks
+from lib.species import get_species
+from lib.progression import grant_xp, battle_grants
+from lib.battle_log import (
+    TurnEvent, encode_battle_log,
+    ACTION_ATTACK, ACTION_SUPER_EFFECTIVE, ACTION_NOT_EFFECTIVE, ACTION_KNOCKOUT,
+)
+
+# Row/column order of the effectiveness matrix
+TYPE_ORDER = list(MonsterType)
+TYPE_INDEX = {monster_type: i for i, monster_type in enumerate(TYPE_ORDER)}
+
+# SQLite caps bound parameters per statement, so id lookups are chunked
+LOOKUP_CHUNK_SIZE = 500
+
+
+# ---- Effectiveness Matrix ----
+def build_effectiveness_matrix():
+    """Returns a MonsterType x MonsterType array of damage multipliers."""
+    size = len(TYPE_ORDER)
+    matrix = np.ones((size, size), dtype=np.float64)
+    for i, attacker in enumerate(TYPE_ORDER):
+        for j, defender in enumerate(TYPE_ORDER):
+            matrix[i, j] = get_type_effectiveness_multiplier(attacker, defender)
+    return matrix
+
+EFFECTIVENESS_MATRIX = build_effectiveness_matrix()
+
+
+# ---- Combatant Loading ----
+def load_combatants(session, monster_ids):
+    """Loads level-scaled stat arrays for the given PlayerMonster ids.
+
+    Returns a dict of arrays sorted by monster id, so callers can map
+    ids to rows with np.searchsorted.
+    """
+    unique_ids = sorted(set(int(i) for i in monster_ids))
+    rows = []
+    for start in range(0, len(unique_ids), LOOKUP_CHUNK_SIZE):
+        chunk = unique_ids[start:start + LOOKUP_CHUNK_SIZE]
+        rows.extend(session.execute(
+            select(PlayerMonster.id, PlayerMonster.player_id, PlayerMonster.level, PlayerMonster.species_id)
+            .where(PlayerMonster.id.in_(chunk))
+            .order_by(PlayerMonster.id)
+        ).all())
+
+    if len(rows) != len(unique_ids):
+        found = {row.id for row in rows}
+        missing = [i for i in unique_ids if i not in found]
+        raise ValueError(f"Unknown monster ids: {missing[:10]}")
+
+    species = [get_species(session, row.species_id) for row in rows]
+    levels = np.array([row.level or 1 for row in rows], dtype=np.int64)
+    stats = calculate_current_stats(
+        np.array([s.base_hp for s in species], dtype=np.int64),
+        np.array([s.base_attack for s in species], dtype=np.int64),
+        np.array([s.base_defense for s in species], dtype=np.int64),
+        levels,
+    )
+    return {
+        'id': np.array([row.id for row in rows], dtype=np.int64),
+        'player_id': np.array([row.player_id for row in rows], dtype=np.int64),
+        'level': levels,
+        'type': np.array([TYPE_INDEX[s.type] for s in species], dtype=np.int64),
+        'hp': stats['hp'],
+        'attack': stats['attack'],
+        'defense': stats['defense'],
+        'speed': np.array([s.base_speed for s in species], dtype=np.int64),
+    }
+
+
+def _take(combatants, monster_ids):
+    """Selects the combatant rows for monster_ids, keeping their order."""
+    positions = np.searchsorted(combatants['id'], monster_ids)
+    return {key: values[positions] for key, values in combatants.items()}
+
+
+# ---- Simulation ----
+def simulate_battles(side1, side2, rng=None, coin=None):
+    """Resolves many one-on-one battles at once.
+
+    side1 and side2 are dicts of equal-length arrays with 'type', 'hp',
+    'attack', 'defense' and 'speed'. Each monster deals
+    max(1, 10 * attack * multiplier / (defense + 10)) per turn; whoever needs fewer
+    turns to knock out the other wins, the faster monster wins a tie and
+    equal speeds are decided by a coin flip. coin may supply those flips as
+    precomputed draws in [0, 1), one per battle, instead of drawing from rng.
+
+    Returns a dict of arrays: 'side1_wins' (bool), 'turns', 'damage1' and
+    'damage2' (per-turn damage), 'mult1' and 'mult2' (type multipliers) and
+    'side1_first' (bool, whether side1 strikes first).
+    """
+    mult1 = EFFECTIVENESS_MATRIX[side1['type'], side2['type']]
+    mult2 = EFFECTIVENESS_MATRIX[side2['type'], side1['type']]
+    damage1 = np.maximum(1.0, np.floor(10 * side1['attack'] * mult1 / (side2['defense'] + 10)))
+    damage2 = np.maximum(1.0, np.floor(10 * side2['attack'] * mult2 / (side1['defense'] + 10)))
+
+    turns1 = np.ceil(side2['hp'] / damage1)
+    turns2 = np.ceil(side1['hp'] / damage2)
+
+    if coin is None:
+        rng = rng if rng is not None else np.random.default_rng()
+        coin = rng.random(turns1.shape[0])
+    coin = np.asarray(coin) < 0.5
+    first_strike = np.where(side1['speed'] == side2['speed'], coin, side1['speed'] > side2['speed'])
+    side1_wins = (turns1 < turns2) | ((turns1 == turns2) & first_strike)
+
+    return {
+        'side1_wins': side1_wins,
+        'turns': np.where(side1_wins, turns1, turns2).astype(np.int64),
+        'damage1': damage1.astype(np.int64),
+        'damage2': damage2.astype(np.int64),
+        'mult1': mult1,
+        'mult2': mult2,
+        'side1_first': first_strike,
+    }
+
+
+def format_battle_summary(monster1_id, monster2_id, damage1, damage2, winner_monster_id, turns):
+    """One-line battle_log text for a simulated battle."""
+    return (
+        f"#{monster1_id} vs #{monster2_id}: {damage1}/{damage2} dmg per turn, "
+        f"won by #{winner_monster_id} in {turns} turns"
+    )
+
+
+def battle_turn_events(hp1, hp2, damage1, damage2, mult1, mult2, side1_first):
+    """Replays one simulated battle as alternating TurnEvents (side 0 is side1)."""
+    hp = [int(hp1), int(hp2)]
+    damage = (int(damage1), int(damage2))
+    multiplier = (float(mult1), float(mult2))
+    side = 0 if side1_first else 1
+    turn = 1
+    while True:
+        target = 1 - side
+        hp[target] = max(0, hp[target] - damage[side])
+        if hp[target] == 0:
+            action = ACTION_KNOCKOUT
+        elif multiplier[side] > 1:
+            action = ACTION_SUPER_EFFECTIVE
+        elif multiplier[side] < 1:
+            action = ACTION_NOT_EFFECTIVE
+        else:
+            action = ACTION_ATTACK
+        yield TurnEvent(turn, side, action, damage[side], hp[target])
+        if action == ACTION_KNOCKOUT:
+            return
+        side, turn = target, turn + 1
+
+
+# ---- Batch Resolution ----
+def resolve_battles(session, matchups, seed=None, persist=True, store_turns=True):
+    """Simulates (monster1_id, monster2_id) matchups and stores Battle rows in bulk.
+
+    Each row also gets its packed turn-by-turn log_data for replay_battle,
+    unless store_turns is False.
+    Returns a list of result dicts, one per matchup, in input order.
+    """
+    if not matchups:
+        return []
+
+    pairs = np.asarray(matchups, dtype=np.int64).reshape(-1, 2)
+    combatants = load_combatants(session, pairs.ravel())
+    side1 = _take(combatants, pairs[:, 0])
+    side2 = _take(combatants, pairs[:, 1])
+    outcome = simulate_battles(side1, side2, np.random.default_rng(seed))
+
+    winner_ids = np.where(outcome['side1_wins'], side1['player_id'], side2['player_id'])
+    winner_monster_ids = np.where(outcome['side1_wins'], pairs[:, 0], pairs[:, 1])
+    results = [
+        {
+            'player1_id': int(side1['player_id'][i]),
+            'player2_id': int(side2['player_id'][i]),
+            'winner_id': int(winner_ids[i]),
+            'battle_log': format_battle_summary(
+                pairs[i, 0], pairs[i, 1], outcome['damage1'][i], outcome['damage2'][i],
+                winner_monster_ids[i], outcome['turns'][i],
+            ),
+        }
+        for i in range(len(pairs))
+    ]
+
+    if store_turns:
+        for i, result in enumerate(results):
+            result['log_data'] = encode_battle_log(battle_turn_events(
+                side1['hp'][i], side2['hp'][i], outcome['damage1'][i], outcome['damage2'][i],
+                outcome['mult1'][i], outcome['mult2'][i], outcome['side1_first'][i],
+            ))
+
+    if persist:
+        # Counted before the insert (flushed=False) so a first-seen winner isn't seeded with these wins
+        for result in results:
+            record_event(session, result['winner_id'], 'battle_win', flushed=False)
+        session.execute(insert(Battle), results)
+        flush_unlocks(session, commit=False)
+        grant_xp(session, [
+            grant
+            for i in range(len(pairs))
+            for grant in battle_grants(pairs[i, 0], pairs[i, 1], side1['player_id'][i], side2['player_id'][i],
+                                       outcome['side1_wins'][i])
+        ])
+        session.commit()
+    return results
@@ -0,0 +1,94 @@
+# battle_log.py
+
+import struct
+import zlib
+from collections import namedtuple
+from sqlalchemy import select
+from lib.models import Battle
+
+# One turn of a battle: which side acted, what it did, and the result
+TurnEvent = namedtuple('TurnEvent', ['turn', 'side', 'action', 'damage', 'target_hp'])
+
+ACTION_ATTACK = 0
+ACTION_SUPER_EFFECTIVE = 1
+ACTION_NOT_EFFECTIVE = 2
+ACTION_KNOCKOUT = 3
+
+# 2-byte magic, format version, flags; then fixed-size little-endian records
+HEADER = struct.Struct('<2sBB')
+RECORD = struct.Struct('<HBBhh')
+MAGIC = b'BL'
+VERSION = 1
+FLAG_ZLIB = 0x01
+
+READ_CHUNK_SIZE = 4096
+
+
+# ---- Encoding ----
+def encode_battle_log(events, compress=True):
+    """Packs TurnEvents into 8-byte records, zlib-compressed by default."""
+    body = b''.join(RECORD.pack(*event) for event in events)
+    if compress:
+        body = zlib.compress(body)
+    return HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if compress else 0) + body
+
+
+def _iter_records(chunks):
+    """Turns a stream of byte chunks (header included) into TurnEvents."""
+    chunks = iter(chunks)
+    buffer = b''
+    while len(buffer) < HEADER.size:
+        chunk = next(chunks, b'')
+        if not chunk:
+            raise ValueError("Battle log is truncated")
+        buffer += chunk
+    magic, version, flags = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a battle log")
+
+    decompressor = zlib.decompressobj() if flags & FLAG_ZLIB else None
+    pending = buffer[HEADER.size:]
+    buffer = b''
+    while True:
+        if decompressor is not None:
+            pending = decompressor.decompress(pending)
+        buffer += pending
+        usable = len(buffer) - len(buffer) % RECORD.size
+        for offset in range(0, usable, RECORD.size):
+            yield TurnEvent(*RECORD.unpack_from(buffer, offset))
+        buffer = buffer[usable:]
+        pending = next(chunks, b'')
+        if not pending:
+            break
+    if decompressor is not None:
+        buffer += decompressor.flush()
+        for offset in range(0, len(buffer) - len(buffer) % RECORD.size, RECORD.size):
+            yield TurnEvent(*RECORD.unpack_from(buffer, offset))
+
+
+def iter_battle_log(data):
+    """Yields TurnEvents from an encoded log held in memory."""
+    return _iter_records(data[i:i + READ_CHUNK_SIZE] for i in range(0, len(data), READ_CHUNK_SIZE))
+
+
+# ---- Replay ----
+def replay_battle(session, battle_id):
+    """Streams a stored battle's turns without loading the whole log.
+
+    On SQLite the blob is read incrementally through Connection.blobopen;
+    other drivers fall back to fetching the column in one go.
+    """
+    connection = session.connection()
+    driver_connection = connection.connection.driver_connection
+    has_log = connection.execute(
+        select(Battle.log_data.isnot(None)).where(Battle.id == battle_id)
+    ).scalar()
+    if not has_log:
+        return
+
+    if hasattr(driver_connection, 'blobopen'):
+        with driver_connection.blobopen(Battle.__tablename__, 'log_data', battle_id, readonly=True) as blob:
+            yield from _iter_records(iter(lambda: blob.read(READ_CHUNK_SIZE), b''))
+    else:
+        data = connection.execute(select(Battle.log_data).where(Battle.id == battle_id)).scalar()
+        yield from iter_battle_log(data)
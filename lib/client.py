@@ -0,0 +1,24 @@
+# client.py
+# Thin client for `cli.py serve`; standard library only so forwarding a command starts fast
+
+import json
+import socket
+import sys
+
+
+def send_command(socket_path, argv):
+    """Runs a command on a serving process, answering its prompts locally."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        stream = sock.makefile('rw')
+        stream.write(json.dumps({'argv': argv}) + "\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            sys.stdout.write(message.get('output', ""))
+            if message.get('done'):
+                return message['ok']
+            answer = input(message['prompt'])
+            stream.write(json.dumps({'answer': answer}) + "\n")
+            stream.flush()
+    return False
@@ -0,0 +1,147 @@
+# collection.py
+
+import base64
+import json
+from sqlalchemy import select, tuple_
+from lib.models import PlayerMonster, MonsterType, MonsterRarity
+from lib.species import get_catalog
+
+# Sort keys, each backed by a (player_id, column) index
+SORT_COLUMNS = {
+    'id': PlayerMonster.id,
+    'level': PlayerMonster.level,
+    'nickname': PlayerMonster.nickname,
+}
+
+DEFAULT_PAGE_SIZE = 20
+
+COLLECTION_COLUMNS = (
+    PlayerMonster.id, PlayerMonster.nickname, PlayerMonster.species_id, PlayerMonster.level,
+    PlayerMonster.max_hp, PlayerMonster.attack, PlayerMonster.defense,
+)
+
+
+def parse_filters(filter_args):
+    """Turns ['type=Fire', 'level=5-10', 'name=Fi'] into a filters dict."""
+    filters = {}
+    for arg in filter_args or []:
+        key, _, value = arg.partition('=')
+        key = key.strip().lower()
+        if not value:
+            raise ValueError(f"Filter '{arg}' should look like key=value")
+        if key == 'type':
+            filters['type'] = MonsterType(value.capitalize())
+        elif key == 'rarity':
+            filters['rarity'] = MonsterRarity(value.capitalize())
+        elif key == 'level':
+            low, dash, high = value.partition('-')
+            filters['min_level'] = int(low) if low else None
+            # 'level=5' is an exact level, 'level=5-' and 'level=-10' are open-ended
+            filters['max_level'] = int(high) if high else (None if dash else filters['min_level'])
+        elif key in ('name', 'nickname'):
+            filters['nickname_prefix'] = value
+        else:
+            raise ValueError(f"Unknown filter '{key}' (use type, rarity, level or name)")
+    return filters
+
+
+def prefix_upper_bound(prefix):
+    """The smallest string above every string starting with prefix, or None if there is none.
+
+    Bumps the last character by one code point (skipping the surrogate
+    range, which UTF-8 cannot hold); SQLite compares text as UTF-8 bytes,
+    which sort in code point order.
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code == 0xD800:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
+
+def encode_cursor(row, sort='id', descending=False):
+    """An opaque token for the position after row, to resume browsing from."""
+    key = row.id if sort == 'id' else getattr(row, sort)
+    data = json.dumps([sort, descending, key, row.id]).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort='id', descending=False):
+    """(sort key, id) from encode_cursor; ValueError if it is malformed or made for another ordering."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, key, last_id = json.loads(data)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
+    if (cursor_sort, cursor_descending) != (sort, descending):
+        raise ValueError("That cursor belongs to a different sort order")
+    return key, last_id
+
+
+def collection_query(session, player_id, filters=None, sort='id', descending=False):
+    """Builds the filtered, ordered SELECT behind collection browsing."""
+    filters = filters or {}
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort '{sort}'")
+    query = select(*COLLECTION_COLUMNS).where(PlayerMonster.player_id == player_id)
+
+    if 'type' in filters or 'rarity' in filters:
+        # Resolve to species ids through the catalog instead of joining
+        species_ids = get_catalog(session).ids(filters.get('type'), filters.get('rarity'))
+        query = query.where(PlayerMonster.species_id.in_(species_ids))
+    if filters.get('min_level') is not None:
+        query = query.where(PlayerMonster.level >= filters['min_level'])
+    if filters.get('max_level') is not None:
+        query = query.where(PlayerMonster.level <= filters['max_level'])
+    if filters.get('nickname_prefix'):
+        prefix = filters['nickname_prefix']
+        # Range form of a prefix match, so the (player_id, nickname) index applies
+        query = query.where(PlayerMonster.nickname >= prefix)
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            query = query.where(PlayerMonster.nickname < upper)
+
+    column = SORT_COLUMNS[sort]
+    if sort == 'id':
+        return query.order_by(column.desc() if descending else column)
+    return query.order_by(*(
+        (column.desc(), PlayerMonster.id.desc()) if descending else (column, PlayerMonster.id)
+    ))
+
+
+def _after(sort, descending, key, last_id):
+    """WHERE clause for rows past (key, last_id) in the browsing order."""
+    if sort == 'id':
+        return PlayerMonster.id < last_id if descending else PlayerMonster.id > last_id
+    row_key, last_key = tuple_(SORT_COLUMNS[sort], PlayerMonster.id), tuple_(key, last_id)
+    return row_key < last_key if descending else row_key > last_key
+
+
+def iter_collection_pages(session, player_id, filters=None, sort='id', descending=False, page_size=20, after=None):
+    """Yields pages (lists of rows) using keyset pagination.
+
+    Each page seeks past the last row of the previous one, so the next page
+    costs the same as the first instead of re-reading everything before it.
+    after is a (sort key, id) position from decode_cursor() to start behind;
+    skipping ahead without one still reads every page in between.
+    """
+    query = collection_query(session, player_id, filters, sort, descending)
+    while True:
+        page_query = query if after is None else query.where(_after(sort, descending, *after))
+        page = session.execute(page_query.limit(page_size)).all()
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        after = (last.id if sort == 'id' else getattr(last, sort), last.id)
+
+
+def iter_collection(session, player_id, filters=None, sort='id', descending=False, batch_size=500):
+    """Streams every matching row, buffering batch_size rows at a time."""
+    query = collection_query(session, player_id, filters, sort, descending)
+    yield from session.execute(query.execution_options(yield_per=batch_size))
@@ -0,0 +1,423 @@
+# commands.py
+# Subcommand handlers for cli.py, imported only once a command actually runs
+
+import os
+import re
+from itertools import islice
+from lib.config import settings, session_scope, get_shards
+from lib.models import Player, PlayerMonster, Trade
+from lib.helpers import get_player_summary
+from lib.stats import stats_for
+from lib.species import get_species
+from lib.encounters import random_encounter
+from lib.achievements import record_event, flush_unlocks
+from lib.leaderboard import get_leaderboard
+from lib.progression import grant_xp, XP_REWARDS
+from lib.collection import (
+    parse_filters, iter_collection, iter_collection_pages, decode_cursor, encode_cursor, DEFAULT_PAGE_SIZE,
+)
+
+def start_game(args):
+    username = input("Enter your desired username: ").strip()
+
+    if not re.match("^[A-Za-z0-9_]{3,20}$", username):
+        print("Username must be 3-20 characters, letters/numbers/underscores only.")
+        return
+
+    shards = get_shards()
+    if shards.locate(username):
+        print(f"Welcome back, {username}!")
+    else:
+        # Registered through the directory so the id is unique on every shard
+        shards.create_player(username)
+        print(f"New player '{username}' created successfully!")
+
+
+def explore(args):
+    with session_scope(username=args.username) as session:
+        player = get_player_by_username(session, args.username)
+        if not player:
+            print(f"Player '{args.username}' not found.")
+            return
+
+        species = random_encounter(session, biome=args.biome)
+        if not species:
+            print("No wild monsters around. Seed the database first.")
+            return
+        print(f"\n🌿 A wild {species.name} appeared!")
+
+        stats = stats_for(session, species.id, 1)
+        print(f"HP: {stats.hp}, ATK: {stats.attack}, DEF: {stats.defense}")
+
+        choice = input("Do you want to catch it? (yes/no): ").strip().lower()
+        if choice == 'yes':
+            nickname = input("Give it a nickname: ").strip()
+            if not nickname:
+                print("Nickname cannot be empty.")
+            elif settings['write_behind']:
+                # Journaled now, committed with the next batch
+                write_behind_for(session).catch(player.id, species.id, nickname)
+                unlocked = record_event(session, player.id, 'catch', flushed=False)
+                flush_unlocks(session, commit=False)
+                print(f"🎉 {nickname} was caught successfully!")
+                print_unlocked(unlocked)
+            else:
+                new_monster = PlayerMonster(
+                    player_id=player.id,
+                    species_id=species.id,
+                    level=1,
+                    nickname=nickname
+                )
+                session.add(new_monster)
+                session.flush()
+                grant_xp(session, [(new_monster.id, player.id, XP_REWARDS['catch'], 'catch')])
+                unlocked = record_event(session, player.id, 'catch')
+                flush_unlocks(session, commit=False)
+                session.commit()
+                print(f"🎉 {nickname} was caught successfully!")
+                print_unlocked(unlocked)
+        else:
+            print("You let it go.")
+
+
+def view_collection(args):
+    with session_scope(username=args.username) as session:
+        player = get_player_by_username(session, args.username)
+        if not player:
+            print(f"Player '{args.username}' not found.")
+            return
+
+        try:
+            filters = parse_filters(args.filter)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+
+        # Stored stat columns are kept in sync by lib.stats and names come from the
+        # species catalog, so no species join is needed
+        page = max(args.page, 1)
+        paged = bool(args.page or args.limit or args.after)
+        if paged:
+            limit = args.limit or DEFAULT_PAGE_SIZE
+            try:
+                after = decode_cursor(args.after, args.sort, args.desc) if args.after else None
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            pages = iter_collection_pages(session, player.id, filters, args.sort, args.desc,
+                                          page_size=limit, after=after)
+            # A cursor seeks straight to its page; --page N alone walks the pages before it
+            player_monsters = next(islice(pages, 0 if after else page - 1, None), [])
+            first = 1 if after else (page - 1) * limit + 1
+        else:
+            player_monsters = iter_collection(session, player.id, filters, args.sort, args.desc)
+            first = 1
+
+        shown = 0
+        for i, pm in enumerate(player_monsters, first):
+            if not shown:
+                print(f"\n{player.username}'s Monster Collection:")
+            print(f"{i}. {pm.nickname} ({get_species(session, pm.species_id).name}, Lv.{pm.level}) - HP: {pm.max_hp} ATK: {pm.attack} DEF: {pm.defense}")
+            shown += 1
+
+        if not shown:
+            if filters or page > 1 or args.after:
+                print("No monsters match.")
+            else:
+                print("You have no monsters. Try 'explore' to catch one.")
+        elif paged and shown == limit:
+            cursor = encode_cursor(pm, args.sort, args.desc)
+            if args.after:
+                print(f"Use --after {cursor} for more.")
+            else:
+                print(f"Page {page}. Use --page {page + 1} or --after {cursor} for more.")
+
+
+def level_up(args):
+    with session_scope(username=args.username) as session:
+        player = get_player_by_username(session, args.username)
+        if not player:
+            print(f"Player '{args.username}' not found.")
+            return
+
+        player_monsters = session.query(PlayerMonster).filter_by(player_id=player.id).all()
+        if not player_monsters:
+            print("You have no monsters to level up.")
+            return
+
+        # Level-ups still waiting in the write-behind queue
+        queue = write_behind_for(session) if settings['write_behind'] else None
+        levels = [pm.level + (queue.pending_levels(pm.id) if queue else 0) for pm in player_monsters]
+
+        print("\nSelect a monster to level up:")
+        for i, (pm, level) in enumerate(zip(player_monsters, levels), 1):
+            print(f"{i}. {pm.nickname} (Lv.{level})")
+
+        while True:
+            try:
+                index = int(input("Enter monster number: ")) - 1
+                if 0 <= index < len(player_monsters):
+                    break
+                print("Invalid number. Try again.")
+            except ValueError:
+                print("Please enter a valid number.")
+
+        monster = player_monsters[index]
+        old_level = levels[index]
+        old_stats = stats_for(session, monster.species_id, old_level)
+        if queue:
+            queue.level_up(monster.id)
+            new_level = old_level + 1
+            unlocked = record_event(session, player.id, 'level_up', level=new_level, flushed=False)
+            flush_unlocks(session, commit=False)
+        else:
+            monster.level += 1
+            session.flush()
+            new_level = monster.level
+            unlocked = record_event(session, player.id, 'level_up', level=new_level)
+            flush_unlocks(session, commit=False)
+            session.commit()
+
+        new_stats = stats_for(session, monster.species_id, new_level)
+        print(f"\n🎉 {monster.nickname} leveled up from Lv.{old_level} ➜ Lv.{new_level}!")
+        print(f"✨ HP: +{new_stats.hp - old_stats.hp}, ATK: +{new_stats.attack - old_stats.attack}, DEF: +{new_stats.defense - old_stats.defense}")
+        print_unlocked(unlocked)
+
+
+def trades(args):
+    from lib.trading import accept_trades, settle_trade_queue
+    shards = get_shards()
+    if shards.count > 1:
+        return sharded_trades(args, shards)
+    with session_scope(username=args.username) as session:
+        player = get_player_by_username(session, args.username)
+        if not player:
+            print(f"Player '{args.username}' not found.")
+            return
+
+        if args.accept:
+            accepted = accept_trades(session, player.id, [trade_id for shard, trade_id in args.accept if not shard])
+            session.commit()
+            for shard, trade_id in args.accept:
+                if shard or trade_id not in accepted:
+                    print(f"❌ Trade #{trade_label(shard, trade_id)} is not a pending offer to {player.username}.")
+            if accepted:
+                # Settles every accepted trade together, so rings among them settle as rings
+                summary = settle_trade_queue(session)
+                print(f"🤝 {summary['completed']} trades completed, {summary['rejected']} could not be completed.")
+            return
+
+        offers = session.query(Trade).filter_by(to_player_id=player.id, status="pending").order_by(Trade.id).all()
+        names = dict(session.query(Player.id, Player.username).filter(
+            Player.id.in_({trade.from_player_id for trade in offers})
+        ).all())
+        print_offers(player.username, [(None, trade) for trade in offers], names)
+
+
+def sharded_trades(args, shards):
+    """trades on a sharded database: offers live on their proposers' shards and settle one by one."""
+    found = shards.locate(args.username)
+    if not found:
+        print(f"Player '{args.username}' not found.")
+        return
+    player_id = found[0]
+
+    if args.accept:
+        completed = rejected = 0
+        for shard, trade_id in args.accept:
+            if shard is None or not 0 <= shard < shards.count or not is_pending_offer(shards, shard, trade_id, player_id):
+                print(f"❌ Trade #{trade_label(shard, trade_id)} is not a pending offer to {args.username}.")
+            elif shards.settle_trade(shard, trade_id):
+                completed += 1
+            else:
+                rejected += 1
+        if completed or rejected:
+            print(f"🤝 {completed} trades completed, {rejected} could not be completed.")
+        return
+
+    offers = []
+    for shard in range(shards.count):
+        with shards.session(shard) as session:
+            offers.extend((shard, trade) for trade in session.query(Trade).filter_by(
+                to_player_id=player_id, status="pending"
+            ).order_by(Trade.id))
+    print_offers(args.username, offers, shards.usernames({trade.from_player_id for _, trade in offers}))
+
+
+def is_pending_offer(shards, shard, trade_id, player_id):
+    with shards.session(shard) as session:
+        trade = session.get(Trade, trade_id)
+        return trade is not None and trade.to_player_id == player_id and trade.status == "pending"
+
+
+def trade_label(shard, trade_id):
+    return trade_id if shard is None else f"{shard}:{trade_id}"
+
+
+def print_offers(username, offers, names):
+    """offers is a list of (shard or None, Trade)."""
+    if not offers:
+        print("No trade offers.")
+        return
+    print(f"\n{username}'s Trade Offers:")
+    for shard, trade in offers:
+        print(f"#{trade_label(shard, trade.id)} {names.get(trade.from_player_id, '?')} offers "
+              f"#{trade.offered_monster_id} for your #{trade.requested_monster_id}")
+
+
+def handle_status(args):
+    with session_scope(username=args.username) as session:
+        player = get_player_by_username(session, args.username)
+        if not player:
+            print(f"Player '{args.username}' not found.")
+            return
+
+        print(f"\n👤 Player: {player.username} | Lv.{player.level}")
+        summary = get_player_summary(session, player.id)
+        print(f"🧟 Monsters Owned: {summary['monster_count']}")
+        highest = summary['highest_monster']
+        if highest:
+            print(f"⚔️ Highest Monster: {highest['nickname']} (Lv.{highest['level']})")
+            print("📊 By Type: " + ", ".join(f"{t} {n}" for t, n in sorted(summary['by_type'].items())))
+            print("💎 By Rarity: " + ", ".join(f"{r} {n}" for r, n in sorted(summary['by_rarity'].items())))
+            print(f"✨ Total XP: {summary['total_experience']}")
+
+
+def show_leaderboard(args):
+    if needs_one_shard("Leaderboards"):
+        return
+    with session_scope() as session:
+        board = get_leaderboard(session, args.board)
+        if args.around:
+            player = get_player_by_username(session, args.around)
+            if not player:
+                print(f"Player '{args.around}' not found.")
+                return
+            entries = board.around(player.id, args.limit // 2)
+            if not entries:
+                print(f"{player.username} is not on the {args.board} leaderboard yet.")
+        else:
+            entries = board.top(args.limit)
+
+        names = dict(session.query(Player.id, Player.username).filter(Player.id.in_([e[1] for e in entries])).all())
+        print(f"\n🏆 Leaderboard: {args.board} ({len(board)} players)")
+        for rank, player_id, score in entries:
+            print(f"{rank:>4}. {names.get(player_id, '?'):<20} {score}")
+
+
+def tournament(args):
+    from lib.tournament import draft_teams, run_tournament
+    if needs_one_shard("Tournaments"):
+        return
+    with session_scope() as session:
+        teams = draft_teams(session, args.teams, args.difficulty, args.team_size)
+        if len(teams) < 2:
+            print("Not enough monsters to draft a tournament. Try 'explore' first.")
+            return
+
+        print(f"⚔️  {len(teams)} teams entered (seed {args.seed})")
+        result = run_tournament(session, teams, seed=args.seed, workers=args.workers)
+        champion = session.query(PlayerMonster.nickname, PlayerMonster.level).filter(
+            PlayerMonster.id.in_(teams[result['champion']])
+        ).all()
+        print(f"🏆 Champion after {len(result['rounds'])} rounds: "
+              + ", ".join(f"{pm.nickname} (Lv.{pm.level})" for pm in champion))
+        print(f"{result['battles']} battles recorded.")
+
+
+def progress(args):
+    from lib.progression import apply_xp_grants, pending_grants
+
+    def apply(session):
+        # Each shard keeps its own ledger and watermark for the players on it
+        pending = pending_grants(session)
+        if not pending:
+            return None
+        summary = apply_xp_grants(session, max_grants=args.max_grants)
+        session.commit()
+        return summary
+
+    summaries = [summary for summary in get_shards().for_each_shard(apply) if summary]
+    if not summaries:
+        print("No pending XP to apply.")
+        return
+    total = {key: sum(summary[key] for summary in summaries) for key in summaries[0]}
+    print(f"📒 Applied {total['grants_applied']} XP grants.")
+    print(f"✨ {total['monsters_updated']} monsters and {total['players_updated']} players gained XP; "
+          f"{total['levels_gained']} levels gained.")
+
+
+def export(args):
+    from lib.export import export_snapshot, refresh_replica
+    shards = get_shards()
+    if args.replica and shards.count > 1:
+        print("❌ --replica copies one database file; export a sharded database without it.")
+        return
+
+    # One snapshot per shard, in shard<i>/ under out_dir when sharded
+    for shard, engine in enumerate(shards.engines):
+        out_dir = args.out_dir if shards.count == 1 else os.path.join(args.out_dir, f"shard{shard}")
+        source = engine
+        if args.replica:
+            print(f"🗄️  Refreshing replica {args.replica}...")
+            source = refresh_replica(engine, args.replica)
+        try:
+            counts = export_snapshot(source, out_dir, fmt=args.format, tables=args.table,
+                                     chunk_size=args.chunk_size, full=args.full)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return
+        finally:
+            if source is not engine:
+                source.dispose()
+
+        for name, rows in counts.items():
+            print(f"📦 {name}: {rows} rows")
+        print(f"Snapshot written to {out_dir}")
+
+
+def write_behind_for(session):
+    """The write-behind queue for the database session is bound to, set up from lib.config settings."""
+    from lib.write_behind import get_write_behind
+    return get_write_behind(
+        session.get_bind(),
+        max_batch=settings['write_behind_batch'],
+        max_delay=settings['write_behind_delay_ms'] / 1000,
+        sync_journal=settings['write_behind_fsync'],
+    )
+
+
+def needs_one_shard(what):
+    """For commands that read every player's data in one session; prints why and returns True when sharded."""
+    if settings['shards'] > 1:
+        print(f"❌ {what} only work on an unsharded database (MONSTER_DB_SHARDS=1).")
+        return True
+    return False
+
+
+def get_player_by_username(session, username):
+    return session.query(Player).filter_by(username=username).first()
+
+
+def print_unlocked(achievement_names):
+    for name in achievement_names:
+        print(f"🏆 Achievement unlocked: {name}!")
+
+
+def serve(args):
+    from cli import build_parser
+    from lib.server import serve_socket, serve_stdio
+    if args.stdio:
+        serve_stdio(build_parser())
+    elif args.serve_socket or args.socket:
+        serve_socket(build_parser(), args.serve_socket or args.socket)
+    else:
+        print("Pass --socket PATH or --stdio to serve.")
+
+
+def play_async(args):
+    import asyncio
+    from lib.async_game import play
+    if needs_one_shard("Async sessions"):
+        return
+    asyncio.run(play(args.username))
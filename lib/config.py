@@ -1,7 +1,238 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import configparser
+import contextlib
+import os
+import threading
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+# Named SQLite tuning profiles, applied as PRAGMAs on every new connection
+SQLITE_PROFILES = {
+    # Every commit is fsynced; for anything you cannot afford to lose
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,          # KiB when negative: 16 MB page cache
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 30000,
+        "cached_statements": 128,
+    },
+    # WAL lets readers run alongside the single writer; NORMAL skips most fsyncs
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "cached_statements": 512,
+    },
+    # Seeding and imports: no fsync at all, big cache; rerun the load if it crashes
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 60000,
+        "cached_statements": 1024,
+    },
+}
+DEFAULT_PROFILE = os.environ.get("MONSTER_DB_PROFILE", "balanced")
+
+
+def apply_sqlite_profile(engine, profile=DEFAULT_PROFILE, begin_immediate=False):
+    """Registers a connect hook that sets the profile's PRAGMAs.
+
+    With begin_immediate, every transaction takes the write lock up front.
+    Many writers in one process need this under WAL: a deferred transaction
+    that reads and then writes fails with "database is locked" as soon as
+    another writer commits in between, without waiting on busy_timeout.
+    """
+    settings = SQLITE_PROFILES[profile]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout"):
+            cursor.execute(f"PRAGMA {pragma}={settings[pragma]}")
+        cursor.close()
+        if begin_immediate:
+            # Stop the driver from issuing its own BEGIN; the hook below does it
+            dbapi_connection.isolation_level = None
+
+    if begin_immediate:
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def make_engine(url, profile=DEFAULT_PROFILE, begin_immediate=False, **kwargs):
+    """Creates an engine for url; SQLite URLs get the named tuning profile."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}'")
+    if not url.startswith("sqlite"):
+        return create_engine(url, **kwargs)
+    connect_args = kwargs.pop("connect_args", {})
+    # pysqlite's per-connection prepared statement cache
+    connect_args.setdefault("cached_statements", SQLITE_PROFILES[profile]["cached_statements"])
+    engine = create_engine(url, connect_args=connect_args, **kwargs)
+    return apply_sqlite_profile(engine, profile, begin_immediate)
+
+
+# ---- Settings ----
+CONFIG_FILE = os.environ.get("MONSTER_DB_CONFIG", "monster_game.ini")
+DEFAULT_SETTINGS = {
+    "url": "sqlite:///monster_game.db",
+    "profile": DEFAULT_PROFILE,
+    "shards": 1,
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": -1,
+    # Costs a round trip per checkout; worth it for server databases, not local SQLite files
+    "pool_pre_ping": False,
+    "echo": False,
+    # Group-commit catches and level-ups through lib.write_behind
+    "write_behind": False,
+    "write_behind_batch": 500,
+    "write_behind_delay_ms": 50,
+    "write_behind_fsync": False,
+}
+
+
+def load_settings(path=CONFIG_FILE, environ=os.environ):
+    """Database settings: defaults, then the [database] section of path, then MONSTER_DB_* variables.
+
+    e.g. MONSTER_DB_URL=sqlite:///other.db or MONSTER_DB_POOL_SIZE=10.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    overrides = {}
+    if path and os.path.exists(path):
+        parser = configparser.ConfigParser()
+        parser.read(path)
+        if parser.has_section("database"):
+            overrides.update(parser.items("database"))
+    for key in DEFAULT_SETTINGS:
+        value = environ.get(f"MONSTER_DB_{key.upper()}")
+        if value is not None:
+            overrides[key] = value
+    for key, value in overrides.items():
+        if key not in DEFAULT_SETTINGS:
+            raise ValueError(f"Unknown database setting '{key}'")
+        default = DEFAULT_SETTINGS[key]
+        if isinstance(default, bool):
+            value = str(value).strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            value = int(value)
+        settings[key] = value
+    return settings
+
+
+settings = load_settings()
+
+
+# ---- Engine Registry ----
+_engines = {}
+_scoped_sessions = {}
+_shards = None
+
+
+def get_engine(url=None, **kwargs):
+    """The process-wide engine for url (default: the configured database), created once.
+
+    File databases get a connection pool sized from the settings (with
+    pre-ping if enabled), so every command and worker thread reuses its
+    connections.
+    Extra kwargs (profile, begin_immediate, ...) go to make_engine and key
+    a separate engine.
+    """
+    url = url or settings["url"]
+    key = (url, tuple(sorted(kwargs.items())))
+    if key not in _engines:
+        options = {"profile": settings["profile"], "echo": settings["echo"], "pool_pre_ping": settings["pool_pre_ping"]}
+        if make_url(url).database not in (None, "", ":memory:"):
+            # In-memory SQLite uses a single shared connection, not a sized pool
+            options.update(
+                pool_size=settings["pool_size"], max_overflow=settings["max_overflow"],
+                pool_timeout=settings["pool_timeout"], pool_recycle=settings["pool_recycle"],
+            )
+        options.update(kwargs)
+        _engines[key] = make_engine(url, **options)
+    return _engines[key]
+
+
+def _current_scope():
+    # One session per asyncio task when called from one, otherwise per thread
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
+def get_scoped_session(url=None):
+    """A scoped_session registry on get_engine(url): one session per thread or task."""
+    engine = get_engine(url)
+    if engine not in _scoped_sessions:
+        _scoped_sessions[engine] = scoped_session(sessionmaker(bind=engine), scopefunc=_current_scope)
+    return _scoped_sessions[engine]
+
+
+def get_shards():
+    """The ShardSet over the configured database (a single shard unless settings['shards'] > 1).
+
+    Built once per process; a sharded one first recovers interrupted trade settlements.
+    """
+    global _shards
+    if _shards is None:
+        from lib.sharding import ShardSet, shard_urls, SETTLEMENT_TIMEOUT_SECONDS
+        _shards = ShardSet(shard_urls(settings["url"], settings["shards"]))
+        if _shards.count > 1:
+            # Finish or roll back trades a crashed process left half-settled
+            _shards.recover_settlements(min_age=SETTLEMENT_TIMEOUT_SECONDS)
+    return _shards
+
+
+@contextlib.contextmanager
+def session_scope(username=None, player_id=None):
+    """Yields this thread's (or task's) session and commits it, or rolls back on error.
+
+    With a username or player_id the session is on that player's shard.
+    Nested scopes share the outer session; only the outermost one commits
+    and then releases the session back to the registry.
+    """
+    registry = Session
+    if settings["shards"] > 1 and (username is not None or player_id is not None):
+        shards = get_shards()
+        if player_id is not None:
+            shard = shards.shard_for_player(player_id)
+        else:
+            # Unknown usernames get shard 0, where the command finds no such player
+            found = shards.locate(username)
+            shard = found[1] if found else 0
+        registry = get_scoped_session(shards.urls[shard])
+
+    session = registry()
+    depth = session.info.get("scope_depth", 0)
+    session.info["scope_depth"] = depth + 1
+    try:
+        yield session
+        if not depth:
+            session.commit()
+    except BaseException:
+        if not depth:
+            session.rollback()
+        raise
+    finally:
+        session.info["scope_depth"] = depth
+        if not depth:
+            registry.remove()
+
 
 # Set up the engine and session
-engine = create_engine("sqlite:///db/monsters.db")
-Session = sessionmaker(bind=engine)
-Base = declarative_base()
+engine = get_engine()
+Session = get_scoped_session()
@@ -1,6 +1,4 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from lib.models import Base
+from lib.config import settings, Session, get_shards
 import os
 import logging
 
@@ -8,29 +6,48 @@ import logging
 logging.basicConfig()
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
-DB_PATH = 'sqlite:///monster_game.db'
-engine = create_engine(DB_PATH, echo=False)
-Session = sessionmaker(bind=engine)
+# One source of truth: lib.config reads monster_game.ini / MONSTER_DB_* for all of these
+DB_PATH = settings['url']
+# Player-scoped tables are split over this many files (see lib/sharding.py)
+SHARD_COUNT = settings['shards']
+
+# Shard 0 (lib.config.engine, Session) is the only file when unsharded; it always holds the
+# species, achievements and player directory
+shards = get_shards()
 
 def init_db(drop_existing=False):
     """Initialize database with optional dropping of existing tables"""
     try:
-        if drop_existing and os.path.exists('monster_game.db'):
-            os.remove('monster_game.db')
-        Base.metadata.create_all(engine)
+        if drop_existing:
+            shards.dispose()
+            for url in shards.urls:
+                path = url[len('sqlite:///'):]
+                if os.path.exists(path):
+                    os.remove(path)
+        shards.create_all()
+        shards.recover_settlements()
         print("✅ Database initialized successfully!")
         return True
     except Exception as e:
         print(f"❌ Database initialization failed: {str(e)}")
         return False
 
-def get_session():
-    """Provide a new database session with error handling"""
+def get_session(player_id=None, username=None):
+    """Provide a database session with error handling.
+
+    With a player_id or username, the session is on that player's shard;
+    otherwise it is this thread's session on shard 0. Returns None for an
+    unknown username.
+    """
     try:
+        if player_id is not None:
+            return shards.session_for_player(player_id)
+        if username is not None:
+            return shards.session_for_username(username)
         return Session()
     except Exception as e:
         print(f"❌ Failed to create database session: {str(e)}")
         return None
 
 if __name__ == '__main__':
-    init_db(drop_existing=True)
\ No newline at end of file
+    init_db(drop_existing=True)
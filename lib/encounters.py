@@ -0,0 +1,96 @@
+# encounters.py
+
+import random
+from lib.models import MonsterRarity, MonsterType
+from lib.species import Species, get_catalog
+
+# Relative encounter weight per rarity tier
+RARITY_WEIGHTS = {
+    MonsterRarity.COMMON: 50,
+    MonsterRarity.UNCOMMON: 25,
+    MonsterRarity.RARE: 10,
+    MonsterRarity.EPIC: 4,
+    MonsterRarity.LEGENDARY: 1,
+}
+
+# Biomes boost the types that live there; unlisted types keep weight 1.0
+BIOME_TYPE_WEIGHTS = {
+    'volcano': {MonsterType.FIRE: 3.0, MonsterType.EARTH: 1.5, MonsterType.WATER: 0.5},
+    'lake': {MonsterType.WATER: 3.0, MonsterType.GRASS: 1.5, MonsterType.FIRE: 0.5},
+    'forest': {MonsterType.GRASS: 3.0, MonsterType.AIR: 1.5},
+    'plains': {MonsterType.ELECTRIC: 2.0, MonsterType.AIR: 2.0},
+    'mountain': {MonsterType.EARTH: 3.0, MonsterType.AIR: 1.5},
+}
+
+# Encounters hand out the catalog's detached species snapshots
+EncounterSpecies = Species
+
+
+class AliasSampler:
+    """Walker's alias method: O(n) setup, O(1) weighted draws."""
+
+    def __init__(self, items, weights):
+        if not items:
+            raise ValueError("AliasSampler needs at least one item")
+        n = len(items)
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("AliasSampler needs a positive total weight")
+        scaled = [w * n / total for w in weights]
+        self.items = list(items)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = rng.randrange(len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+# ---- Encounter Table ----
+# Samplers are built per catalog version, so species changes drop them
+_samplers = {}
+_samplers_version = None
+
+
+def get_encounter_sampler(session, biome=None, type_weights=None):
+    """Returns a cached AliasSampler over all species for the given biome/type weights."""
+    global _samplers_version
+    if biome is not None and biome not in BIOME_TYPE_WEIGHTS:
+        raise ValueError(f"Unknown biome '{biome}'")
+    key = (biome, tuple(sorted((t.value, w) for t, w in (type_weights or {}).items())))
+    catalog = get_catalog(session)
+    if _samplers_version != catalog.version:
+        _samplers.clear()
+        _samplers_version = catalog.version
+    sampler = _samplers.get(key)
+    if sampler is None:
+        species = catalog.species
+        if not species:
+            return None
+        biome_weights = BIOME_TYPE_WEIGHTS.get(biome, {})
+        weights = [
+            RARITY_WEIGHTS.get(s.rarity, 1)
+            * biome_weights.get(s.type, 1.0)
+            * (type_weights or {}).get(s.type, 1.0)
+            for s in species
+        ]
+        sampler = _samplers[key] = AliasSampler(species, weights)
+    return sampler
+
+
+def random_encounter(session, biome=None, type_weights=None):
+    """Picks a wild species in constant time, or None if no species exist."""
+    sampler = get_encounter_sampler(session, biome, type_weights)
+    return sampler.sample() if sampler else None
+
@@ -0,0 +1,278 @@
+# export.py
+# Columnar snapshots of the game tables for off-line analytics
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import create_engine, select, literal_column, Integer, String, DateTime
+from lib.models import Player, PlayerMonster, Trade, Battle, PlayerAchievement
+
+FORMATS = ('arrow', 'npz', 'parquet')
+DEFAULT_CHUNK_SIZE = 50000
+MANIFEST = 'manifest.json'
+REPLICA_PAGES_PER_STEP = 1024
+
+# How each table is exported:
+#   'snapshot' - rows change after insert (levels, money, trade status), so every run rewrites the table
+#   'id'       - append-only; each run adds the rows past the last exported id
+#   'rowid'    - append-only without an id column; each run adds the rows past the last exported SQLite rowid
+EXPORT_TABLES = {
+    'players': (Player.__table__, 'snapshot'),
+    'player_monsters': (PlayerMonster.__table__, 'snapshot'),
+    'trades': (Trade.__table__, 'snapshot'),
+    'battles': (Battle.__table__, 'id'),
+    'player_achievements': (PlayerAchievement.__table__, 'rowid'),
+}
+
+# Packed turn records are only useful to lib.battle_log; battle_log keeps the readable text
+SKIPPED_COLUMNS = {'battles': ('log_data',)}
+
+
+def export_columns(name):
+    table, _ = EXPORT_TABLES[name]
+    skipped = SKIPPED_COLUMNS.get(name, ())
+    return [column for column in table.columns if column.name not in skipped]
+
+
+def _watermark_key(name, mode):
+    """The increasing column that append-only exports continue from."""
+    table, _ = EXPORT_TABLES[name]
+    if mode == 'id':
+        return table.c.id
+    # Insert order, like an id; unlock times can tie, go backwards or be NULL
+    return literal_column(f"{table.name}.rowid", Integer)
+
+
+def _order_and_watermark(name, mode, watermark):
+    """ORDER BY key and the WHERE clause that skips rows already exported."""
+    table, _ = EXPORT_TABLES[name]
+    if mode == 'snapshot':
+        return tuple(table.primary_key.columns), None
+    key = _watermark_key(name, mode)
+    return (key,), (key > watermark if watermark is not None else None)
+
+
+def _watermark_value(mode, last_row, columns):
+    """JSON-safe watermark for the last row exported, or None if it has no key."""
+    if mode == 'id':
+        return dict(zip([column.name for column in columns], last_row))['id']
+    # The rowid is selected after the exported columns
+    return last_row[len(columns)]
+
+
+# ---- Writers ----
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Arrow and Parquet exports need pyarrow (pip install pyarrow); use --format npz without it")
+    return pyarrow
+
+
+def _arrow_schema(pa, columns):
+    def arrow_type(column):
+        if isinstance(column.type, Integer):
+            return pa.int64()
+        if isinstance(column.type, DateTime):
+            return pa.timestamp('us')
+        if isinstance(column.type, String):
+            return pa.string()
+        return pa.binary()
+    return pa.schema([pa.field(column.name, arrow_type(column), nullable=column.nullable) for column in columns])
+
+
+class ArrowWriter:
+    """One Arrow IPC (Feather v2) or Parquet file per table per run; each chunk is a batch / row group."""
+
+    def __init__(self, path, columns, parquet):
+        self.pa = _require_pyarrow()
+        self.path = path
+        self.schema = _arrow_schema(self.pa, columns)
+        self.parquet = parquet
+        if parquet:
+            self.writer = self.pa.parquet.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self.writer = self.pa.ipc.new_file(path, self.schema)
+        self.files = [os.path.basename(path)]
+
+    def write(self, columns):
+        batch = self.pa.record_batch(
+            [self.pa.array(values, type=field.type) for field, values in zip(self.schema, columns)],
+            schema=self.schema,
+        )
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+class NpzWriter:
+    """One compressed .npz per chunk; a `<column>__null` mask is stored for columns holding NULLs."""
+
+    def __init__(self, path, columns):
+        self.prefix = path[:-len('.npz')]
+        self.columns = columns
+        self.files = []
+
+    def write(self, columns):
+        arrays = {}
+        for column, values in zip(self.columns, columns):
+            nulls = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+            if isinstance(column.type, DateTime):
+                # NaT stands in for NULL, so no mask is needed
+                arrays[column.name] = np.array(values, dtype='datetime64[us]')
+                continue
+            if isinstance(column.type, Integer):
+                array = np.array([0 if value is None else value for value in values], dtype=np.int64)
+            else:
+                array = np.array(['' if value is None else value for value in values], dtype=str)
+            arrays[column.name] = array
+            if nulls.any():
+                arrays[f"{column.name}__null"] = nulls
+        filename = f"{self.prefix}-{len(self.files):05d}.npz"
+        np.savez_compressed(filename, **arrays)
+        self.files.append(os.path.basename(filename))
+
+    def close(self):
+        pass
+
+
+def _open_writer(fmt, path, columns):
+    if fmt == 'npz':
+        return NpzWriter(path, columns)
+    return ArrowWriter(path, columns, parquet=(fmt == 'parquet'))
+
+
+# ---- Manifest ----
+def load_manifest(out_dir):
+    """The manifest of a previous export into out_dir, or None."""
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(out_dir, manifest):
+    # Written to a temp file and renamed, so a crash never leaves a half-written manifest
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+# ---- Read Replica ----
+def refresh_replica(engine, path, pages=REPLICA_PAGES_PER_STEP, pause=0.0):
+    """Copies the live SQLite database to path with the online backup API.
+
+    The copy runs a few pages at a time and releases its lock between steps,
+    so players keep writing while it runs. Returns an engine on the copy.
+    """
+    source = engine.raw_connection()
+    target = sqlite3.connect(path)
+    try:
+        source.driver_connection.backup(target, pages=pages, sleep=pause)
+    finally:
+        target.close()
+        source.close()
+    return create_engine(f"sqlite:///{path}")
+
+
+# ---- Export ----
+def export_snapshot(engine, out_dir, fmt='parquet', tables=None, chunk_size=DEFAULT_CHUNK_SIZE, full=False):
+    """Streams the analytics tables from engine into columnar files under out_dir.
+
+    Every table is read in one transaction, so the files form a consistent
+    snapshot. Under WAL that does not block players' writes, but it holds
+    back checkpoints for as long as it runs; for big exports, refresh a
+    replica with refresh_replica() and export from that instead.
+    Rows are fetched chunk_size at a time, so memory stays bounded whatever
+    the table size. Append-only tables continue from the watermarks
+    in the previous run's manifest unless full is set; the others are
+    rewritten each run. Returns {table: rows written this run}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    if fmt != 'npz':
+        _require_pyarrow()
+    tables = list(tables or EXPORT_TABLES)
+    for name in tables:
+        if name not in EXPORT_TABLES:
+            raise ValueError(f"Unknown export table {name!r}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    if full or manifest is None or manifest.get('format') != fmt:
+        manifest = {'format': fmt, 'runs': 0, 'tables': {}}
+    run = manifest['runs'] + 1
+    counts = {}
+
+    with engine.connect() as connection, connection.begin():
+        # pysqlite defers BEGIN until the first write; start the read transaction now
+        # so every table comes from the same snapshot
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+        for name in tables:
+            _, mode = EXPORT_TABLES[name]
+            columns = export_columns(name)
+            state = manifest['tables'].get(name)
+            if state is None or state['mode'] != mode:
+                # New table, or exported under another mode whose watermark means something else
+                state = {'mode': mode, 'files': [], 'rows': 0, 'watermark': None}
+            table_dir = os.path.join(out_dir, name)
+            os.makedirs(table_dir, exist_ok=True)
+            if mode == 'snapshot':
+                state.update(files=[], rows=0)
+
+            key, skip_exported = _order_and_watermark(name, mode, state['watermark'])
+            query = select(*columns, *([key[0]] if mode == 'rowid' else [])).order_by(*key)
+            if skip_exported is not None:
+                query = query.where(skip_exported)
+            result = connection.execution_options(stream_results=True).execute(query)
+
+            writer = None
+            rows = 0
+            last_row = None
+            for chunk in result.partitions(chunk_size):
+                if writer is None:
+                    writer = _open_writer(fmt, os.path.join(table_dir, f"run-{run:05d}.{fmt}"), columns)
+                writer.write(list(zip(*chunk))[:len(columns)])
+                rows += len(chunk)
+                last_row = chunk[-1]
+            if writer is not None:
+                writer.close()
+                state['files'].extend(writer.files)
+            if last_row is not None and mode != 'snapshot':
+                # Keep the old watermark rather than restart from the beginning
+                watermark = _watermark_value(mode, last_row, columns)
+                if watermark is not None:
+                    state['watermark'] = watermark
+
+            state['rows'] += rows
+            manifest['tables'][name] = state
+            counts[name] = rows
+
+    manifest['runs'] = run
+    manifest['exported_at'] = datetime.now(timezone.utc).isoformat()
+    _save_manifest(out_dir, manifest)
+
+    # Only once the new manifest is in place: drop superseded runs of rewritten
+    # tables and leftovers of interrupted runs
+    for name in tables:
+        table_dir = os.path.join(out_dir, name)
+        for filename in os.listdir(table_dir):
+            if filename not in manifest['tables'][name]['files']:
+                os.remove(os.path.join(table_dir, filename))
+    return counts
+
+
+def read_npz_table(out_dir, name):
+    """Loads every NPZ chunk of an exported table into one dict of column arrays."""
+    manifest = load_manifest(out_dir)
+    parts = [np.load(os.path.join(out_dir, name, filename)) for filename in manifest['tables'][name]['files']]
+    names = [column.name for column in export_columns(name)]
+    return {column: np.concatenate([part[column] for part in parts]) if parts else np.array([]) for column in names}
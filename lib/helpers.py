@@ -1,8 +1,11 @@
 # helpers.py
 
 import random
-from sqlalchemy.orm import Session, joinedload
-from lib.models import Player, PlayerMonster, Trade, Battle, MonsterType, MonsterRarity, MonsterSpecies, Achievement
+from sqlalchemy import func, select
+from lib.models import PlayerMonster, Trade, MonsterType
+from lib.achievements import evaluate_all, queue_unlock, flush_unlocks
+from lib.trading import settle_trade
+from lib.species import get_species
 
 # ---- Stat Calculation ----
 def calculate_current_stats(base_hp, base_attack, base_defense, level):
@@ -14,14 +17,58 @@ def calculate_current_stats(base_hp, base_attack, base_defense, level):
     }
 
 # ---- Type Effectiveness (Example logic) ----
+TYPE_CHART = {
+    'Fire': {'Grass': 2.0, 'Water': 0.5},
+    'Water': {'Fire': 2.0, 'Electric': 0.5},
+    'Grass': {'Water': 2.0, 'Fire': 0.5},
+}
+
 def get_type_effectiveness_multiplier(attacker_type, defender_type):
     """Returns damage multiplier based on types (example logic)."""
-    type_chart = {
-        'Fire': {'Grass': 2.0, 'Water': 0.5},
-        'Water': {'Fire': 2.0, 'Electric': 0.5},
-        'Grass': {'Water': 2.0, 'Fire': 0.5},
+    if isinstance(attacker_type, MonsterType):
+        attacker_type = attacker_type.value
+    if isinstance(defender_type, MonsterType):
+        defender_type = defender_type.value
+    return TYPE_CHART.get(attacker_type, {}).get(defender_type, 1.0)
+
+
+# ---- Player Summary ----
+def get_player_summary(session, player_id):
+    """Returns collection stats for a player from one GROUP BY query.
+
+    Groups by species_id and rolls the groups up by type and rarity from
+    the species catalog, so no join is needed. Relies on SQLite's
+    bare-column rule: alongside max(level), nickname and id come from the
+    row that holds the maximum in each group.
+    """
+    rows = session.query(
+        PlayerMonster.species_id,
+        func.count(PlayerMonster.id),
+        func.coalesce(func.sum(PlayerMonster.experience), 0),
+        func.max(PlayerMonster.level),
+        PlayerMonster.nickname,
+        PlayerMonster.id,
+    ).filter(PlayerMonster.player_id == player_id) \
+        .group_by(PlayerMonster.species_id) \
+        .all()
+
+    summary = {
+        'monster_count': 0,
+        'total_experience': 0,
+        'highest_monster': None,
+        'by_type': {},
+        'by_rarity': {},
     }
-    return type_chart.get(attacker_type, {}).get(defender_type, 1.0)
+    for species_id, count, experience, max_level, nickname, monster_id in rows:
+        species = get_species(session, species_id)
+        summary['monster_count'] += count
+        summary['total_experience'] += experience
+        summary['by_type'][species.type.value] = summary['by_type'].get(species.type.value, 0) + count
+        summary['by_rarity'][species.rarity.value] = summary['by_rarity'].get(species.rarity.value, 0) + count
+        highest = summary['highest_monster']
+        if highest is None or max_level > highest['level']:
+            summary['highest_monster'] = {'id': monster_id, 'nickname': nickname, 'level': max_level}
+    return summary
 
 
 # ---- Trading System ----
@@ -40,55 +87,100 @@ def propose_trade(session, from_player_id, to_player_id, offered_monster_id, req
 
 
 def accept_trade(session, trade_id):
-    """Completes a pending trade."""
-    trade = session.query(Trade).get(trade_id)
-    if not trade or trade.status != "pending":
-        return False
+    """Completes a pending trade; between players on different shards, by two-phase commit.
 
-    offered = trade.offered_monster
-    requested = trade.requested_monster
-    offered.player_id, requested.player_id = requested.player_id, offered.player_id
-
-    trade.status = "completed"
-    session.commit()
-    return True
+    session must be on the shard that stores the trade (its proposer's).
+    """
+    from lib.config import settings, get_shards
+    if settings["shards"] > 1:
+        shards = get_shards()
+        shard = shards.shard_of(session.get_bind())
+        if shard is not None:
+            # ShardSet.settle_trade runs its own transactions; end ours so it sees our writes
+            session.commit()
+            return shards.settle_trade(shard, trade_id)
+    return settle_trade(session, trade_id)
 
 
 # ---- Battle System ----
-def create_ai_opponent(session, difficulty="easy"):
-    """Generates an AI opponent with monsters based on difficulty."""
-    level_limits = {"easy": 5, "medium": 10, "hard": 15}
-    max_level = level_limits.get(difficulty, 5)
-
-    ai_monsters = (
-        session.query(PlayerMonster)
-        .filter(PlayerMonster.level <= max_level)
-        .order_by(func.random())
-        .limit(3)
+AI_LEVEL_LIMITS = {"easy": 5, "medium": 10, "hard": 15}
+
+def _draw_by_level_counts(session, max_level, count, exclude):
+    """Draws up to count eligible monster ids not in exclude, uniformly, from per-level counts.
+
+    The counts come from the (level, id) index; each pick is an offset
+    into one level's run of it, so a level is chosen in proportion to how
+    many monsters it holds.
+    """
+    level_counts = session.query(PlayerMonster.level, func.count(PlayerMonster.id)) \
+        .filter(PlayerMonster.level.between(1, max_level)) \
+        .group_by(PlayerMonster.level) \
         .all()
-    )
+    eligible = sum(level_count for _, level_count in level_counts)
+
+    picked_ids = []
+    # Enough positions to cover every excluded monster plus the picks
+    for position in random.sample(range(eligible), min(eligible, count + len(exclude))):
+        if len(picked_ids) >= count:
+            break
+        for level, level_count in level_counts:
+            if position < level_count:
+                break
+            position -= level_count
+        monster_id = session.query(PlayerMonster.id).filter(PlayerMonster.level == level) \
+            .order_by(PlayerMonster.id).offset(position).limit(1).scalar()
+        if monster_id is not None and monster_id not in exclude:
+            picked_ids.append(monster_id)
+    return picked_ids
+
+
+def create_ai_opponent(session, difficulty="easy", team_size=3, max_attempts=None):
+    """Generates an AI opponent with monsters based on difficulty.
+
+    Probes max_attempts random ids (default 20 per team slot) in one
+    primary-key lookup and keeps the first that exist at or below the
+    difficulty cap, so every eligible monster is equally likely and the
+    cost does not grow with the table. When too few probes hit because few
+    monsters qualify, the rest are drawn from per-level counts, so the team
+    is only short when fewer than team_size monsters are eligible.
+    Needs an unsharded database: one shard holds only some players' monsters.
+    """
+    from lib.config import settings
+    if settings["shards"] > 1:
+        raise RuntimeError("AI opponents draw from every player's monsters and need an unsharded database")
+    max_level = AI_LEVEL_LIMITS.get(difficulty, 5)
+    max_attempts = max_attempts if max_attempts is not None else 20 * team_size
+    # Separate queries: SQLite only short-circuits a lone min()/max() aggregate
+    min_id = session.query(func.min(PlayerMonster.id)).scalar()
+    max_id = session.query(func.max(PlayerMonster.id)).scalar()
+    if min_id is None:
+        return []
+
+    # All probes in one IN lookup; hits are taken in draw order
+    probes = [random.randint(min_id, max_id) for _ in range(max_attempts)]
+    hits = set(session.scalars(select(PlayerMonster.id).where(
+        PlayerMonster.id.in_(probes), PlayerMonster.level.between(1, max_level),
+    )))
+    picked_ids = [monster_id for monster_id in dict.fromkeys(probes) if monster_id in hits][:team_size]
+    if len(picked_ids) < team_size:
+        picked_ids += _draw_by_level_counts(session, max_level, team_size - len(picked_ids), set(picked_ids))
+
+    if not picked_ids:
+        return []
+    # Species come from lib.species.get_species rather than a joined load
+    ai_monsters = session.query(PlayerMonster).filter(PlayerMonster.id.in_(picked_ids)).all()
     return ai_monsters
 
 
 # ---- Achievement System ----
 def check_achievements(session, player_id):
     """Checks if player unlocked any achievements."""
-    player = session.query(Player).options(joinedload(Player.monsters)).get(player_id)
-
-    if len(player.monsters) >= 5:
-        unlock_achievement(session, player_id, "Collector")
-    
-    if any(pm.level >= 10 for pm in player.monsters):
-        unlock_achievement(session, player_id, "Trainer")
-
- 
+    newly_unlocked = evaluate_all(session, player_id)
+    flush_unlocks(session)
+    return newly_unlocked
 
 
 def unlock_achievement(session, player_id, achievement_name):
     """Grants an achievement to a player."""
-    player = session.query(Player).get(player_id)
-    achievement = session.query(Achievement).filter_by(name=achievement_name).first()
-
-    if achievement and achievement not in player.achievements:
-        player.achievements.append(achievement)
-        session.commit()
+    if queue_unlock(session, player_id, achievement_name):
+        flush_unlocks(session)
@@ -0,0 +1,151 @@
+# importer.py
+
+import csv
+import json
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from lib.models import MonsterSpecies, MonsterType, MonsterRarity, Player, PlayerMonster
+from lib.stats import get_stat_table
+from lib.achievements import reset_player_counters
+from lib.sharding import player_directory, register_usernames, register_existing_players
+
+SPECIES_FIELDS = ('name', 'type', 'base_hp', 'base_attack', 'base_defense', 'base_speed', 'rarity', 'abilities')
+
+
+# ---- Streaming Readers ----
+def iter_records(path):
+    """Yields dicts from a .csv or .jsonl file one row at a time."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        elif path.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format: {path}")
+
+
+def chunked(records, size):
+    """Groups an iterable into lists of at most size items."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _enum(enum_class, value):
+    """Accepts an enum member, its name ('FIRE') or its value ('Fire')."""
+    if isinstance(value, enum_class):
+        return value
+    try:
+        return enum_class[value.upper()]
+    except KeyError:
+        return enum_class(value)
+
+
+# ---- Species ----
+def import_species(session, records, chunk_size=1000):
+    """Bulk-inserts species, skipping names that already exist.
+
+    records is any iterable of dicts (e.g. iter_records(path) or the seed
+    list). Returns {'inserted': n, 'skipped': n}.
+    """
+    inserted = skipped = 0
+    for chunk in chunked(records, chunk_size):
+        rows = {}
+        for record in chunk:
+            row = {field: record.get(field) for field in SPECIES_FIELDS}
+            row['type'] = _enum(MonsterType, row['type'])
+            row['rarity'] = _enum(MonsterRarity, row['rarity'])
+            for stat in ('base_hp', 'base_attack', 'base_defense', 'base_speed'):
+                row[stat] = int(row[stat])
+            rows.setdefault(row['name'], row)
+
+        existing = set(session.scalars(
+            select(MonsterSpecies.name).where(MonsterSpecies.name.in_(list(rows)))
+        ))
+        new_rows = [row for name, row in rows.items() if name not in existing]
+        if new_rows:
+            session.execute(
+                sqlite_insert(MonsterSpecies).on_conflict_do_nothing(index_elements=['name']),
+                new_rows,
+            )
+        session.commit()
+        inserted += len(new_rows)
+        skipped += len(chunk) - len(new_rows)
+    return {'inserted': inserted, 'skipped': skipped}
+
+
+# ---- Player Monsters ----
+PLAYER_MONSTER_COLUMNS = (
+    'player_id', 'species_id', 'nickname', 'level', 'experience',
+    'current_hp', 'max_hp', 'attack', 'defense', 'speed',
+)
+PLAYER_MONSTER_INSERT = (
+    f"INSERT INTO {PlayerMonster.__tablename__} ({', '.join(PLAYER_MONSTER_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(PLAYER_MONSTER_COLUMNS))})"
+)
+
+
+def _resolve_player_ids(session, usernames, known):
+    """Adds {username: id} for unseen usernames to known, creating missing players.
+
+    Ids come from the player directory, as for players created any other way.
+    """
+    missing = [name for name in usernames if name not in known]
+    if not missing:
+        return known
+    connection = session.connection()
+    register_existing_players(connection)
+    registered = register_usernames(connection, missing)
+    session.execute(
+        sqlite_insert(Player).on_conflict_do_nothing(index_elements=['username']),
+        [{'id': registered[name][0], 'username': name, 'level': 1, 'experience': 0, 'money': 0} for name in missing],
+    )
+    # Players from before the directory keep the ids they already have
+    known.update(session.execute(
+        select(Player.username, Player.id).where(Player.username.in_(missing))
+    ).all())
+    return known
+
+
+def import_player_monsters(session, records, chunk_size=10000):
+    """Bulk-inserts PlayerMonster rows from dumps with username and species name.
+
+    Each record needs 'username' and 'species'; 'nickname', 'level' and
+    'experience' are optional. Stat columns are filled from the species at
+    the given level. Rows go straight to the driver's executemany as tuples.
+    Returns {'inserted': n, 'skipped': n}; rows naming an unknown species
+    are skipped.
+    """
+    species = {template.name: template for template in get_stat_table(session).values()}
+    player_directory.create(session.connection(), checkfirst=True)
+    player_ids = {}
+    inserted = skipped = 0
+    for chunk in chunked(records, chunk_size):
+        total = len(chunk)
+        chunk = [record for record in chunk if record.get('species') in species]
+        _resolve_player_ids(session, {record['username'] for record in chunk}, player_ids)
+
+        rows = []
+        for record in chunk:
+            template = species[record['species']]
+            level = int(record.get('level') or 1)
+            stats = template.at(level)
+            rows.append((
+                player_ids[record['username']], template.id,
+                record.get('nickname') or template.name, level, int(record.get('experience') or 0),
+                stats.hp, stats.hp, stats.attack, stats.defense, stats.speed,
+            ))
+        if rows:
+            session.connection().exec_driver_sql(PLAYER_MONSTER_INSERT, rows)
+        session.commit()
+        inserted += len(rows)
+        skipped += total - len(rows)
+
+    reset_player_counters()
+    return {'inserted': inserted, 'skipped': skipped}
@@ -0,0 +1,192 @@
+# instrumentation.py
+
+import contextlib
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession
+
+# A SELECT repeated this many times in one command is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = 5
+SLOWEST_KEPT = 10
+
+# The collector for the command being profiled; hooks do nothing while it is None
+_active = None
+_instrumented = set()
+
+
+class QueryStats:
+    """Everything the hooks record while one command runs."""
+
+    def __init__(self, command):
+        self.command = command
+        self.started = time.perf_counter()
+        self.wall_time = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows_written = 0
+        self.objects_loaded = 0
+        self.transactions = self.flushes = self.commits = self.rollbacks = 0
+        self.statements = {}   # sql -> [count, total seconds, slowest seconds]
+        self.parameters = {}   # sql -> parameters of its first execution, e.g. to EXPLAIN it later
+        self.slowest = []      # min-heap of (seconds, seq, sql, parameters)
+        self._seq = itertools.count()
+
+    def record(self, statement, parameters, elapsed, rowcount, executemany=False):
+        self.queries += 1
+        self.db_time += elapsed
+        if rowcount > 0 and not statement.lstrip().upper().startswith("SELECT"):
+            self.rows_written += rowcount
+        if statement not in self.parameters:
+            self.parameters[statement] = parameters[0] if executemany and parameters else parameters
+        totals = self.statements.setdefault(statement, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] = max(totals[2], elapsed)
+        entry = (elapsed, next(self._seq), statement, repr(parameters)[:200])
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    def n_plus_one(self):
+        """SELECTs issued N_PLUS_ONE_THRESHOLD+ times: usually a lazy load in a loop."""
+        return sorted(
+            (
+                {'statement': sql, 'count': count, 'total_ms': total * 1000}
+                for sql, (count, total, _) in self.statements.items()
+                if count >= N_PLUS_ONE_THRESHOLD and sql.lstrip().upper().startswith("SELECT")
+            ),
+            key=lambda item: -item['count'],
+        )
+
+    def report(self):
+        wall_time = self.wall_time if self.wall_time is not None else time.perf_counter() - self.started
+        return {
+            'command': self.command,
+            'wall_ms': wall_time * 1000,
+            'queries': self.queries,
+            'distinct_statements': len(self.statements),
+            'db_ms': self.db_time * 1000,
+            'rows_written': self.rows_written,
+            'objects_loaded': self.objects_loaded,
+            'transactions': self.transactions,
+            'flushes': self.flushes,
+            'commits': self.commits,
+            'rollbacks': self.rollbacks,
+            'n_plus_one': self.n_plus_one(),
+            'slowest': [
+                {'ms': elapsed * 1000, 'statement': sql, 'parameters': parameters}
+                for elapsed, _, sql, parameters in sorted(self.slowest, reverse=True)
+            ],
+            'statements': sorted(
+                (
+                    {'statement': sql, 'count': count, 'total_ms': total * 1000, 'max_ms': slowest * 1000}
+                    for sql, (count, total, slowest) in self.statements.items()
+                ),
+                key=lambda item: -item['total_ms'],
+            ),
+        }
+
+
+# ---- Hooks ----
+def instrument(engine=Engine):
+    """Attaches the cursor hooks to engine (once); cheap no-ops unless profiling.
+
+    The default, the Engine class, covers every engine in the process, including
+    shard and write-behind engines created after this call.
+    """
+    if engine in _instrumented:
+        return engine
+    _instrumented.add(engine)
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    return engine
+
+
+# The start time lives on the execution context, so an engine hooked both directly
+# and through the Engine class is timed once, and nothing is left behind when
+# profiling starts or stops between the two hooks
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _active is not None and context is not None and getattr(context, '_profile_start', None) is None:
+        context._profile_start = time.perf_counter()
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profile_start', None)
+    if started is None:
+        return
+    context._profile_start = None
+    if _active is not None:
+        _active.record(statement, parameters, time.perf_counter() - started, cursor.rowcount, executemany)
+
+
+def _count(attribute):
+    def listener(*args):
+        if _active is not None:
+            setattr(_active, attribute, getattr(_active, attribute) + 1)
+    return listener
+
+# Session events fire for every Session in the process, whatever it is bound to
+event.listen(OrmSession, "after_begin", _count('transactions'))
+event.listen(OrmSession, "after_flush", _count('flushes'))
+event.listen(OrmSession, "after_commit", _count('commits'))
+event.listen(OrmSession, "after_soft_rollback", _count('rollbacks'))
+event.listen(OrmSession, "loaded_as_persistent", _count('objects_loaded'))
+
+
+# ---- Profiling a Command ----
+@contextlib.contextmanager
+def profile_command(command, use_cprofile=False):
+    """Collects QueryStats (and optionally a cProfile run) for the enclosed block.
+
+    Yields the QueryStats; its .profiler holds the cProfile.Profile if requested.
+    """
+    global _active
+    stats = QueryStats(command)
+    stats.profiler = cProfile.Profile() if use_cprofile else None
+    previous, _active = _active, stats
+    if stats.profiler:
+        stats.profiler.enable()
+    try:
+        yield stats
+    finally:
+        if stats.profiler:
+            stats.profiler.disable()
+        stats.wall_time = time.perf_counter() - stats.started
+        _active = previous
+
+
+def format_report(report, statement_width=100):
+    """Renders a QueryStats report as text for the terminal."""
+    def short(sql):
+        sql = " ".join(sql.split())
+        return sql if len(sql) <= statement_width else sql[:statement_width - 3] + "..."
+
+    lines = [
+        f"\n📈 Profile: {report['command']}",
+        f"   wall {report['wall_ms']:.2f} ms | db {report['db_ms']:.2f} ms | "
+        f"{report['queries']} queries ({report['distinct_statements']} distinct)",
+        f"   {report['objects_loaded']} objects loaded | {report['rows_written']} rows written | "
+        f"{report['transactions']} transactions, {report['flushes']} flushes, "
+        f"{report['commits']} commits, {report['rollbacks']} rollbacks",
+    ]
+    if report['n_plus_one']:
+        lines.append("⚠️  Possible N+1 queries:")
+        lines.extend(f"   {item['count']}x {short(item['statement'])}" for item in report['n_plus_one'])
+    if report['slowest']:
+        lines.append("🐢 Slowest statements:")
+        lines.extend(f"   {item['ms']:8.3f} ms  {short(item['statement'])}" for item in report['slowest'][:5])
+    return "\n".join(lines)
+
+
+def format_cprofile(profiler, limit=15):
+    """Top functions by cumulative time."""
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
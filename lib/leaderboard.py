@@ -0,0 +1,155 @@
+# leaderboard.py
+
+from bisect import bisect_left, insort
+from sqlalchemy import func
+from lib.models import PlayerMonster, Battle
+from lib.achievements import add_event_listener
+
+
+class Leaderboard:
+    """Scores kept in a sorted list so rank lookups are a bisect, O(log n).
+
+    Entries are (-score, player_id), so the list runs from best to worst and
+    ties are broken by the lower player id.
+    """
+
+    def __init__(self, scores=None):
+        self.scores = dict(scores or {})
+        self.entries = sorted((-score, player_id) for player_id, score in self.scores.items())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def set_score(self, player_id, score):
+        old = self.scores.get(player_id)
+        if old == score:
+            return
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (-old, player_id))]
+        self.scores[player_id] = score
+        insort(self.entries, (-score, player_id))
+
+    def remove(self, player_id):
+        old = self.scores.pop(player_id, None)
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (-old, player_id))]
+
+    def add_score(self, player_id, delta):
+        self.set_score(player_id, self.scores.get(player_id, 0) + delta)
+
+    def rank(self, player_id):
+        """1-based rank, or None for players without a score."""
+        score = self.scores.get(player_id)
+        if score is None:
+            return None
+        return bisect_left(self.entries, (-score, player_id)) + 1
+
+    def top(self, k=10):
+        """Returns [(rank, player_id, score)] for the best k players."""
+        return [(i + 1, player_id, -neg_score) for i, (neg_score, player_id) in enumerate(self.entries[:k])]
+
+    def around(self, player_id, radius=2):
+        """Returns the entries within radius places of player_id."""
+        rank = self.rank(player_id)
+        if rank is None:
+            return []
+        start = max(0, rank - 1 - radius)
+        return [
+            (start + i + 1, pid, -neg_score)
+            for i, (neg_score, pid) in enumerate(self.entries[start:rank + radius])
+        ]
+
+
+# ---- Boards ----
+BOARD_QUERIES = {
+    'level': lambda session: session.query(PlayerMonster.player_id, func.max(PlayerMonster.level))
+        .group_by(PlayerMonster.player_id),
+    'xp': lambda session: session.query(PlayerMonster.player_id, func.coalesce(func.sum(PlayerMonster.experience), 0))
+        .group_by(PlayerMonster.player_id),
+    'collection': lambda session: session.query(PlayerMonster.player_id, func.count(PlayerMonster.id))
+        .group_by(PlayerMonster.player_id),
+    'wins': lambda session: session.query(Battle.winner_id, func.count(Battle.id))
+        .filter(Battle.winner_id.isnot(None)).group_by(Battle.winner_id),
+}
+
+# The column each board's query groups by, to rebuild single players
+BOARD_PLAYER_COLUMNS = {
+    'level': PlayerMonster.player_id,
+    'xp': PlayerMonster.player_id,
+    'collection': PlayerMonster.player_id,
+    'wins': Battle.winner_id,
+}
+
+_boards = {}
+# Players whose score on a built board must be re-read before its next use
+_stale = {}
+
+
+def get_leaderboard(session, board):
+    """Returns the named board, building it from one aggregate the first time.
+
+    Players marked stale since the last read are re-scored with the same
+    aggregate limited to them.
+    """
+    if board not in BOARD_QUERIES:
+        raise ValueError(f"Unknown leaderboard '{board}'")
+    if board not in _boards:
+        _stale.pop(board, None)
+        _boards[board] = Leaderboard(dict(BOARD_QUERIES[board](session).all()))
+    elif _stale.get(board):
+        player_ids = _stale.pop(board)
+        scores = dict(BOARD_QUERIES[board](session).filter(BOARD_PLAYER_COLUMNS[board].in_(player_ids)).all())
+        for player_id in player_ids:
+            if player_id in scores:
+                _boards[board].set_score(player_id, scores[player_id])
+            else:
+                _boards[board].remove(player_id)
+    return _boards[board]
+
+
+def reset_leaderboards():
+    _boards.clear()
+    _stale.clear()
+
+
+def invalidate_board(board):
+    """Drops one board so the next read rebuilds it, after bulk changes."""
+    _boards.pop(board, None)
+    _stale.pop(board, None)
+
+
+def mark_stale(player_id, *boards):
+    """Has the next read of each built board re-score player_id."""
+    for board in boards:
+        if board in _boards:
+            _stale.setdefault(board, set()).add(player_id)
+
+
+def record_xp(player_totals):
+    """Adds (player_id, xp) totals to the xp board, if it has been built."""
+    xp = _boards.get('xp')
+    if xp is not None:
+        for player_id, amount in player_totals:
+            xp.add_score(player_id, amount)
+
+
+def _on_game_event(player_id, event, counters, level):
+    """Keeps built boards in step with committed game events."""
+    if event == 'catch':
+        if 'collection' in _boards:
+            _boards['collection'].set_score(player_id, counters['monster_count'])
+        if 'level' in _boards:
+            # A first catch puts the player on the board; new monsters start at level 1
+            board = _boards['level']
+            board.set_score(player_id, max(board.scores.get(player_id, 0), level or 1))
+    elif event == 'level_up' and 'level' in _boards:
+        # Levels only go up, so the player's current best is the old best or this monster
+        board = _boards['level']
+        board.set_score(player_id, max(board.scores.get(player_id, 0), level or 0))
+    elif event == 'trade':
+        # Monsters (and their levels and XP) changed owners; re-read both sides
+        mark_stale(player_id, 'level', 'xp', 'collection')
+    elif event == 'battle_win' and 'wins' in _boards:
+        _boards['wins'].set_score(player_id, counters['battles_won'])
+
+add_event_listener(_on_game_event)
@@ -1,7 +1,7 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Enum as SqlEnum, MetaData
+    Column, Integer, String, ForeignKey, DateTime, Enum as SqlEnum, MetaData, Index, LargeBinary, DDL, event
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timezone
 from enum import Enum
@@ -9,6 +9,7 @@ from enum import Enum
 # Custom constraint naming convention (for cleaner migrations)
 convention = {
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+    "ix": "ix_%(table_name)s_%(column_0_N_name)s",
 }
 metadata = MetaData(naming_convention=convention)
 Base = declarative_base(metadata=metadata)
@@ -49,13 +50,38 @@ class MonsterSpecies(Base):
     def __repr__(self):
         return f"<MonsterSpecies(id={self.id}, name='{self.name}', type='{self.type.value}')>"
 
+# SpeciesCatalogVersion: one row that triggers bump on every species write, committed with it,
+# so any process can tell when its cached lib.species catalog is out of date
+class SpeciesCatalogVersion(Base):
+    __tablename__ = 'species_catalog_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+SPECIES_VERSION_DDL = [
+    "INSERT OR IGNORE INTO species_catalog_version (id, version) VALUES (1, 0)",
+] + [
+    f"CREATE TRIGGER IF NOT EXISTS trg_monster_species_{action.lower()}_version "
+    f"AFTER {action} ON monster_species "
+    "BEGIN UPDATE species_catalog_version SET version = version + 1 WHERE id = 1; END"
+    for action in ('INSERT', 'UPDATE', 'DELETE')
+]
+for _statement in SPECIES_VERSION_DDL:
+    event.listen(metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
 # PlayerMonster: user-owned monsters
 class PlayerMonster(Base):
     __tablename__ = 'player_monsters'
+    __table_args__ = (
+        Index('ix_player_monsters_level_id', 'level', 'id'),
+        Index('ix_player_monsters_player_id_level', 'player_id', 'level'),
+        Index('ix_player_monsters_player_id_id', 'player_id', 'id'),
+        Index('ix_player_monsters_player_id_nickname', 'player_id', 'nickname'),
+    )
 
     id = Column(Integer, primary_key=True)
     player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
-    species_id = Column(Integer, ForeignKey('monster_species.id'), nullable=False)
+    species_id = Column(Integer, ForeignKey('monster_species.id'), nullable=False, index=True)
 
     nickname = Column(String)
     level = Column(Integer, default=1)
@@ -99,11 +125,13 @@ class Battle(Base):
     __tablename__ = 'battles'
 
     id = Column(Integer, primary_key=True)
-    player1_id = Column(Integer, ForeignKey('players.id'), nullable=False)
-    player2_id = Column(Integer, ForeignKey('players.id'), nullable=False)
-    winner_id = Column(Integer, ForeignKey('players.id'))
+    player1_id = Column(Integer, ForeignKey('players.id'), nullable=False, index=True)
+    player2_id = Column(Integer, ForeignKey('players.id'), nullable=False, index=True)
+    winner_id = Column(Integer, ForeignKey('players.id'), index=True)
 
-    battle_log = Column(String)
+    # Logs are only loaded on access; log_data holds packed turn records (see lib.battle_log)
+    battle_log = deferred(Column(String))
+    log_data = deferred(Column(LargeBinary))
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     player1 = relationship("Player", foreign_keys=[player1_id], back_populates="battles_as_player1")
@@ -118,12 +146,12 @@ class Trade(Base):
     __tablename__ = 'trades'
 
     id = Column(Integer, primary_key=True)
-    from_player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
-    to_player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    from_player_id = Column(Integer, ForeignKey('players.id'), nullable=False, index=True)
+    to_player_id = Column(Integer, ForeignKey('players.id'), nullable=False, index=True)
     offered_monster_id = Column(Integer, ForeignKey('player_monsters.id'), nullable=False)
     requested_monster_id = Column(Integer, ForeignKey('player_monsters.id'), nullable=False)
 
-    status = Column(String, default="pending")
+    status = Column(String, default="pending", index=True)
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     from_player = relationship("Player", foreign_keys=[from_player_id], back_populates="trades_as_from_player")
@@ -153,5 +181,34 @@ class PlayerAchievement(Base):
     __tablename__ = 'player_achievements'
 
     player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
-    achievement_id = Column(Integer, ForeignKey('achievements.id'), primary_key=True)
+    achievement_id = Column(Integer, ForeignKey('achievements.id'), primary_key=True, index=True)
     unlocked_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+# XpGrant: append-only ledger of experience awards, applied in batches by lib.progression
+class XpGrant(Base):
+    __tablename__ = 'xp_grants'
+
+    id = Column(Integer, primary_key=True)
+    # NULL once the monster has been traded to another shard; the grant still counts for player_id
+    player_monster_id = Column(Integer, ForeignKey('player_monsters.id'), nullable=True, index=True)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    amount = Column(Integer, nullable=False)
+    source = Column(String, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<XpGrant(id={self.id}, monster={self.player_monster_id}, amount={self.amount}, source='{self.source}')>"
+
+# ProgressionRun: one row per batch applied; last_grant_id is the ledger watermark
+class ProgressionRun(Base):
+    __tablename__ = 'progression_runs'
+
+    id = Column(Integer, primary_key=True)
+    last_grant_id = Column(Integer, nullable=False)
+    grants_applied = Column(Integer, nullable=False)
+    monsters_updated = Column(Integer, nullable=False)
+    levels_gained = Column(Integer, nullable=False)
+    finished_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<ProgressionRun(id={self.id}, last_grant_id={self.last_grant_id})>"
@@ -0,0 +1,163 @@
+# progression.py
+
+from sqlalchemy import MetaData, Table, Column, Integer, select, insert, update, delete, func
+from lib.models import PlayerMonster, MonsterSpecies, Player, XpGrant, ProgressionRun
+from lib.helpers import calculate_current_stats
+from lib.stats import MAX_LEVEL
+from lib.leaderboard import record_xp, invalidate_board
+from lib.achievements import reset_player_counters
+
+XP_PER_LEVEL = 100
+XP_REWARDS = {
+    'catch': 10,
+    'battle_win': 30,
+    'battle_loss': 10,
+}
+
+# Per-connection scratch table holding one batch's per-monster totals and new levels
+xp_batch = Table(
+    'xp_batch', MetaData(),
+    Column('monster_id', Integer, primary_key=True),
+    Column('player_id', Integer, nullable=False),
+    Column('xp', Integer, nullable=False),
+    Column('old_level', Integer, nullable=False),
+    Column('new_level', Integer, nullable=False),
+    prefixes=['TEMPORARY'],
+)
+
+
+def level_for_experience(experience):
+    """Level reached with this much XP: one level per XP_PER_LEVEL, capped at MAX_LEVEL."""
+    return min(MAX_LEVEL, 1 + experience // XP_PER_LEVEL)
+
+
+def _level_expression(level, experience):
+    # SQL form of max(level, level_for_experience(experience)); levels never go down
+    return func.max(func.coalesce(level, 1), func.min(MAX_LEVEL, 1 + experience // XP_PER_LEVEL))
+
+
+# ---- Ledger ----
+def grant_xp(session, grants):
+    """Appends (monster_id, player_id, amount, source) grants to the ledger.
+
+    Runs in the caller's transaction, so a grant commits with the catch or
+    battle that earned it. Nothing changes on the monsters until the next
+    apply_xp_grants run.
+    """
+    rows = [
+        {'player_monster_id': int(monster_id), 'player_id': int(player_id), 'amount': int(amount), 'source': source}
+        for monster_id, player_id, amount, source in grants
+    ]
+    if rows:
+        session.execute(insert(XpGrant), rows)
+    return len(rows)
+
+
+def battle_grants(monster1_id, monster2_id, player1_id, player2_id, side1_won):
+    """The two grants one battle earns: a win award and a loss award."""
+    win, loss = XP_REWARDS['battle_win'], XP_REWARDS['battle_loss']
+    return [
+        (monster1_id, player1_id, win if side1_won else loss, 'battle'),
+        (monster2_id, player2_id, loss if side1_won else win, 'battle'),
+    ]
+
+
+def pending_grants(session):
+    """Number of grants past the watermark."""
+    watermark = session.scalar(select(func.max(ProgressionRun.last_grant_id))) or 0
+    return session.scalar(select(func.count(XpGrant.id)).where(XpGrant.id > watermark))
+
+
+# ---- Batch Progression ----
+def apply_xp_grants(session, max_grants=None):
+    """Applies every grant past the watermark in a few set-based statements.
+
+    1. One GROUP BY over the new grants fills a temp table with each
+       monster's XP total and resulting level.
+    2. One UPDATE ... FROM adds the XP, sets the level and recomputes the
+       stored stat columns for all of those monsters.
+    3. One UPDATE ... FROM does the same for player XP and level.
+
+    The watermark moves in the same transaction, so every grant is applied
+    exactly once even if a run is interrupted. Returns a summary dict.
+    """
+    watermark = session.scalar(select(func.max(ProgressionRun.last_grant_id))) or 0
+    upper = session.scalar(select(func.max(XpGrant.id)))
+    if max_grants is not None and upper is not None:
+        upper = min(upper, watermark + max_grants)
+    summary = {'grants_applied': 0, 'monsters_updated': 0, 'players_updated': 0, 'levels_gained': 0}
+    if upper is None or upper <= watermark:
+        return summary
+
+    in_batch = (XpGrant.id > watermark, XpGrant.id <= upper)
+    connection = session.connection()
+    xp_batch.create(connection, checkfirst=True)
+    session.execute(delete(xp_batch))
+
+    totals = (
+        select(XpGrant.player_monster_id.label('monster_id'), func.sum(XpGrant.amount).label('xp'))
+        .where(*in_batch).group_by(XpGrant.player_monster_id).subquery()
+    )
+    session.execute(insert(xp_batch).from_select(
+        ['monster_id', 'player_id', 'xp', 'old_level', 'new_level'],
+        select(
+            PlayerMonster.id, PlayerMonster.player_id, totals.c.xp, func.coalesce(PlayerMonster.level, 1),
+            _level_expression(PlayerMonster.level, func.coalesce(PlayerMonster.experience, 0) + totals.c.xp),
+        ).join(totals, PlayerMonster.id == totals.c.monster_id),
+    ))
+
+    scaled = calculate_current_stats(
+        MonsterSpecies.base_hp, MonsterSpecies.base_attack, MonsterSpecies.base_defense, xp_batch.c.new_level,
+    )
+    monsters = session.execute(
+        update(PlayerMonster)
+        .where(PlayerMonster.id == xp_batch.c.monster_id, PlayerMonster.species_id == MonsterSpecies.id)
+        .values(
+            experience=func.coalesce(PlayerMonster.experience, 0) + xp_batch.c.xp,
+            level=xp_batch.c.new_level,
+            max_hp=scaled['hp'],
+            # current_hp grows with max_hp, as on an interactive level-up
+            current_hp=func.min(
+                scaled['hp'],
+                func.coalesce(PlayerMonster.current_hp, scaled['hp']) + scaled['hp'] - PlayerMonster.max_hp,
+            ),
+            attack=scaled['attack'],
+            defense=scaled['defense'],
+            speed=MonsterSpecies.base_speed,
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    player_totals = (
+        select(XpGrant.player_id, func.sum(XpGrant.amount).label('xp'))
+        .where(*in_batch).group_by(XpGrant.player_id).subquery()
+    )
+    players = session.execute(
+        update(Player)
+        .where(Player.id == player_totals.c.player_id)
+        .values(
+            experience=func.coalesce(Player.experience, 0) + player_totals.c.xp,
+            level=_level_expression(Player.level, func.coalesce(Player.experience, 0) + player_totals.c.xp),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    levels_gained = session.scalar(select(func.coalesce(func.sum(xp_batch.c.new_level - xp_batch.c.old_level), 0)))
+    owner_xp = session.execute(
+        select(xp_batch.c.player_id, func.sum(xp_batch.c.xp)).group_by(xp_batch.c.player_id)
+    ).all()
+    grants = session.scalar(select(func.count(XpGrant.id)).where(*in_batch))
+    session.add(ProgressionRun(
+        last_grant_id=upper, grants_applied=grants, monsters_updated=monsters, levels_gained=levels_gained,
+    ))
+    xp_batch.drop(connection)
+    session.commit()
+
+    # Keep in-memory views in step with the new totals and levels
+    record_xp(owner_xp)
+    if levels_gained:
+        invalidate_board('level')
+        reset_player_counters()
+    summary.update(grants_applied=grants, monsters_updated=monsters, players_updated=players,
+                   levels_gained=levels_gained)
+    return summary
@@ -0,0 +1,122 @@
+# server.py
+
+import builtins
+import contextlib
+import io
+import json
+import os
+import socketserver
+import sys
+from sqlalchemy.orm import configure_mappers
+from lib.config import settings, session_scope
+from lib.encounters import get_encounter_sampler
+from lib.leaderboard import get_leaderboard, BOARD_QUERIES
+
+
+# ---- Command Execution ----
+def warm_up():
+    """Configures mappers and loads the species cache and leaderboards before the first request."""
+    configure_mappers()
+    with session_scope() as session:
+        get_encounter_sampler(session)
+        # Leaderboards are refused when sharded; shard 0 alone would give wrong ones
+        if settings["shards"] == 1:
+            for board in BOARD_QUERIES:
+                get_leaderboard(session, board)
+
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+def run_command(parser, argv, ask):
+    """Runs one CLI command in-process and returns (output, ok).
+
+    Anything the handler prints is captured, and its input() prompts are
+    answered by ask(prompt, output_buffer).
+    """
+    output = io.StringIO()
+    original_input = builtins.input
+    builtins.input = lambda prompt="": ask(prompt, output)
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            args = parser.parse_args(argv)
+            if args.command in (None, 'serve'):
+                raise ValueError("expected a game command")
+            args.func(args)
+        ok = True
+    except SystemExit as e:
+        ok = not e.code
+    except Exception as e:
+        output.write(f"❌ {e}\n")
+        ok = False
+    finally:
+        builtins.input = original_input
+    return output.getvalue(), ok
+
+
+# ---- Unix Socket Server ----
+class _CommandHandler(socketserver.StreamRequestHandler):
+    """Speaks JSON lines: {"argv": [...]} in, prompts and output back."""
+
+    def send(self, message):
+        self.wfile.write((json.dumps(message) + "\n").encode())
+        self.wfile.flush()
+
+    def ask(self, prompt, output):
+        self.send({'output': _drain(output), 'prompt': prompt})
+        reply = self.rfile.readline()
+        if not reply:
+            raise EOFError("client disconnected")
+        return json.loads(reply).get('answer', "")
+
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            output, ok = run_command(self.server.parser, request.get('argv', []), self.ask)
+            self.send({'output': output, 'ok': ok, 'done': True})
+
+
+class CommandServer(socketserver.UnixStreamServer):
+    # Commands run one at a time: they patch input() and stdout globally
+    def __init__(self, socket_path, parser):
+        self.parser = parser
+        super().__init__(socket_path, _CommandHandler)
+
+
+def serve_socket(parser, socket_path):
+    """Serves CLI commands on a Unix socket until interrupted."""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    warm_up()
+    server = CommandServer(socket_path, parser)
+    print(f"🛰️  Serving on {socket_path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+
+def serve_stdio(parser, stdin=sys.stdin, stdout=sys.stdout):
+    """Serves JSON-lines requests from stdin; prompts are answered from "answers"."""
+    warm_up()
+    for line in stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        answers = list(request.get('answers', []))
+
+        def ask(prompt, output):
+            if not answers:
+                raise EOFError(f"no answer for prompt {prompt.strip()!r}")
+            return answers.pop(0)
+
+        output, ok = run_command(parser, request.get('argv', []), ask)
+        stdout.write(json.dumps({'output': output, 'ok': ok}) + "\n")
+        stdout.flush()
@@ -0,0 +1,523 @@
+# sharding.py
+# Spreads player-scoped tables over several SQLite files, routed by player id
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, select, insert, update, delete, literal, func, or_, and_,
+)
+from sqlalchemy.orm import sessionmaker
+from lib.models import Base, Player, PlayerMonster, Trade, MonsterSpecies, Achievement, XpGrant, ProgressionRun
+from lib.config import get_engine
+from lib.trading import settle_trade
+from lib.achievements import record_event, flush_unlocks, get_achievement_ids
+from lib.progression import level_for_experience
+from lib.stats import stats_for, sync_stat_columns
+
+# Written on shard 0 and copied to every other shard, so joins stay local
+REFERENCE_TABLES = (MonsterSpecies.__table__, Achievement.__table__)
+
+trades = Trade.__table__
+player_monsters = PlayerMonster.__table__
+xp_grants = XpGrant.__table__
+
+# Undecided settlements younger than this may still be in progress in another process
+SETTLEMENT_TIMEOUT_SECONDS = 60
+
+# Trades that can still settle, and so must not outlive a monster leaving its shard
+OPEN_TRADE_STATUSES = ("pending", "accepted")
+
+# Bookkeeping tables; kept out of Base so the migrations never see them
+shard_metadata = MetaData()
+
+# Shard 0 only: hands out player ids and keeps usernames unique across shards
+player_directory = Table(
+    'player_directory', shard_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String, nullable=False, unique=True),
+    Column('shard', Integer, nullable=False),
+)
+
+# Shard 0 only: coordinator journal for cross-shard trades
+trade_settlements = Table(
+    'trade_settlements', shard_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('trade_shard', Integer, nullable=False),
+    Column('trade_id', Integer, nullable=False),
+    Column('state', String, nullable=False, index=True),   # preparing -> committed -> done, or aborted
+    Column('offered', String),                             # monster payloads, stored with the commit decision
+    Column('requested', String),
+    Column('created_at', DateTime, default=lambda: datetime.now(timezone.utc)),
+)
+
+# Every shard: monsters taken out of play while a settlement is in flight
+trade_holds = Table(
+    'trade_holds', shard_metadata,
+    Column('settlement_id', Integer, primary_key=True),
+    Column('monster_id', Integer, primary_key=True),
+    Column('player_id', Integer, nullable=False),     # owner to give it back to on abort
+    Column('payload', String, nullable=False),
+)
+
+COORDINATOR_TABLES = (player_directory, trade_settlements)
+
+
+def shard_urls(url, count):
+    """Shard 0 keeps url itself; shard i lives next to it as <name>.shard<i><ext>."""
+    root, ext = os.path.splitext(url)
+    return [url] + [f"{root}.shard{i}{ext}" for i in range(1, count)]
+
+
+# ---- Player Directory ----
+def register_usernames(connection, usernames, count=1):
+    """Enters usernames in the player directory on connection (shard 0); returns {username: (player_id, shard)}.
+
+    New usernames get the next directory id and shard id % count; ones
+    already there keep theirs. Runs in the caller's transaction.
+    """
+    usernames = list(usernames)
+    connection.execute(
+        insert(player_directory).prefix_with("OR IGNORE"),
+        [{'username': username, 'shard': -1} for username in usernames],
+    )
+    connection.execute(
+        update(player_directory)
+        .where(player_directory.c.username.in_(usernames), player_directory.c.shard == -1)
+        .values(shard=player_directory.c.id % count)
+    )
+    rows = connection.execute(
+        select(player_directory.c.username, player_directory.c.id, player_directory.c.shard)
+        .where(player_directory.c.username.in_(usernames))
+    )
+    return {row.username: (row.id, row.shard) for row in rows}
+
+
+def register_existing_players(connection):
+    """Enters players created straight on shard 0 (by code from before the directory) in the directory.
+
+    They live on shard 0, whatever their id, and the directory says so.
+    Only ids past the directory's highest are checked, so this is one index
+    seek when nothing is new. Returns the number of players added.
+    """
+    known = select(func.coalesce(func.max(player_directory.c.id), 0)).scalar_subquery()
+    return connection.execute(
+        insert(player_directory).prefix_with("OR IGNORE").from_select(
+            ['id', 'username', 'shard'],
+            select(Player.id, Player.username, literal(0)).where(Player.id > known),
+        )
+    ).rowcount
+
+
+def add_player(session, username, **fields):
+    """Adds a Player for username with an id from the directory, on an unsharded database.
+
+    For code that writes to one database directly (the importer, the async
+    front end); ShardSet.create_player does the same across shards. The
+    caller commits.
+    """
+    connection = session.connection()
+    player_directory.create(connection, checkfirst=True)
+    register_existing_players(connection)
+    player_id, _ = register_usernames(connection, [username])[username]
+    player = Player(id=player_id, username=username, **fields)
+    session.add(player)
+    return player
+
+
+def _monster_payload(row, pending_xp=0, grant_ids=()):
+    monster = {key: value for key, value in row._mapping.items() if key != 'player_id'}
+    return json.dumps(dict(monster, pending_xp=pending_xp, grant_ids=list(grant_ids)))
+
+
+def _load_payload(payload):
+    """(monster columns, XP it has yet to be given, ids of the grants it came from)."""
+    monster = json.loads(payload)
+    return monster, monster.pop('pending_xp', 0), monster.pop('grant_ids', [])
+
+
+def _with_experience(session, monster, gained):
+    """Adds XP to a monster's columns as apply_xp_grants would: new level, rescaled stats."""
+    if not gained:
+        return monster
+    old_level = monster.get('level') or 1
+    experience = (monster.get('experience') or 0) + gained
+    level = max(old_level, level_for_experience(experience))
+    monster = dict(monster, experience=experience, level=level)
+    if level != old_level:
+        stats = stats_for(session, monster['species_id'], level)
+        current_hp = monster.get('current_hp')
+        monster.update(
+            max_hp=stats.hp,
+            current_hp=min(stats.hp, (stats.hp if current_hp is None else current_hp) + stats.hp - monster['max_hp']),
+            attack=stats.attack, defense=stats.defense, speed=stats.speed,
+        )
+    return monster
+
+
+class ShardSet:
+    """One engine and sessionmaker per shard file, plus the routing rules.
+
+    Player rows and everything keyed by a player (monsters, XP grants,
+    achievements, battles they started, trades they proposed) live on the
+    shard the directory on shard 0 records for them: player_id % count for
+    players it created, 0 for players from before sharding. Player ids come
+    from the directory, so they are unique across shards; other ids are
+    only unique within their shard.
+    """
+
+    def __init__(self, urls, **engine_kwargs):
+        self.urls = list(urls)
+        self.engines = [get_engine(url, **engine_kwargs) for url in self.urls]
+        self.sessionmakers = [sessionmaker(bind=engine) for engine in self.engines]
+        self._bookkeeping_ready = False
+        # Players never move between shards, so directory lookups are cached for good
+        self._player_shards = {}
+
+    @property
+    def count(self):
+        return len(self.engines)
+
+    def session(self, shard=0):
+        return self.sessionmakers[shard]()
+
+    def shard_for_player(self, player_id):
+        """The player's shard from the directory; 0 for ids it does not know."""
+        if self.count == 1:
+            return 0
+        shard = self._player_shards.get(player_id)
+        if shard is None:
+            if not self._bookkeeping_ready:
+                self.create_bookkeeping_tables()
+            query = select(player_directory.c.shard).where(player_directory.c.id == player_id)
+            with self.engines[0].connect() as connection:
+                shard = connection.scalar(query)
+            if shard is None and self.register_existing_players():
+                with self.engines[0].connect() as connection:
+                    shard = connection.scalar(query)
+            if shard is None or shard < 0:
+                return 0
+            self._player_shards[player_id] = shard
+        return shard
+
+    def shard_of(self, bind):
+        """The shard whose engine bind is, or None."""
+        for shard, engine in enumerate(self.engines):
+            if engine is bind:
+                return shard
+        return None
+
+    def session_for_player(self, player_id):
+        return self.session(self.shard_for_player(player_id))
+
+    def create_all(self):
+        """Creates the game and bookkeeping tables on every shard.
+
+        Players already in shard 0 (a database from before sharding) are
+        entered in the directory. Only do this with one shard: raising the
+        count later does not move existing players to their new shards.
+        """
+        for engine in self.engines:
+            Base.metadata.create_all(engine)
+        self.create_bookkeeping_tables()
+        self.register_existing_players()
+        with self.session(0) as session:
+            get_achievement_ids(session)
+            session.commit()
+        self.replicate_reference_data()
+
+    def create_bookkeeping_tables(self):
+        """Creates the directory, settlement journal and holds tables where missing."""
+        for shard, engine in enumerate(self.engines):
+            tables = [trade_holds] + (list(COORDINATOR_TABLES) if shard == 0 else [])
+            shard_metadata.create_all(engine, tables=tables)
+        self._bookkeeping_ready = True
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+    # ---- Player Directory ----
+    def locate(self, username):
+        """(player_id, shard) for username, or None."""
+        if not self._bookkeeping_ready:
+            # Databases created before sharding have no directory yet
+            self.create_bookkeeping_tables()
+        query = select(player_directory.c.id, player_directory.c.shard).where(player_directory.c.username == username)
+        with self.engines[0].connect() as connection:
+            row = connection.execute(query).first()
+        if row is None and self.register_existing_players():
+            with self.engines[0].connect() as connection:
+                row = connection.execute(query).first()
+        if row is None or row.shard < 0:
+            return None
+        self._player_shards[row.id] = row.shard
+        return tuple(row)
+
+    def create_player(self, username, **fields):
+        """Registers username and creates its Player row on its shard; returns (player_id, shard).
+
+        Safe to retry: a username already in the directory gets its missing
+        Player row created instead of a second id.
+        """
+        found = self.locate(username)
+        if found is None:
+            with self.engines[0].begin() as connection:
+                found = register_usernames(connection, [username], self.count)[username]
+            self._player_shards[found[0]] = found[1]
+        player_id, shard = found
+        with self.session(shard) as session:
+            if session.get(Player, player_id) is None:
+                session.add(Player(id=player_id, username=username, **fields))
+                session.commit()
+        return found
+
+    def register_existing_players(self):
+        """Enters players created straight on shard 0 in the directory; see register_existing_players()."""
+        with self.engines[0].begin() as connection:
+            return register_existing_players(connection)
+
+    def usernames(self, player_ids):
+        """{player_id: username} from the directory, for players on any shard."""
+        query = select(player_directory.c.id, player_directory.c.username).where(
+            player_directory.c.id.in_(list(player_ids))
+        )
+        with self.engines[0].connect() as connection:
+            return dict(connection.execute(query).all())
+
+    def session_for_username(self, username):
+        """Session on username's shard, or None if the player does not exist."""
+        found = self.locate(username)
+        return self.session(found[1]) if found else None
+
+    # ---- Reference Data ----
+    def replicate_reference_data(self):
+        """Copies species and achievements from shard 0 to every other shard.
+
+        Run after seeding, importing or editing either table on shard 0.
+        Monsters on the other shards get their stored stats recomputed from
+        the copied species, as an ORM edit does on shard 0.
+        """
+        with self.engines[0].connect() as source:
+            rows = {table.name: [dict(row._mapping) for row in source.execute(select(table))]
+                    for table in REFERENCE_TABLES}
+        for engine in self.engines[1:]:
+            with engine.begin() as connection:
+                for table in REFERENCE_TABLES:
+                    connection.execute(delete(table))
+                    if rows[table.name]:
+                        connection.execute(insert(table), rows[table.name])
+                sync_stat_columns(connection)
+
+    def for_each_shard(self, fn):
+        """Runs fn(session) on every shard in turn and returns the results as a list."""
+        results = []
+        for shard in range(self.count):
+            with self.session(shard) as session:
+                results.append(fn(session))
+        return results
+
+    # ---- Cross-shard Trades ----
+    def settle_trade(self, trade_shard, trade_id):
+        """Completes a pending trade stored on trade_shard; returns False if it is gone or stale.
+
+        Trades between players on the same shard settle in one local
+        transaction. Otherwise two-phase commit, coordinated from shard 0:
+
+        1. prepare - each side moves its monster out of player_monsters into a
+           trade_holds row, so nothing else can touch it;
+        2. commit  - the coordinator records the decision together with both
+           monster payloads; from here on the trade will complete;
+        3. apply   - each shard inserts the monster it receives and drops its
+           hold in one transaction, which also makes re-applying a no-op.
+
+        Monster ids are only unique within a shard, so a monster arrives with
+        a new id. Nothing is left pointing at the old one: its unapplied XP
+        grants travel with it (the giver keeps their player XP from them),
+        and other open trades for either monster are marked 'stale'.
+
+        A crash at any point is finished (or rolled back) by recover_settlements().
+        """
+        with self.session(trade_shard) as session:
+            trade = session.execute(select(trades).where(trades.c.id == trade_id)).first()
+            if trade is None or trade.status != "pending":
+                return False
+            if self.shard_for_player(trade.to_player_id) == trade_shard:
+                return settle_trade(session, trade_id)
+
+        with self.engines[0].begin() as coordinator:
+            settlement_id = coordinator.execute(insert(trade_settlements).values(
+                trade_shard=trade_shard, trade_id=trade_id, state="preparing",
+            )).inserted_primary_key[0]
+        with self.engines[trade_shard].begin() as connection:
+            claimed = connection.execute(
+                update(trades).where(trades.c.id == trade_id, trades.c.status == "pending").values(status="settling")
+            ).rowcount
+        if not claimed:
+            self._abort(settlement_id, trade_shard, trade_id, None)
+            return False
+
+        from_shard, to_shard = self.shard_for_player(trade.from_player_id), self.shard_for_player(trade.to_player_id)
+        offered = self._prepare(from_shard, settlement_id, trade.offered_monster_id, trade.from_player_id)
+        requested = self._prepare(to_shard, settlement_id, trade.requested_monster_id, trade.to_player_id)
+        if offered is None or requested is None:
+            # One side no longer owns its monster
+            self._abort(settlement_id, trade_shard, trade_id, "stale")
+            return False
+
+        with self.engines[0].begin() as coordinator:
+            committed = coordinator.execute(
+                update(trade_settlements)
+                .where(trade_settlements.c.id == settlement_id, trade_settlements.c.state == "preparing")
+                .values(state="committed", offered=offered, requested=requested)
+            ).rowcount
+        if not committed:
+            # Recovery in another process rolled it back; release what we held since
+            self._abort(settlement_id, trade_shard, trade_id, None)
+            return False
+        self._apply(settlement_id)
+        return True
+
+    def _prepare(self, shard, settlement_id, monster_id, owner_id):
+        """Moves one monster into a hold; returns its JSON payload, or None if owner_id no longer has it.
+
+        Its XP grants past the shard's progression watermark go into the
+        payload and are detached from it here; they keep counting towards
+        their players' XP.
+        """
+        with self.engines[shard].begin() as connection:
+            row = connection.execute(
+                select(player_monsters).where(player_monsters.c.id == monster_id, player_monsters.c.player_id == owner_id)
+            ).first()
+            if row is None:
+                return None
+            watermark = connection.scalar(select(func.max(ProgressionRun.last_grant_id))) or 0
+            grants = connection.execute(
+                select(xp_grants.c.id, xp_grants.c.amount)
+                .where(xp_grants.c.player_monster_id == monster_id, xp_grants.c.id > watermark)
+            ).all()
+            if grants:
+                connection.execute(
+                    update(xp_grants).where(xp_grants.c.id.in_([grant.id for grant in grants]))
+                    .values(player_monster_id=None)
+                )
+            payload = _monster_payload(row, sum(grant.amount for grant in grants), [grant.id for grant in grants])
+            connection.execute(insert(trade_holds).values(
+                settlement_id=settlement_id, monster_id=monster_id, player_id=owner_id, payload=payload,
+            ))
+            connection.execute(delete(player_monsters).where(player_monsters.c.id == monster_id))
+        return payload
+
+    def _apply(self, settlement_id):
+        """Hands each monster to its new owner; safe to run again after a crash.
+
+        Does nothing unless the settlement is committed.
+        """
+        with self.engines[0].connect() as coordinator:
+            settlement = coordinator.execute(
+                select(trade_settlements).where(trade_settlements.c.id == settlement_id)
+            ).first()
+        if settlement is None or settlement.state != "committed":
+            return False
+        with self.engines[settlement.trade_shard].connect() as connection:
+            trade = connection.execute(select(trades).where(trades.c.id == settlement.trade_id)).first()
+
+        # Both monsters leave their shards for good; offers for them can never settle
+        for engine in self.engines:
+            with engine.begin() as connection:
+                connection.execute(
+                    update(trades).where(trades.c.status.in_(OPEN_TRADE_STATUSES), or_(*(
+                        or_(and_(trades.c.from_player_id == owner_id, trades.c.offered_monster_id == monster_id),
+                            and_(trades.c.to_player_id == owner_id, trades.c.requested_monster_id == monster_id))
+                        for owner_id, monster_id in (
+                            (trade.from_player_id, trade.offered_monster_id),
+                            (trade.to_player_id, trade.requested_monster_id),
+                        )
+                    ))).values(status="stale")
+                )
+
+        for owner_id, gives, receives in (
+            (trade.from_player_id, trade.offered_monster_id, settlement.requested),
+            (trade.to_player_id, trade.requested_monster_id, settlement.offered),
+        ):
+            with self.session_for_player(owner_id) as session:
+                # The hold doubles as the "not yet applied" marker
+                released = session.execute(delete(trade_holds).where(
+                    trade_holds.c.settlement_id == settlement_id, trade_holds.c.monster_id == gives,
+                )).rowcount
+                if released:
+                    # A new id on this shard; its pending XP is applied on arrival
+                    monster, pending_xp, _ = _load_payload(receives)
+                    monster.pop('id')
+                    monster = _with_experience(session, monster, pending_xp)
+                    session.execute(insert(player_monsters).values(player_id=owner_id, **monster))
+                    record_event(session, owner_id, 'trade')
+                    flush_unlocks(session, commit=False)
+                session.commit()
+
+        with self.engines[settlement.trade_shard].begin() as connection:
+            connection.execute(update(trades).where(trades.c.id == settlement.trade_id).values(status="completed"))
+        with self.engines[0].begin() as coordinator:
+            coordinator.execute(
+                update(trade_settlements).where(trade_settlements.c.id == settlement_id).values(state="done")
+            )
+        return True
+
+    def _abort(self, settlement_id, trade_shard, trade_id, trade_status):
+        """Puts held monsters back and releases the trade (as 'pending' again, or trade_status)."""
+        for engine in self.engines:
+            with engine.begin() as connection:
+                holds = connection.execute(
+                    select(trade_holds).where(trade_holds.c.settlement_id == settlement_id)
+                ).all()
+                for hold in holds:
+                    monster, _, grant_ids = _load_payload(hold.payload)
+                    if connection.execute(select(player_monsters.c.id).where(player_monsters.c.id == monster['id'])).first():
+                        # The id was reused while the monster was held
+                        monster.pop('id')
+                    monster_id = connection.execute(
+                        insert(player_monsters).values(player_id=hold.player_id, **monster)
+                    ).inserted_primary_key[0]
+                    if grant_ids:
+                        # Its XP grants point at it again
+                        connection.execute(
+                            update(xp_grants).where(xp_grants.c.id.in_(grant_ids)).values(player_monster_id=monster_id)
+                        )
+                connection.execute(delete(trade_holds).where(trade_holds.c.settlement_id == settlement_id))
+        with self.engines[trade_shard].begin() as connection:
+            connection.execute(
+                update(trades).where(trades.c.id == trade_id, trades.c.status == "settling")
+                .values(status=trade_status or "pending")
+            )
+        with self.engines[0].begin() as coordinator:
+            coordinator.execute(
+                update(trade_settlements).where(trade_settlements.c.id == settlement_id).values(state="aborted")
+            )
+
+    def recover_settlements(self, min_age=0):
+        """Finishes committed settlements and rolls back undecided ones.
+
+        get_shards() runs this when it builds the ShardSet, with min_age set
+        so a settlement another process is still preparing is left alone;
+        if it is rolled back anyway, that process sees it and gives up.
+        Returns {'applied': n, 'aborted': n}.
+        """
+        if not self._bookkeeping_ready:
+            self.create_bookkeeping_tables()
+        # created_at comes back from SQLite without its UTC offset
+        started_before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=min_age)
+        with self.engines[0].connect() as coordinator:
+            open_settlements = coordinator.execute(
+                select(trade_settlements).where(trade_settlements.c.state.in_(("preparing", "committed")))
+            ).all()
+        summary = {'applied': 0, 'aborted': 0}
+        for settlement in open_settlements:
+            if settlement.state == "committed":
+                if self._apply(settlement.id):
+                    summary['applied'] += 1
+            elif settlement.created_at > started_before:
+                continue
+            else:
+                self._abort(settlement.id, settlement.trade_shard, settlement.trade_id, None)
+                summary['aborted'] += 1
+        return summary
@@ -0,0 +1,137 @@
+# species.py
+
+from collections import namedtuple
+from types import MappingProxyType
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from lib.models import MonsterSpecies, SpeciesCatalogVersion
+
+# Detached snapshot of a species row, safe to share after the session closes
+Species = namedtuple(
+    'Species',
+    ['id', 'name', 'type', 'base_hp', 'base_attack', 'base_defense', 'base_speed', 'rarity'],
+)
+
+
+class SpeciesCatalog:
+    """Read-only view of every species, indexed by id, name, type and rarity.
+
+    A catalog never changes once built; when species change a new one is
+    built with a higher version, so callers holding the old one stay consistent.
+    """
+    __slots__ = ('version', 'species', 'by_id', 'by_name', '_ids_by_type', '_ids_by_rarity')
+
+    def __init__(self, species, version):
+        self.version = version
+        self.species = tuple(species)
+        self.by_id = MappingProxyType({s.id: s for s in self.species})
+        self.by_name = MappingProxyType({s.name: s for s in self.species})
+        ids_by_type, ids_by_rarity = {}, {}
+        for s in self.species:
+            ids_by_type.setdefault(s.type, []).append(s.id)
+            ids_by_rarity.setdefault(s.rarity, []).append(s.id)
+        self._ids_by_type = {key: tuple(ids) for key, ids in ids_by_type.items()}
+        self._ids_by_rarity = {key: frozenset(ids) for key, ids in ids_by_rarity.items()}
+
+    def __len__(self):
+        return len(self.species)
+
+    def __iter__(self):
+        return iter(self.species)
+
+    def get(self, species_id):
+        return self.by_id.get(species_id)
+
+    def ids(self, monster_type=None, rarity=None):
+        """Species ids matching a type and/or rarity, in id order."""
+        ids = self._ids_by_type.get(monster_type, ()) if monster_type is not None else self.by_id
+        if rarity is not None:
+            wanted = self._ids_by_rarity.get(rarity, frozenset())
+            return [i for i in ids if i in wanted]
+        return list(ids)
+
+
+# ---- Process-wide Catalog ----
+# Shared by every session whose database is at the same catalog version. The
+# version lives in the species_catalog_version row, which triggers bump on any
+# species write (ORM, Core or another process), and is read once per transaction.
+_catalog = None
+
+
+def invalidate_catalog(*args):
+    """Drops the process-wide catalog; the next get_catalog() reloads from the database.
+
+    Only needed when a database is replaced wholesale (its version restarts at 0).
+    """
+    global _catalog
+    _catalog = None
+
+
+def catalog_version(bind):
+    """The committed (or, inside a writing transaction, pending) species catalog version."""
+    return bind.execute(select(SpeciesCatalogVersion.version).where(SpeciesCatalogVersion.id == 1)).scalar() or 0
+
+
+def get_catalog(bind):
+    """Returns the SpeciesCatalog for bind's transaction; bind is a Session or Connection.
+
+    The version is checked once per transaction. A transaction that has written
+    species gets a private catalog, so uncommitted rows never reach other sessions.
+    """
+    global _catalog
+    connection = bind.connection() if isinstance(bind, Session) else bind
+    memo = connection.info.get('species_catalog')
+    transaction = connection.get_transaction()
+    if memo is not None and transaction is not None and memo[0] is transaction:
+        return memo[1]
+
+    version = catalog_version(connection)
+    transaction = connection.get_transaction()
+    private = connection.info.get('species_written') is transaction
+    catalog = _catalog
+    if private or catalog is None or catalog.version != version:
+        rows = connection.execute(select(
+            MonsterSpecies.id, MonsterSpecies.name, MonsterSpecies.type,
+            MonsterSpecies.base_hp, MonsterSpecies.base_attack, MonsterSpecies.base_defense,
+            MonsterSpecies.base_speed, MonsterSpecies.rarity,
+        ).order_by(MonsterSpecies.id)).all()
+        catalog = SpeciesCatalog((Species(*row) for row in rows), version)
+        if not private:
+            _catalog = catalog
+    connection.info['species_catalog'] = (transaction, catalog)
+    return catalog
+
+
+def get_species(bind, species_id):
+    """Resolves a species by id without SQL."""
+    species = get_catalog(bind).get(species_id)
+    if species is None:
+        raise KeyError(f"Unknown species id {species_id}")
+    return species
+
+
+# ---- Species Writes ----
+def _species_written(mapper, connection, target):
+    # The trigger has bumped the version inside this transaction; stop using the memo
+    connection.info['species_written'] = connection.get_transaction()
+    connection.info.pop('species_catalog', None)
+    session = object_session(target)
+    if session is not None:
+        session.info['species_written'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # The new version is committed; drop the old catalog now rather than at the next read
+    if session.info.pop('species_written', False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_writes(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('species_written', None)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(MonsterSpecies, _event_name, _species_written)
@@ -0,0 +1,128 @@
+# stats.py
+
+from collections import namedtuple
+from sqlalchemy import event, inspect, update, func
+from lib.models import MonsterSpecies, PlayerMonster
+from lib.helpers import calculate_current_stats
+from lib.species import get_catalog
+
+# Level-scaled stats as a plain tuple: no per-call dict allocation
+Stats = namedtuple('Stats', ['hp', 'attack', 'defense', 'speed'])
+
+MAX_LEVEL = 100
+
+# MonsterSpecies columns the stored PlayerMonster stats are computed from
+BASE_STAT_COLUMNS = ('base_hp', 'base_attack', 'base_defense', 'base_speed')
+
+
+class SpeciesStats:
+    """A species' name and its precomputed Stats for levels 0..MAX_LEVEL."""
+    __slots__ = ('id', 'name', 'levels')
+
+    def __init__(self, id, name, base_hp, base_attack, base_defense, base_speed):
+        self.id = id
+        self.name = name
+        self.levels = []
+        for level in range(MAX_LEVEL + 1):
+            scaled = calculate_current_stats(base_hp, base_attack, base_defense, level)
+            self.levels.append(Stats(scaled['hp'], scaled['attack'], scaled['defense'], base_speed))
+
+    def at(self, level):
+        if 0 <= level <= MAX_LEVEL:
+            return self.levels[level]
+        # Past the table; compute on the fly rather than failing
+        base = self.levels[0]
+        scaled = calculate_current_stats(base.hp, base.attack, base.defense, level)
+        return Stats(scaled['hp'], scaled['attack'], scaled['defense'], base.speed)
+
+
+# ---- Stat Table ----
+# Built from the species catalog and rebuilt whenever a different catalog is returned
+_table = None
+_table_catalog = None
+
+
+def get_stat_table(bind):
+    """Returns {species_id: SpeciesStats}; bind is a Session or Connection."""
+    global _table, _table_catalog
+    catalog = get_catalog(bind)
+    if _table is None or _table_catalog is not catalog:
+        _table = {
+            s.id: SpeciesStats(s.id, s.name, s.base_hp, s.base_attack, s.base_defense, s.base_speed)
+            for s in catalog
+        }
+        _table_catalog = catalog
+    return _table
+
+
+def stats_for(bind, species_id, level):
+    """Returns the Stats of a species at a level."""
+    table = get_stat_table(bind)
+    if species_id not in table:
+        raise KeyError(f"Unknown species id {species_id}")
+    return table[species_id].at(level or 1)
+
+
+def apply_stats(monster, stats, old_max_hp=None):
+    """Writes stats into a PlayerMonster's stored columns.
+
+    current_hp grows with max_hp on level-up and is capped at the new max.
+    """
+    if monster.current_hp is None or old_max_hp is None:
+        monster.current_hp = stats.hp
+    else:
+        monster.current_hp = min(stats.hp, monster.current_hp + stats.hp - old_max_hp)
+    monster.max_hp = stats.hp
+    monster.attack = stats.attack
+    monster.defense = stats.defense
+    monster.speed = stats.speed
+
+
+def sync_stat_columns(bind, player_id=None, species_id=None):
+    """Recomputes stored stat columns from the species rows in one UPDATE; the caller commits.
+
+    Covers every monster, or one player's or one species' monsters. bind
+    is a Session or Connection. Returns the number of monsters updated.
+    """
+    scaled = calculate_current_stats(
+        MonsterSpecies.base_hp, MonsterSpecies.base_attack, MonsterSpecies.base_defense,
+        func.coalesce(PlayerMonster.level, 1),
+    )
+    statement = (
+        update(PlayerMonster)
+        .where(PlayerMonster.species_id == MonsterSpecies.id)
+        .values(
+            max_hp=scaled['hp'],
+            current_hp=func.min(func.coalesce(PlayerMonster.current_hp, scaled['hp']), scaled['hp']),
+            attack=scaled['attack'],
+            defense=scaled['defense'],
+            speed=MonsterSpecies.base_speed,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if player_id is not None:
+        statement = statement.where(PlayerMonster.player_id == player_id)
+    if species_id is not None:
+        statement = statement.where(PlayerMonster.species_id == species_id)
+    return bind.execute(statement).rowcount
+
+
+# ---- Keep Stored Columns Consistent ----
+@event.listens_for(PlayerMonster, 'before_insert')
+def _fill_stats_on_insert(mapper, connection, target):
+    apply_stats(target, stats_for(connection, target.species_id, target.level))
+
+
+@event.listens_for(PlayerMonster, 'before_update')
+def _refresh_stats_on_update(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if attrs.level.history.has_changes() or attrs.species_id.history.has_changes():
+        apply_stats(target, stats_for(connection, target.species_id, target.level), target.max_hp)
+
+
+@event.listens_for(MonsterSpecies, 'after_update')
+def _refresh_stats_on_species_update(mapper, connection, target):
+    # Stored stats are derived from the base stats; restate them in the same transaction
+    attrs = inspect(target).attrs
+    if any(getattr(attrs, name).history.has_changes() for name in BASE_STAT_COLUMNS):
+        sync_stat_columns(connection, species_id=target.id)
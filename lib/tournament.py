@@ -0,0 +1,200 @@
+# tournament.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from sqlalchemy import insert
+from lib.models import Battle
+from lib.helpers import create_ai_opponent
+from lib.battle import load_combatants, simulate_battles, format_battle_summary, battle_turn_events, _take
+from lib.battle_log import encode_battle_log
+from lib.achievements import record_event, flush_unlocks
+from lib.progression import grant_xp, battle_grants
+
+# Matches per worker task; fixed so results never depend on the worker count
+SHARD_SIZE = 256
+WRITE_BATCH_SIZE = 5000
+
+# Set in each worker process by _init_worker
+_worker_combatants = None
+
+
+# ---- Entrants ----
+def draft_teams(session, count, difficulty="easy", team_size=3):
+    """Drafts count AI teams with create_ai_opponent; returns lists of monster ids.
+
+    A monster enters at most one team, so the later teams may come up short.
+    """
+    teams, drafted = [], set()
+    for _ in range(count):
+        team = [monster.id for monster in create_ai_opponent(session, difficulty, team_size)
+                if monster.id not in drafted]
+        if team:
+            drafted.update(team)
+            teams.append(team)
+    return teams
+
+
+# ---- Match Simulation (runs in workers) ----
+def _init_worker(combatants):
+    global _worker_combatants
+    _worker_combatants = combatants
+
+
+def match_rng(seed, round_no, match_no):
+    """Each match draws from its own stream, so sharding can't change results."""
+    return np.random.default_rng((seed, round_no, match_no))
+
+
+def play_shard(shard, seed, round_no, combatants=None, store_turns=True):
+    """Plays a shard of team matches, all bouts in one vectorized simulation.
+
+    shard is a list of (match_no, team_a, team_b). Teams fight bout by
+    bout, first monster against first monster; the team winning more
+    bouts advances and a drawn match goes to a seeded coin flip.
+    Returns [(match_no, team_a_won, bout_rows)]; each bout row is
+    (player1_id, player2_id, winner_id, battle_log, monster1_id, monster2_id, side1_won, log_data),
+    log_data being the packed turn log (None without store_turns).
+    """
+    combatants = combatants if combatants is not None else _worker_combatants
+    ids1, ids2, coins, tiebreaks, bounds = [], [], [], [], [0]
+    for match_no, team_a, team_b in shard:
+        bouts = min(len(team_a), len(team_b))
+        draws = match_rng(seed, round_no, match_no).random(bouts + 1)
+        ids1.extend(team_a[:bouts])
+        ids2.extend(team_b[:bouts])
+        coins.append(draws[:bouts])
+        tiebreaks.append(draws[bouts])
+        bounds.append(bounds[-1] + bouts)
+
+    ids1 = np.asarray(ids1, dtype=np.int64)
+    ids2 = np.asarray(ids2, dtype=np.int64)
+    side1 = _take(combatants, ids1)
+    side2 = _take(combatants, ids2)
+    outcome = simulate_battles(side1, side2, coin=np.concatenate(coins))
+    side1_wins = outcome['side1_wins']
+
+    results = []
+    for i, (match_no, _, _) in enumerate(shard):
+        start, end = bounds[i], bounds[i + 1]
+        won = int(side1_wins[start:end].sum())
+        lost = (end - start) - won
+        rows = [
+            (
+                int(side1['player_id'][b]), int(side2['player_id'][b]),
+                int(side1['player_id'][b] if side1_wins[b] else side2['player_id'][b]),
+                format_battle_summary(
+                    ids1[b], ids2[b], outcome['damage1'][b], outcome['damage2'][b],
+                    ids1[b] if side1_wins[b] else ids2[b], outcome['turns'][b],
+                ),
+                int(ids1[b]), int(ids2[b]), bool(side1_wins[b]),
+                encode_battle_log(battle_turn_events(
+                    side1['hp'][b], side2['hp'][b], outcome['damage1'][b], outcome['damage2'][b],
+                    outcome['mult1'][b], outcome['mult2'][b], outcome['side1_first'][b],
+                )) if store_turns else None,
+            )
+            for b in range(start, end)
+        ]
+        results.append((match_no, won > lost or (won == lost and tiebreaks[i] < 0.5), rows))
+    return results
+
+
+# ---- Batched Writer ----
+class BattleWriter:
+    """The one place tournament Battle rows are written: buffered, bulk-inserted, committed per batch.
+
+    Each batch also appends the bouts' XP grants to the ledger and records
+    the winners' battle_win achievement events in the same transaction.
+    A bout between two monsters of the same player is stored without a
+    winner and earns nothing: nobody beat anybody.
+    """
+
+    def __init__(self, session, batch_size=WRITE_BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.buffer = []
+        self.written = 0
+
+    def add(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        for p1, p2, winner, _, _, _, _, _ in self.buffer:
+            if p1 != p2:
+                record_event(self.session, winner, 'battle_win', flushed=False)
+        self.session.execute(insert(Battle), [
+            {'player1_id': p1, 'player2_id': p2, 'winner_id': winner if p1 != p2 else None,
+             'battle_log': log, 'log_data': log_data}
+            for p1, p2, winner, log, _, _, _, log_data in self.buffer
+        ])
+        grant_xp(self.session, [
+            grant
+            for p1, p2, _, _, m1, m2, side1_won, _ in self.buffer if p1 != p2
+            for grant in battle_grants(m1, m2, p1, p2, side1_won)
+        ])
+        flush_unlocks(self.session, commit=False)
+        self.session.commit()
+        self.written += len(self.buffer)
+        self.buffer = []
+
+
+# ---- Bracket ----
+def run_tournament(session, teams, seed=0, workers=None, persist=True, batch_size=WRITE_BATCH_SIZE, store_turns=True):
+    """Runs a single-elimination bracket between teams of monster ids.
+
+    Rounds are split into fixed-size shards played on a process pool;
+    with the same teams and seed the bracket, every bout and the champion
+    are identical whatever the worker count. Battle rows stream back
+    through one BattleWriter while later shards are still running, each
+    with its packed turn log unless store_turns is False (the workers
+    encode them).
+
+    Returns {'champion': team index, 'rounds': [[winning team indexes]], 'battles': rows written}.
+    """
+    if not teams:
+        raise ValueError("A tournament needs at least one team")
+    teams = [[int(i) for i in team] for team in teams]
+    combatants = load_combatants(session, [i for team in teams for i in team])
+    workers = workers or os.cpu_count() or 1
+    writer = BattleWriter(session, batch_size) if persist else None
+
+    # Seeded draw order; byes go to whoever is left over in an odd round
+    alive = [int(i) for i in np.random.default_rng(seed).permutation(len(teams))]
+    rounds = []
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(combatants,)) if workers > 1 else None
+    try:
+        round_no = 0
+        while len(alive) > 1:
+            round_no += 1
+            pairs = [(alive[i], alive[i + 1]) for i in range(0, len(alive) - 1, 2)]
+            matches = [(match_no, teams[a], teams[b]) for match_no, (a, b) in enumerate(pairs)]
+            shards = [matches[i:i + SHARD_SIZE] for i in range(0, len(matches), SHARD_SIZE)]
+            play = partial(play_shard, seed=seed, round_no=round_no, store_turns=persist and store_turns)
+            if executor is None:
+                shard_results = map(partial(play, combatants=combatants), shards)
+            else:
+                shard_results = executor.map(play, shards)
+
+            winners = []
+            for results in shard_results:
+                for match_no, team_a_won, rows in results:
+                    a, b = pairs[match_no]
+                    winners.append(a if team_a_won else b)
+                    if writer is not None:
+                        writer.add(rows)
+            if len(alive) % 2:
+                winners.append(alive[-1])
+            rounds.append(winners)
+            alive = winners
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if writer is not None:
+        writer.flush()
+
+    return {'champion': alive[0], 'rounds': rounds, 'battles': writer.written if writer else 0}
@@ -0,0 +1,178 @@
+# trading.py
+
+from sqlalchemy import update, select, case, func, or_, and_
+from lib.models import Trade, PlayerMonster
+from lib.achievements import record_event, flush_unlocks
+
+trades = Trade.__table__
+player_monsters = PlayerMonster.__table__
+
+
+# ---- Single Settlement Unit ----
+def _claim(session, trade_ids, status):
+    """Flips trades in status to completed and returns their fresh rows by id."""
+    rows = session.execute(
+        update(trades)
+        .where(trades.c.id.in_(trade_ids), trades.c.status == status)
+        .values(status="completed")
+        .returning(
+            trades.c.id, trades.c.from_player_id, trades.c.to_player_id,
+            trades.c.offered_monster_id, trades.c.requested_monster_id,
+        )
+    ).all()
+    return {row.id: row for row in rows}
+
+
+def _move_monsters(session, moves):
+    """Reassigns owners in one conditional UPDATE.
+
+    moves is a list of (monster_id, current_owner_id, new_owner_id). The
+    UPDATE only fires when every monster is still with its expected owner,
+    so it either moves all of them or none. Returns True on success.
+    """
+    monster_ids = [monster_id for monster_id, _, _ in moves]
+    still_owned = (
+        select(func.count())
+        .select_from(player_monsters)
+        .where(or_(*(
+            and_(player_monsters.c.id == monster_id, player_monsters.c.player_id == owner_id)
+            for monster_id, owner_id, _ in moves
+        )))
+        .scalar_subquery()
+    )
+    result = session.execute(
+        update(player_monsters)
+        .where(player_monsters.c.id.in_(monster_ids), still_owned == len(moves))
+        .values(player_id=case(
+            {monster_id: new_owner_id for monster_id, _, new_owner_id in moves},
+            value=player_monsters.c.id,
+        ))
+    )
+    return result.rowcount == len(moves)
+
+
+def _settle_unit(session, trade_ids, cycle=False, status="pending"):
+    """Settles one trade, or a ring of trades all-or-nothing, if all of them are still in status.
+
+    Returns (completed trade rows, ids of players who traded); trades whose
+    monsters changed hands since they were proposed are marked 'stale'.
+    """
+    claimed = _claim(session, trade_ids, status)
+    if len(claimed) != len(trade_ids):
+        if claimed:
+            # Part of the ring was taken by someone else; give the rest back
+            session.execute(update(trades).where(trades.c.id.in_(list(claimed))).values(status=status))
+        return [], []
+
+    if cycle:
+        # Every participant gives what they offered and receives what they requested
+        owner_of = {row.offered_monster_id: row.from_player_id for row in claimed.values()}
+        moves = [
+            (row.requested_monster_id, owner_of.get(row.requested_monster_id), row.from_player_id)
+            for row in claimed.values()
+        ]
+        participants = [row.from_player_id for row in claimed.values()]
+    else:
+        row = claimed[trade_ids[0]]
+        moves = [
+            (row.offered_monster_id, row.from_player_id, row.to_player_id),
+            (row.requested_monster_id, row.to_player_id, row.from_player_id),
+        ]
+        participants = [row.from_player_id, row.to_player_id]
+
+    if not _move_monsters(session, moves):
+        session.execute(update(trades).where(trades.c.id.in_(trade_ids)).values(status="stale"))
+        return [], []
+    return list(claimed.values()), participants
+
+
+# ---- Cycle Detection ----
+def find_trade_cycles(pending):
+    """Finds rings of 3+ trades where each trade's requested monster is offered by the next.
+
+    Settling such a ring as a rotation gives every participant the monster
+    they asked for, even though no single pair could swap directly.
+    Returns a list of trade id lists.
+    """
+    offered_by = {}
+    for trade in pending:
+        offered_by.setdefault(trade.offered_monster_id, trade.id)
+    by_id = {trade.id: trade for trade in pending}
+
+    cycles, visited = [], set()
+    for start in by_id:
+        path, position = [], {}
+        trade_id = start
+        while trade_id is not None and trade_id not in visited and trade_id not in position:
+            position[trade_id] = len(path)
+            path.append(trade_id)
+            trade_id = offered_by.get(by_id[trade_id].requested_monster_id)
+        if trade_id in position and len(path) - position[trade_id] >= 3:
+            cycles.append(path[position[trade_id]:])
+        visited.update(path)
+    return cycles
+
+
+# ---- Public API ----
+def _record_trades(session, participants):
+    for player_id in participants:
+        record_event(session, player_id, 'trade')
+    flush_unlocks(session, commit=False)
+
+
+def settle_trade(session, trade_id):
+    """Atomically completes one pending trade; returns False if it is gone or stale."""
+    settled, participants = _settle_unit(session, [trade_id])
+    _record_trades(session, participants)
+    session.commit()
+    return bool(settled)
+
+
+def accept_trades(session, player_id, trade_ids):
+    """Marks pending trades offered to player_id as accepted, ready for settle_trade_queue.
+
+    Returns the ids that were accepted; others are not player_id's or no longer pending.
+    """
+    return session.scalars(
+        update(trades)
+        .where(trades.c.id.in_(trade_ids), trades.c.to_player_id == player_id, trades.c.status == "pending")
+        .values(status="accepted")
+        .returning(trades.c.id)
+    ).all()
+
+
+def settle_trade_queue(session, trade_ids=None, batch_size=500):
+    """Settles accepted trades in batched transactions, ring trades first.
+
+    Only trades their recipients accepted (accept_trades) are settled; a
+    ring completes once every trade in it is accepted. trade_ids limits
+    the run to those trades. Each batch commits on session.
+    Returns {'completed': n, 'rejected': n}.
+    """
+    query = select(
+        trades.c.id, trades.c.offered_monster_id, trades.c.requested_monster_id
+    ).where(trades.c.status == "accepted").order_by(trades.c.id)
+    if trade_ids is not None:
+        query = query.where(trades.c.id.in_(trade_ids))
+    owns_read = not session.in_transaction()
+    accepted = session.execute(query).all()
+    if owns_read:
+        # End the read-only transaction we started so each batch starts with a write
+        session.rollback()
+
+    cycles = find_trade_cycles(accepted)
+    in_cycle = {trade_id for cycle in cycles for trade_id in cycle}
+    units = [(cycle, True) for cycle in cycles]
+    units += [([trade.id], False) for trade in accepted if trade.id not in in_cycle]
+
+    completed = rejected = 0
+    for start in range(0, len(units), batch_size):
+        participants = []
+        for unit_ids, cycle in units[start:start + batch_size]:
+            settled, unit_participants = _settle_unit(session, unit_ids, cycle, status="accepted")
+            participants.extend(unit_participants)
+            completed += len(settled)
+            rejected += 0 if settled else len(unit_ids)
+        _record_trades(session, participants)
+        session.commit()
+    return {'completed': completed, 'rejected': rejected}
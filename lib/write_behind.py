@@ -0,0 +1,314 @@
+# write_behind.py
+# Optional group commit for catches and level-ups: queued in memory, journaled, flushed in batches
+
+import atexit
+import fcntl
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from sqlalchemy import MetaData, Table, Column, Integer, String, select, insert, update, bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+from lib.models import PlayerMonster, MonsterSpecies
+from lib.helpers import calculate_current_stats
+from lib.stats import stats_for
+from lib.progression import grant_xp, XP_REWARDS
+
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_DELAY = 0.05
+
+player_monsters = PlayerMonster.__table__
+
+# Kept out of Base like the shard bookkeeping tables; created on first use
+state_metadata = MetaData()
+
+# Highest journal sequence number each journal has had committed, written in the batch's own transaction
+write_behind_state = Table(
+    'write_behind_state', state_metadata,
+    Column('journal', String, primary_key=True),
+    Column('last_seq', Integer, nullable=False),
+)
+
+
+def journal_pattern(database):
+    return f"{database}-wb-*.journal"
+
+
+def _is_current(journal, path):
+    """Whether the open journal is still the file at path, not one a recovery has removed."""
+    try:
+        on_disk = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(journal.fileno())
+    return (opened.st_dev, opened.st_ino) == (on_disk.st_dev, on_disk.st_ino)
+
+
+def open_locked_journal(path):
+    """Opens path for appending and locks it, retrying until the lock is on the file at path.
+
+    Between open() and flock() a recovering process may lock the new, empty
+    journal, take it for a dead one and remove it; writing to that unlinked
+    file would lose everything on a crash.
+    """
+    while True:
+        journal = open(path, "a")
+        fcntl.flock(journal, fcntl.LOCK_EX)
+        if _is_current(journal, path):
+            return journal
+        journal.close()
+
+
+class WriteBehindQueue:
+    """Buffers catches and level-ups and commits them in groups.
+
+    Every operation is appended to a journal before it is queued, so a
+    crashed process loses nothing: the next queue opened on the same
+    database replays what its batches never committed. A background thread
+    commits a batch once max_batch operations are waiting or max_delay
+    seconds after the first one arrived; close() commits the rest.
+
+    Journal lines reach the OS immediately, which survives a process crash;
+    pass sync_journal=True to also fsync each one and survive power loss.
+    """
+
+    def __init__(self, engine, journal_dir=None, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY,
+                 sync_journal=False):
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.sync_journal = sync_journal
+        self._pending = []
+        self._seq = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self.recovered = 0
+
+        write_behind_state.create(engine, checkfirst=True)
+        database = engine.url.database
+        self.journal_path = None
+        self._journal = None
+        if database and database != ":memory:":
+            if journal_dir:
+                database = os.path.join(journal_dir, os.path.basename(database))
+            self.recovered = self._recover(journal_pattern(database))
+            self.journal_path = f"{database}-wb-{os.getpid()}.journal"
+            # Locked for our lifetime; recovery skips journals that are still locked
+            self._journal = open_locked_journal(self.journal_path)
+            self._seq = self._last_seq(self.journal_path)
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # ---- Queueing ----
+    def catch(self, player_id, species_id, nickname, level=1):
+        """Queues a new PlayerMonster; it appears in queries once its batch commits."""
+        self._enqueue({'op': 'catch', 'player_id': player_id, 'species_id': species_id,
+                       'nickname': nickname, 'level': level})
+
+    def level_up(self, monster_id, levels=1):
+        """Queues a level gain; gains for the same monster add up."""
+        self._enqueue({'op': 'level', 'monster_id': monster_id, 'levels': levels})
+
+    def pending_levels(self, monster_id):
+        """Levels queued for a monster but not yet committed."""
+        with self._condition:
+            return sum(op['levels'] for op in self._pending if op['op'] == 'level' and op['monster_id'] == monster_id)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _enqueue(self, op):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._seq += 1
+            op['seq'] = self._seq
+            if self._journal:
+                self._journal.write(json.dumps(op) + "\n")
+                self._journal.flush()
+                if self.sync_journal:
+                    os.fsync(self._journal.fileno())
+            self._pending.append(op)
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._condition.notify()
+
+    # ---- Flushing ----
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                # Give the batch up to max_delay to fill
+                deadline = time.monotonic() + self.max_delay
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            try:
+                self.flush()
+            except Exception as e:
+                # The batch went back on the queue; try again after a pause
+                print(f"❌ Write-behind flush failed: {e}", file=sys.stderr)
+                time.sleep(self.max_delay)
+
+    def flush(self):
+        """Commits everything queued so far in one transaction; returns the number of operations."""
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                self._apply(batch, self.journal_path)
+            except Exception:
+                with self._condition:
+                    self._pending[:0] = batch
+                raise
+            with self._condition:
+                if self._journal and not self._pending:
+                    # Everything journaled is committed; start the journal over
+                    self._journal.truncate(0)
+            return len(batch)
+
+    def close(self):
+        """Commits whatever is queued, stops the thread and removes the journal."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+        if self._journal:
+            self._journal.close()
+            os.remove(self.journal_path)
+            self._forget(self.journal_path)
+            self._journal = None
+
+    def _apply(self, batch, journal):
+        """Writes one batch and its journal watermark in a single transaction."""
+        with self.Session() as session:
+            catches = [op for op in batch if op['op'] == 'catch']
+            if catches:
+                rows = []
+                for op in catches:
+                    stats = stats_for(session, op['species_id'], op['level'])
+                    rows.append({
+                        'player_id': op['player_id'], 'species_id': op['species_id'], 'nickname': op['nickname'],
+                        'level': op['level'], 'experience': 0, 'current_hp': stats.hp, 'max_hp': stats.hp,
+                        'attack': stats.attack, 'defense': stats.defense, 'speed': stats.speed,
+                    })
+                monster_ids = session.execute(
+                    insert(player_monsters).returning(player_monsters.c.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                grant_xp(session, [
+                    (monster_id, op['player_id'], XP_REWARDS['catch'], 'catch')
+                    for monster_id, op in zip(monster_ids, catches)
+                ])
+
+            levels = {}
+            for op in batch:
+                if op['op'] == 'level':
+                    levels[op['monster_id']] = levels.get(op['monster_id'], 0) + op['levels']
+            if levels:
+                new_level = func.coalesce(player_monsters.c.level, 1) + bindparam('gained')
+                scaled = calculate_current_stats(
+                    MonsterSpecies.base_hp, MonsterSpecies.base_attack, MonsterSpecies.base_defense, new_level,
+                )
+                session.execute(
+                    update(player_monsters)
+                    .where(player_monsters.c.id == bindparam('monster_id'),
+                           player_monsters.c.species_id == MonsterSpecies.id)
+                    .values(
+                        level=new_level,
+                        max_hp=scaled['hp'],
+                        # current_hp grows with max_hp, as on an interactive level-up
+                        current_hp=func.min(
+                            scaled['hp'],
+                            func.coalesce(player_monsters.c.current_hp, scaled['hp']) + scaled['hp'] - player_monsters.c.max_hp,
+                        ),
+                        attack=scaled['attack'],
+                        defense=scaled['defense'],
+                        speed=MonsterSpecies.base_speed,
+                    ),
+                    [{'monster_id': monster_id, 'gained': gained} for monster_id, gained in levels.items()],
+                )
+
+            if journal:
+                last_seq = max(op['seq'] for op in batch)
+                session.execute(
+                    sqlite_insert(write_behind_state).values(journal=journal, last_seq=last_seq)
+                    .on_conflict_do_update(index_elements=['journal'], set_={'last_seq': last_seq})
+                )
+            session.commit()
+
+    # ---- Recovery ----
+    def _last_seq(self, journal):
+        with self.engine.connect() as connection:
+            return connection.scalar(
+                select(write_behind_state.c.last_seq).where(write_behind_state.c.journal == journal)
+            ) or 0
+
+    def _recover(self, pattern):
+        """Replays journals left by processes that died; returns the number of operations replayed."""
+        replayed = 0
+        for path in sorted(glob.glob(pattern)):
+            try:
+                journal = open(path, "r+")
+            except FileNotFoundError:
+                continue   # another process recovered it first
+            with journal:
+                try:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue   # its process is still running
+                if not _is_current(journal, path):
+                    continue   # another recovery removed it after we opened it
+                committed = self._last_seq(path)
+                ops = []
+                for line in journal:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break   # torn last line from the crash
+                    if op['seq'] > committed:
+                        ops.append(op)
+                if ops:
+                    self._apply(ops, path)
+                    committed = max(op['seq'] for op in ops)
+                replayed += len(ops)
+                # Under the lock, so an owner that opened it meanwhile sees it gone and reopens.
+                # File first: if we die in between, the watermark still guards a second replay
+                os.remove(path)
+            # A new owner of the same name may have committed past it already
+            self._forget(path, up_to=committed)
+        return replayed
+
+    def _forget(self, journal, up_to=None):
+        """Drops a journal's watermark; with up_to, only if it has not moved past that sequence."""
+        query = write_behind_state.delete().where(write_behind_state.c.journal == journal)
+        if up_to is not None:
+            query = query.where(write_behind_state.c.last_seq <= up_to)
+        with self.engine.begin() as connection:
+            connection.execute(query)
+
+
+# ---- Process-wide Queues ----
+_queues = {}
+
+
+def get_write_behind(engine, **kwargs):
+    """The queue for engine, created on first use and closed (flushed) at exit."""
+    if engine not in _queues:
+        _queues[engine] = WriteBehindQueue(engine, **kwargs)
+        atexit.register(_queues[engine].close)
+    return _queues[engine]
@@ -0,0 +1,37 @@
+"""backfill monster stat columns
+
+Revision ID: a9e4c2d7f150
+Revises: f08b3d5c9a21
+Create Date: 2026-10-18 10:04:37.215930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4c2d7f150'
+down_revision: Union[str, None] = 'f08b3d5c9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same formula as lib.stats.sync_stat_columns at the time of writing: base + 2 per level
+    op.execute(
+        "UPDATE player_monsters SET "
+        "max_hp = s.base_hp + 2 * COALESCE(player_monsters.level, 1), "
+        "current_hp = MIN(COALESCE(player_monsters.current_hp, s.base_hp + 2 * COALESCE(player_monsters.level, 1)), "
+        "s.base_hp + 2 * COALESCE(player_monsters.level, 1)), "
+        "attack = s.base_attack + 2 * COALESCE(player_monsters.level, 1), "
+        "defense = s.base_defense + 2 * COALESCE(player_monsters.level, 1), "
+        "speed = s.base_speed "
+        "FROM monster_species AS s WHERE player_monsters.species_id = s.id"
+    )
+
+
+def downgrade() -> None:
+    # The recomputed values are correct under the old schema too
+    pass
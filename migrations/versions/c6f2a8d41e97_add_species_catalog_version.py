@@ -0,0 +1,41 @@
+"""add species catalog version
+
+Revision ID: c6f2a8d41e97
+Revises: 9d4b6a1e2c73
+Create Date: 2026-10-17 21:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f2a8d41e97'
+down_revision: Union[str, None] = '9d4b6a1e2c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIONS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def upgrade() -> None:
+    op.create_table('species_catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO species_catalog_version (id, version) VALUES (1, 0)")
+    for action in ACTIONS:
+        op.execute(
+            f"CREATE TRIGGER trg_monster_species_{action.lower()}_version "
+            f"AFTER {action} ON monster_species "
+            "BEGIN UPDATE species_catalog_version SET version = version + 1 WHERE id = 1; END"
+        )
+
+
+def downgrade() -> None:
+    for action in ACTIONS:
+        op.execute(f"DROP TRIGGER trg_monster_species_{action.lower()}_version")
+    op.drop_table('species_catalog_version')
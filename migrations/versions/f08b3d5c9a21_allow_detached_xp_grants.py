@@ -0,0 +1,30 @@
+"""allow detached xp grants
+
+Revision ID: f08b3d5c9a21
+Revises: c6f2a8d41e97
+Create Date: 2026-10-17 22:48:13.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f08b3d5c9a21'
+down_revision: Union[str, None] = 'c6f2a8d41e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite cannot drop NOT NULL in place; batch mode rebuilds the table
+    with op.batch_alter_table('xp_grants') as batch_op:
+        batch_op.alter_column('player_monster_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM xp_grants WHERE player_monster_id IS NULL")
+    with op.batch_alter_table('xp_grants') as batch_op:
+        batch_op.alter_column('player_monster_id', existing_type=sa.Integer(), nullable=False)
@@ -6,8 +6,12 @@ from lib.models import (
     MonsterSpecies, Player, PlayerMonster, Battle,
     Trade, Achievement, MonsterType, MonsterRarity
 )
+import argparse
 from sqlalchemy.exc import IntegrityError
-from lib.debug import init_db, Session
+from sqlalchemy.orm import sessionmaker
+from lib.debug import init_db, Session, DB_PATH, shards
+from lib.config import make_engine
+from lib.importer import import_species, import_player_monsters, iter_records
 
 
 # -------------------- Seed Data --------------------
@@ -53,19 +57,9 @@ def seed_database():
 
     try:
         print("🌱 Seeding MonsterSpecies...")
-
-        for monster_data in seed_monster_species_data:
-            # Check for existing monster to avoid duplicates
-            monster = session.query(MonsterSpecies).filter_by(name=monster_data["name"]).first()
-
-            if monster:
-                print(f"⚠️  Skipped: {monster.name} (already exists)")
-            else:
-                new_monster = MonsterSpecies(**monster_data)
-                session.add(new_monster)
-                print(f"✅ Added: {new_monster.name} ({new_monster.type.value})")
-
-        session.commit()
+        result = import_species(session, seed_monster_species_data)
+        print(f"✅ Added: {result['inserted']}, ⚠️  Skipped (already exist): {result['skipped']}")
+        shards.replicate_reference_data()
         print("✅ MonsterSpecies seeding complete.")
 
     except IntegrityError as e:
@@ -78,6 +72,40 @@ def seed_database():
         session.close()
 
 
+def import_files(species_file=None, monsters_file=None, chunk_size=None):
+    """Stream species packs and player-monster dumps (CSV/JSONL) into the database."""
+    init_db()
+    engine = make_engine(DB_PATH, profile="bulk-load")
+    session = sessionmaker(bind=engine)()
+
+    try:
+        if species_file:
+            print(f"📦 Importing species from {species_file}...")
+            result = import_species(session, iter_records(species_file), chunk_size or 1000)
+            print(f"✅ Added: {result['inserted']}, ⚠️  Skipped: {result['skipped']}")
+            shards.replicate_reference_data()
+        if monsters_file and shards.count > 1:
+            print("❌ Player dumps can only be imported unsharded (MONSTER_DB_SHARDS=1).")
+        elif monsters_file:
+            print(f"📦 Importing player monsters from {monsters_file}...")
+            result = import_player_monsters(session, iter_records(monsters_file), chunk_size or 10000)
+            print(f"✅ Added: {result['inserted']}, ⚠️  Skipped: {result['skipped']}")
+    except Exception as e:
+        session.rollback()
+        print("❌ Error during import:", e)
+    finally:
+        session.close()
+        engine.dispose()
+
+
 # -------------------- Run Seeding --------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed or bulk-import game data")
+    parser.add_argument('--species-file', help='CSV/JSONL species pack to import')
+    parser.add_argument('--monsters-file', help='CSV/JSONL player-monster dump (username, species, nickname, level, experience)')
+    parser.add_argument('--chunk-size', type=int, help='Rows per insert batch/transaction')
+    args = parser.parse_args()
+
     seed_database()
+    if args.species_file or args.monsters_file:
+        import_files(args.species_file, args.monsters_file, args.chunk_size)
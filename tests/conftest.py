@@ -0,0 +1,74 @@
+import builtins
+import os
+import sys
+import tempfile
+
+# lib.config reads its settings on import, so point it at a scratch database first
+_scratch = tempfile.mkdtemp(prefix="monster-tests-")
+os.environ["MONSTER_DB_URL"] = f"sqlite:///{os.path.join(_scratch, 'game.db')}"
+os.environ["MONSTER_DB_CONFIG"] = os.path.join(_scratch, "monster_game.ini")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy.orm import Session
+from lib.models import Base, Player, PlayerMonster
+from lib.importer import import_species
+from lib.achievements import reset_player_counters, _achievement_ids
+from lib.leaderboard import reset_leaderboards
+from lib.species import invalidate_catalog
+from lib.sharding import shard_metadata
+from seed import seed_monster_species_data
+
+
+@pytest.fixture
+def engine():
+    """The configured engine over a freshly created, seeded schema."""
+    from lib.config import engine, Session as Registry
+    Registry.remove()
+    Base.metadata.drop_all(engine)
+    shard_metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        import_species(session, seed_monster_species_data)
+        session.commit()
+    # Process-wide caches describe the previous test's database
+    reset_player_counters()
+    _achievement_ids.clear()
+    reset_leaderboards()
+    invalidate_catalog()
+    yield engine
+    Registry.remove()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def make_player(session):
+    """make_player(username, *levels) adds a player owning one monster per level; returns (player_id, monster_ids)."""
+    def make(username, *levels, species_id=1):
+        player = Player(username=username)
+        session.add(player)
+        session.flush()
+        monsters = [PlayerMonster(player_id=player.id, species_id=species_id, level=level, nickname=f"{username}{i}")
+                    for i, level in enumerate(levels)]
+        session.add_all(monsters)
+        session.commit()
+        return player.id, [monster.id for monster in monsters]
+    return make
+
+
+@pytest.fixture
+def run_cli(engine, monkeypatch):
+    """run_cli(argv, answers) runs a CLI command, feeding answers to its input() prompts."""
+    from cli import build_parser
+
+    def run(argv, answers=()):
+        answers = list(answers)
+        monkeypatch.setattr(builtins, "input", lambda prompt="": answers.pop(0))
+        args = build_parser().parse_args(argv)
+        args.func(args)
+    return run
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import select
+from lib.models import Battle
+from lib.battle import resolve_battles
+from lib.battle_log import (
+    TurnEvent, encode_battle_log, iter_battle_log, replay_battle,
+    ACTION_ATTACK, ACTION_KNOCKOUT, READ_CHUNK_SIZE, RECORD,
+)
+
+
+def make_events(count):
+    events = [TurnEvent(turn, turn % 2, ACTION_ATTACK, turn % 50, 30000 - turn) for turn in range(1, count)]
+    return events + [TurnEvent(count, count % 2, ACTION_KNOCKOUT, 7, 0)]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("count", [1, 3, READ_CHUNK_SIZE // RECORD.size + 5, 5000])
+def test_round_trip(compress, count):
+    # Larger counts span several read chunks, with records split across them
+    events = make_events(count)
+    assert list(iter_battle_log(encode_battle_log(events, compress=compress))) == events
+
+
+def test_empty_log_round_trips():
+    assert list(iter_battle_log(encode_battle_log([]))) == []
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        list(iter_battle_log(b"XX\x01\x00"))
+    with pytest.raises(ValueError):
+        list(iter_battle_log(b"B"))
+
+
+def test_replay_streams_stored_turns(session, make_player):
+    _, (a,) = make_player("ash", 10)
+    _, (m,) = make_player("misty", 3, species_id=2)
+    result, = resolve_battles(session, [(a, m)], seed=7)
+    battle_id = session.scalar(select(Battle.id))
+
+    turns = list(replay_battle(session, battle_id))
+    assert turns == list(iter_battle_log(result['log_data']))
+    assert turns[-1].action == ACTION_KNOCKOUT and turns[-1].target_hp == 0
+    # The knocked-out side is the loser
+    assert (turns[-1].side == 0) == (result['winner_id'] == result['player1_id'])
+
+
+def test_replay_of_missing_or_unlogged_battle_is_empty(session, make_player):
+    _, (a,) = make_player("ash", 10)
+    _, (m,) = make_player("misty", 3)
+    resolve_battles(session, [(a, m)], seed=7, store_turns=False)
+    battle_id = session.scalar(select(Battle.id))
+
+    assert list(replay_battle(session, battle_id)) == []
+    assert list(replay_battle(session, battle_id + 1)) == []
@@ -0,0 +1,50 @@
+import pytest
+from lib.models import PlayerMonster
+from lib.collection import (
+    collection_query, iter_collection_pages, prefix_upper_bound, encode_cursor, decode_cursor,
+)
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("Fl") == "Fm"
+    assert prefix_upper_bound("a\U0010ffff") == "b"
+    assert prefix_upper_bound("x\ud7ff") == "x\ue000"
+    assert prefix_upper_bound("") is None
+
+
+def test_prefix_filter_keeps_astral_names(session, make_player):
+    player_id, _ = make_player("ash")
+    names = ["Fl", "Fl\uffff", "Fl\U0001F525", "Flame", "Fm", "Fk"]
+    session.add_all(PlayerMonster(player_id=player_id, species_id=1, level=1, nickname=name) for name in names)
+    session.commit()
+
+    query = collection_query(session, player_id, {'nickname_prefix': 'Fl'}, sort='nickname')
+    assert sorted(row.nickname for row in session.execute(query)) == sorted(names[:4])
+
+
+@pytest.mark.parametrize("sort,descending", [("id", False), ("level", True), ("nickname", False)])
+def test_cursor_resumes_where_the_page_ended(session, make_player, sort, descending):
+    player_id, _ = make_player("ash", *[level % 4 + 1 for level in range(11)])
+    pages = list(iter_collection_pages(session, player_id, sort=sort, descending=descending, page_size=3))
+
+    cursor = encode_cursor(pages[1][-1], sort, descending)
+    resumed = iter_collection_pages(session, player_id, sort=sort, descending=descending, page_size=3,
+                                    after=decode_cursor(cursor, sort, descending))
+    assert list(resumed) == pages[2:]
+
+
+def test_cursor_is_tied_to_its_ordering():
+    cursor = encode_cursor(type("Row", (), {"id": 5, "level": 2})(), "level")
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "nickname")
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor!", "level")
+
+
+@pytest.mark.parametrize("option", ["--limit", "--page"])
+@pytest.mark.parametrize("value", ["0", "-5"])
+def test_non_positive_page_options_are_rejected(option, value, capsys):
+    from cli import build_parser
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["collection", "ash", option, value])
+    assert "must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import insert
+from lib.models import Achievement, PlayerAchievement
+from lib.export import export_snapshot, read_npz_table, load_manifest
+
+pytest.importorskip("numpy")
+
+
+def unlock(engine, *rows):
+    with engine.begin() as connection:
+        connection.execute(insert(PlayerAchievement), [
+            {'player_id': player_id, 'achievement_id': achievement_id, 'unlocked_at': unlocked_at}
+            for player_id, achievement_id, unlocked_at in rows
+        ])
+
+
+def test_achievements_continue_from_the_last_rowid(engine, session, make_player, tmp_path):
+    ash, _ = make_player("ash", 1)
+    misty, _ = make_player("misty", 1)
+    session.add_all([Achievement(id=1, name="First Catch"), Achievement(id=2, name="Champion")])
+    session.commit()
+    unlock(engine, (ash, 1, datetime(2026, 5, 1, tzinfo=timezone.utc)))
+    assert export_snapshot(engine, tmp_path, fmt='npz')['player_achievements'] == 1
+
+    # Unlocked "earlier" than the row already exported, and with no time at all
+    unlock(engine, (misty, 1, datetime(2026, 4, 1, tzinfo=timezone.utc)), (misty, 2, None))
+    assert export_snapshot(engine, tmp_path, fmt='npz')['player_achievements'] == 2
+    assert load_manifest(tmp_path)['tables']['player_achievements']['watermark'] == 3
+
+    exported = read_npz_table(tmp_path, 'player_achievements')
+    assert sorted(zip(exported['player_id'], exported['achievement_id'])) == [(ash, 1), (misty, 1), (misty, 2)]
+    assert export_snapshot(engine, tmp_path, fmt='npz')['player_achievements'] == 0
@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine, text
+from lib.instrumentation import instrument, profile_command
+
+
+def test_profiles_engines_created_after_instrumenting(engine):
+    instrument(engine)
+    instrument()
+    with profile_command("two engines") as stats:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        with create_engine("sqlite://").connect() as connection:
+            connection.execute(text("SELECT 2"))
+    assert stats.queries == 2
+    assert set(stats.statements) == {"SELECT 1", "SELECT 2"}
+
+
+def test_statement_started_outside_a_profile_is_not_recorded(engine):
+    instrument()
+    with engine.connect() as connection:
+        with profile_command("outer") as outer:
+            pass
+        connection.execute(text("SELECT 1"))
+        with profile_command("inner") as inner:
+            connection.execute(text("SELECT 2"))
+    assert outer.queries == 0
+    assert list(inner.statements) == ["SELECT 2"]
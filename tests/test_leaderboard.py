@@ -0,0 +1,57 @@
+from lib.models import PlayerMonster
+from lib.achievements import record_event, flush_unlocks
+from lib.battle import resolve_battles
+from lib.helpers import propose_trade, accept_trade
+from lib.leaderboard import BOARD_QUERIES, Leaderboard, get_leaderboard
+
+
+def assert_matches_rebuild(session, *boards):
+    for board in boards:
+        rebuilt = Leaderboard(dict(BOARD_QUERIES[board](session).all()))
+        assert get_leaderboard(session, board).top(100) == rebuilt.top(100), board
+
+
+def test_trade_moves_level_and_collection_scores(session, make_player):
+    ash, (low, high) = make_player("ash", 1, 3)
+    misty, (mid,) = make_player("misty", 2)
+    for board in BOARD_QUERIES:
+        get_leaderboard(session, board)
+
+    trade = propose_trade(session, ash, misty, high, mid)
+    assert accept_trade(session, trade.id)
+
+    assert get_leaderboard(session, 'level').top(1) == [(1, misty, 3)]
+    assert_matches_rebuild(session, 'level', 'xp', 'collection')
+
+
+def test_catch_and_level_up_update_boards_on_commit(session, make_player):
+    ash, (monster_id,) = make_player("ash", 4)
+    misty, _ = make_player("misty")
+    get_leaderboard(session, 'level')
+    get_leaderboard(session, 'collection')
+
+    session.add(PlayerMonster(player_id=misty, species_id=1, level=1, nickname="first"))
+    session.flush()
+    record_event(session, misty, 'catch')
+    flush_unlocks(session, commit=False)
+    # Nothing changes until the catch commits
+    assert get_leaderboard(session, 'level').rank(misty) is None
+    session.commit()
+    assert get_leaderboard(session, 'level').rank(misty) == 2
+
+    monster = session.get(PlayerMonster, monster_id)
+    monster.level = 2
+    session.flush()
+    record_event(session, ash, 'level_up', level=2)
+    session.rollback()
+    assert get_leaderboard(session, 'level').scores[ash] == 4
+
+    assert_matches_rebuild(session, 'level', 'collection')
+
+
+def test_battle_wins_reach_the_wins_board(session, make_player):
+    _, (a,) = make_player("ash", 30)
+    _, (m,) = make_player("misty", 1)
+    get_leaderboard(session, 'wins')
+    resolve_battles(session, [(a, m)] * 3, seed=1)
+    assert_matches_rebuild(session, 'wins')
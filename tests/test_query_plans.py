@@ -0,0 +1,70 @@
+"""Fails if a statement the game actually issues needs a full table scan.
+
+Runs the CLI commands and helpers against a small database with
+lib.instrumentation collecting every statement, then EXPLAINs each one
+with the parameters it first ran with.
+"""
+import pytest
+from lib.models import Base, PlayerMonster
+from lib.collection import encode_cursor
+from lib.instrumentation import instrument, profile_command
+from lib.helpers import propose_trade, accept_trade, check_achievements, create_ai_opponent
+from lib.battle import resolve_battles
+
+# Tiny reference tables that are fine to scan
+SCAN_ALLOWED = {"monster_species", "achievements"}
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def full_scans(connection, statement, parameters):
+    """The plan lines that scan a game table without an index."""
+    # Straight to sqlite3, which takes the parameters exactly as they were captured
+    plan = connection.connection.driver_connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            table = detail.split()[1]
+            if table in Base.metadata.tables and table not in SCAN_ALLOWED:
+                scans.append(detail)
+    return scans
+
+
+@pytest.fixture
+def played(engine, session, make_player, run_cli):
+    """Statements captured while the hot commands run: {sql: parameters}."""
+    ash, ash_monsters = make_player("ash", 1, 3, 5, 12)
+    misty, misty_monsters = make_player("misty", 2, 4, species_id=2)
+    instrument(engine)
+    with profile_command("hot paths") as stats:
+        run_cli(["explore", "ash"], ["yes", "Sparky"])
+        run_cli(["level-up", "ash"], ["1"])
+        run_cli(["status", "ash"])
+        run_cli(["collection", "ash"])
+        run_cli(["collection", "ash", "--page", "2", "--limit", "2", "--sort", "level"])
+        after = encode_cursor(session.get(PlayerMonster, ash_monsters[1]), "level")
+        run_cli(["collection", "ash", "--after", after, "--limit", "2", "--sort", "level"])
+        run_cli(["collection", "ash", "--filter", "name=ash", "--sort", "nickname", "--desc", "--limit", "2"])
+        run_cli(["collection", "ash", "--filter", "type=Fire", "--filter", "level=1-5"])
+        for board in ("collection", "level", "wins", "xp"):
+            run_cli(["leaderboard", "--board", board, "--around", "ash"])
+        trade = propose_trade(session, ash, misty, ash_monsters[0], misty_monsters[0])
+        accept_trade(session, trade.id)
+        trade = propose_trade(session, ash, misty, ash_monsters[2], misty_monsters[1])
+        run_cli(["trades", "misty"])
+        run_cli(["trades", "misty", "--accept", str(trade.id)])
+        resolve_battles(session, [(ash_monsters[1], misty_monsters[1])], seed=1)
+        check_achievements(session, ash)
+        create_ai_opponent(session, "hard")
+        create_ai_opponent(session, "easy", team_size=10)
+    return stats.parameters
+
+
+def test_hot_statements_use_indexes(engine, played):
+    # INSERT ... VALUES has no plan to check; INSERT ... SELECT does
+    statements = [sql for sql in played
+                  if sql.lstrip().upper().startswith(EXPLAINABLE) or " SELECT " in sql.upper()]
+    assert statements
+    with engine.connect() as connection:
+        failures = {sql: scans for sql in statements if (scans := full_scans(connection, sql, played[sql]))}
+    assert not failures, "\n".join(f"{'; '.join(scans)}\n    {sql}" for sql, scans in failures.items())
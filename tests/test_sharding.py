@@ -0,0 +1,272 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import insert, select
+from lib.models import Player, PlayerMonster, Trade, XpGrant
+from lib.helpers import propose_trade, accept_trade, create_ai_opponent
+from lib.progression import grant_xp
+from lib.importer import import_species
+from lib.sharding import ShardSet, shard_urls, add_player
+from seed import seed_monster_species_data
+
+
+@pytest.fixture
+def shards(tmp_path):
+    """Two fresh shard files with species on both."""
+    shards = ShardSet(shard_urls(f"sqlite:///{tmp_path / 'game.db'}", 2))
+    shards.create_all()
+    with shards.session(0) as session:
+        import_species(session, seed_monster_species_data)
+        session.commit()
+    shards.replicate_reference_data()
+    yield shards
+    shards.dispose()
+
+
+def test_players_from_before_the_directory_stay_on_shard_zero(shards):
+    with shards.engines[0].begin() as connection:
+        connection.execute(insert(Player), [{'id': 1, 'username': "old_ash"}])
+
+    assert shards.locate("old_ash") == (1, 0)
+    assert shards.shard_for_player(1) == 0
+    with shards.session_for_player(1) as session:
+        assert session.get(Player, 1).username == "old_ash"
+
+
+def test_every_way_of_creating_a_player_takes_a_directory_id(shards):
+    with shards.session(0) as session:
+        direct = add_player(session, "direct")
+        session.commit()
+        direct_id = direct.id
+    created = [shards.create_player(f"player{i}") for i in range(4)]
+
+    ids = [direct_id] + [player_id for player_id, _ in created]
+    assert len(set(ids)) == len(ids)
+    assert shards.locate("direct") == (direct_id, 0)
+    for player_id, shard in created:
+        assert shard == player_id % 2
+        assert shards.shard_for_player(player_id) == shard
+        with shards.session_for_player(player_id) as session:
+            assert session.get(Player, player_id) is not None
+
+
+@pytest.fixture
+def sharded(shards, monkeypatch):
+    """Makes shards the configured ShardSet, as MONSTER_DB_SHARDS=2 would."""
+    import lib.config
+    monkeypatch.setitem(lib.config.settings, "shards", shards.count)
+    monkeypatch.setattr(lib.config, "_shards", shards)
+    return shards
+
+
+def catch(shards, player_id, nickname, level=1):
+    with shards.session_for_player(player_id) as session:
+        monster = PlayerMonster(player_id=player_id, species_id=1, level=level, nickname=nickname)
+        session.add(monster)
+        session.commit()
+        return monster.id
+
+
+def collection(shards, player_id):
+    with shards.session_for_player(player_id) as session:
+        return sorted(session.scalars(select(PlayerMonster.nickname).where(PlayerMonster.player_id == player_id)))
+
+
+def make_trade(shards, from_player, to_player, offered, requested):
+    with shards.session_for_player(from_player) as session:
+        return propose_trade(session, from_player, to_player, offered, requested).id
+
+
+def test_accept_trade_settles_across_shards(sharded):
+    (ash, ash_shard), (misty, misty_shard) = sharded.create_player("ash"), sharded.create_player("misty")
+    assert ash_shard != misty_shard
+    trade_id = make_trade(sharded, ash, misty, catch(sharded, ash, "Sparky"), catch(sharded, misty, "Bubbles"))
+
+    with sharded.session_for_player(ash) as session:
+        assert accept_trade(session, trade_id)
+        assert session.get(Trade, trade_id).status == "completed"
+    assert collection(sharded, ash) == ["Bubbles"]
+    assert collection(sharded, misty) == ["Sparky"]
+
+
+def test_trades_command_lists_and_accepts_offers_from_every_shard(sharded, run_cli, capsys):
+    (ash, _), (misty, _), (brock, _) = [sharded.create_player(name) for name in ("ash", "misty", "brock")]
+    wanted = [catch(sharded, misty, "Bubbles"), catch(sharded, misty, "Splash")]
+    from_ash = make_trade(sharded, ash, misty, catch(sharded, ash, "Sparky"), wanted[0])
+    from_brock = make_trade(sharded, brock, misty, catch(sharded, brock, "Rocky"), wanted[1])
+    ash_shard, brock_shard = sharded.shard_for_player(ash), sharded.shard_for_player(brock)
+
+    run_cli(["trades", "misty"])
+    listing = capsys.readouterr().out
+    assert f"#{ash_shard}:{from_ash} ash offers" in listing
+    assert f"#{brock_shard}:{from_brock} brock offers" in listing
+
+    run_cli(["trades", "misty", "--accept", f"{ash_shard}:{from_ash}", "--accept", f"{brock_shard}:{from_brock}"])
+    assert "2 trades completed, 0 could not be completed" in capsys.readouterr().out
+    assert collection(sharded, misty) == ["Rocky", "Sparky"]
+    assert collection(sharded, ash) == ["Bubbles"]
+    assert collection(sharded, brock) == ["Splash"]
+
+
+def test_progress_applies_xp_on_every_shard(sharded, run_cli, capsys):
+    (ash, _), (misty, _) = sharded.create_player("ash"), sharded.create_player("misty")
+    for player_id in (ash, misty):
+        monster_id = catch(sharded, player_id, "Sparky")
+        with sharded.session_for_player(player_id) as session:
+            grant_xp(session, [(monster_id, player_id, 250, 'battle')])
+            session.commit()
+
+    run_cli(["progress"])
+    assert "2 monsters and 2 players gained XP" in capsys.readouterr().out
+    for player_id in (ash, misty):
+        with sharded.session_for_player(player_id) as session:
+            assert session.get(Player, player_id).level == 3
+
+
+@pytest.mark.parametrize("argv", [["leaderboard"], ["tournament"]])
+def test_whole_database_commands_refuse_to_run_sharded(sharded, run_cli, capsys, argv):
+    run_cli(argv)
+    assert "unsharded database" in capsys.readouterr().out
+    with sharded.session(0) as session, pytest.raises(RuntimeError):
+        create_ai_opponent(session)
+
+
+def test_export_writes_one_snapshot_per_shard(sharded, run_cli, tmp_path):
+    pytest.importorskip("numpy")
+    from lib.export import read_npz_table
+    (ash, ash_shard), (misty, misty_shard) = sharded.create_player("ash"), sharded.create_player("misty")
+
+    run_cli(["export", str(tmp_path / "out"), "--format", "npz", "--table", "players"])
+    for player_id, shard in ((ash, ash_shard), (misty, misty_shard)):
+        assert list(read_npz_table(tmp_path / "out" / f"shard{shard}", "players")['id']) == [player_id]
+
+
+def monster_named(shards, player_id, nickname):
+    with shards.session_for_player(player_id) as session:
+        return session.scalars(select(PlayerMonster).where(
+            PlayerMonster.player_id == player_id, PlayerMonster.nickname == nickname
+        )).one()
+
+
+def test_traded_monster_takes_its_pending_xp_and_closes_other_offers(sharded, run_cli):
+    (ash, _), (misty, _), (brock, _) = [sharded.create_player(name) for name in ("ash", "misty", "brock")]
+    sparky, bubbles, rocky = catch(sharded, ash, "Sparky"), catch(sharded, misty, "Bubbles"), catch(sharded, brock, "Rocky")
+    with sharded.session_for_player(ash) as session:
+        grant_xp(session, [(sparky, ash, 150, 'battle')])
+        session.commit()
+    rival_offer = make_trade(sharded, brock, ash, rocky, sparky)
+    trade_id = make_trade(sharded, ash, misty, sparky, bubbles)
+
+    assert sharded.settle_trade(sharded.shard_for_player(ash), trade_id)
+    arrived = monster_named(sharded, misty, "Sparky")
+    assert (arrived.experience, arrived.level) == (150, 2)
+    with sharded.session_for_player(brock) as session:
+        assert session.get(Trade, rival_offer).status == "stale"
+
+    # The grant left behind still counts for ash, and only for ash
+    run_cli(["progress"])
+    with sharded.session_for_player(ash) as session:
+        assert session.get(Player, ash).experience == 150
+    with sharded.session_for_player(misty) as session:
+        assert session.get(Player, misty).experience == 0
+    assert monster_named(sharded, misty, "Sparky").experience == 150
+
+
+def test_recovery_finishes_a_committed_settlement(sharded, monkeypatch):
+    (ash, _), (misty, _) = sharded.create_player("ash"), sharded.create_player("misty")
+    trade_id = make_trade(sharded, ash, misty, catch(sharded, ash, "Sparky"), catch(sharded, misty, "Bubbles"))
+
+    def crash(settlement_id):
+        raise RuntimeError("crashed after the commit decision")
+    monkeypatch.setattr(sharded, "_apply", crash)
+    with pytest.raises(RuntimeError):
+        sharded.settle_trade(sharded.shard_for_player(ash), trade_id)
+    monkeypatch.undo()
+
+    assert collection(sharded, ash) == collection(sharded, misty) == []
+    assert sharded.recover_settlements() == {'applied': 1, 'aborted': 0}
+    assert collection(sharded, ash) == ["Bubbles"]
+    assert collection(sharded, misty) == ["Sparky"]
+    assert sharded.recover_settlements() == {'applied': 0, 'aborted': 0}
+
+
+def test_recovery_rolls_back_an_undecided_settlement(sharded, monkeypatch):
+    (ash, _), (misty, _) = sharded.create_player("ash"), sharded.create_player("misty")
+    sparky, bubbles = catch(sharded, ash, "Sparky"), catch(sharded, misty, "Bubbles")
+    with sharded.session_for_player(ash) as session:
+        grant_xp(session, [(sparky, ash, 40, 'battle')])
+        session.commit()
+    trade_shard = sharded.shard_for_player(ash)
+    trade_id = make_trade(sharded, ash, misty, sparky, bubbles)
+
+    prepare = sharded._prepare
+    def crash_on_second_side(shard, settlement_id, monster_id, owner_id):
+        if owner_id == misty:
+            raise RuntimeError("crashed while preparing")
+        return prepare(shard, settlement_id, monster_id, owner_id)
+    monkeypatch.setattr(sharded, "_prepare", crash_on_second_side)
+    with pytest.raises(RuntimeError):
+        sharded.settle_trade(trade_shard, trade_id)
+    monkeypatch.undo()
+
+    assert collection(sharded, ash) == []
+    assert sharded.recover_settlements() == {'applied': 0, 'aborted': 1}
+    assert monster_named(sharded, ash, "Sparky").id == sparky
+    assert collection(sharded, misty) == ["Bubbles"]
+    with sharded.session(trade_shard) as session:
+        assert session.get(Trade, trade_id).status == "pending"
+        assert session.scalars(select(XpGrant.player_monster_id)).all() == [sparky]
+    # Back where it was, so the trade can still go through
+    assert sharded.settle_trade(trade_shard, trade_id)
+    assert collection(sharded, misty) == ["Sparky"]
+
+
+def test_settlement_rolled_back_by_recovery_is_not_completed(sharded, monkeypatch):
+    (ash, _), (misty, _) = sharded.create_player("ash"), sharded.create_player("misty")
+    trade_shard = sharded.shard_for_player(ash)
+    trade_id = make_trade(sharded, ash, misty, catch(sharded, ash, "Sparky"), catch(sharded, misty, "Bubbles"))
+
+    prepare = sharded._prepare
+    def recovered_meanwhile(shard, settlement_id, monster_id, owner_id):
+        if owner_id == misty:
+            # Another process starts up and rolls the live settlement back
+            assert sharded.recover_settlements() == {'applied': 0, 'aborted': 1}
+        return prepare(shard, settlement_id, monster_id, owner_id)
+    monkeypatch.setattr(sharded, "_prepare", recovered_meanwhile)
+
+    assert not sharded.settle_trade(trade_shard, trade_id)
+    assert collection(sharded, ash) == ["Sparky"]
+    assert collection(sharded, misty) == ["Bubbles"]
+    with sharded.session(trade_shard) as session:
+        assert session.get(Trade, trade_id).status == "pending"
+
+
+def test_next_command_recovers_a_crashed_settlement(sharded, run_cli, capsys, monkeypatch):
+    import lib.config
+    from lib.sharding import trade_settlements
+    (ash, _), (misty, _) = sharded.create_player("ash"), sharded.create_player("misty")
+    trade_shard = sharded.shard_for_player(ash)
+    trade_id = make_trade(sharded, ash, misty, catch(sharded, ash, "Sparky"), catch(sharded, misty, "Bubbles"))
+
+    prepare = sharded._prepare
+    def crash_on_second_side(shard, settlement_id, monster_id, owner_id):
+        if owner_id == misty:
+            raise RuntimeError("crashed while preparing")
+        return prepare(shard, settlement_id, monster_id, owner_id)
+    monkeypatch.setattr(sharded, "_prepare", crash_on_second_side)
+    with pytest.raises(RuntimeError):
+        sharded.settle_trade(trade_shard, trade_id)
+    monkeypatch.setattr(sharded, "_prepare", prepare)
+    # A later process: settings point at the same files and nothing is built yet
+    monkeypatch.setitem(lib.config.settings, "url", sharded.urls[0])
+    monkeypatch.setattr(lib.config, "_shards", None)
+
+    # Too recent to tell from a settlement still in progress
+    run_cli(["trades", "misty"])
+    assert "No trade offers." in capsys.readouterr().out
+    with sharded.engines[0].begin() as connection:
+        connection.execute(trade_settlements.update().values(created_at=datetime(2000, 1, 1)))
+    monkeypatch.setattr(lib.config, "_shards", None)
+
+    run_cli(["trades", "misty"])
+    assert f"#{trade_shard}:{trade_id} ash offers" in capsys.readouterr().out
+    assert collection(sharded, ash) == ["Sparky"]
@@ -0,0 +1,52 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from lib.models import MonsterSpecies, MonsterType, MonsterRarity, PlayerMonster
+from lib.species import get_catalog
+
+NEW_SPECIES = dict(name="Glimmerfox", type=MonsterType.FIRE, base_hp=40, base_attack=12,
+                   base_defense=9, base_speed=14, rarity=MonsterRarity.RARE)
+
+
+def names(bind):
+    return {species.name for species in get_catalog(bind)}
+
+
+def test_uncommitted_species_stay_in_their_transaction(engine, session):
+    assert "Glimmerfox" not in names(session)
+    with Session(engine) as writer:
+        writer.add(MonsterSpecies(**NEW_SPECIES))
+        writer.flush()
+        assert "Glimmerfox" in names(writer)
+        session.rollback()
+        assert "Glimmerfox" not in names(session)
+
+        writer.rollback()
+        assert "Glimmerfox" not in names(writer)
+    session.rollback()
+    assert "Glimmerfox" not in names(session)
+
+
+def test_commit_from_another_connection_is_seen_by_the_next_transaction(engine, session):
+    before = get_catalog(session)
+    with engine.begin() as connection:
+        # Core insert, as another process or the importer would do: no ORM events fire
+        connection.execute(insert(MonsterSpecies), [NEW_SPECIES])
+    assert get_catalog(session) is before
+    session.rollback()
+    after = get_catalog(session)
+    assert after.version > before.version
+    assert "Glimmerfox" in {species.name for species in after}
+
+
+def test_editing_base_stats_restates_stored_monster_stats(session, make_player):
+    _, (monster_id,) = make_player("ash", 5)
+    assert session.get(PlayerMonster, monster_id).current_hp > 12
+
+    species = session.get(MonsterSpecies, 1)
+    species.base_hp, species.base_attack, species.base_speed = 2, species.base_attack + 7, 99
+    session.commit()
+
+    monster = session.get(PlayerMonster, monster_id)
+    assert (monster.max_hp, monster.current_hp) == (12, 12)
+    assert monster.attack == species.base_attack + 10
+    assert monster.speed == 99
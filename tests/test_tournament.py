@@ -0,0 +1,39 @@
+from sqlalchemy import select, func
+from lib.models import Battle, XpGrant
+from lib.tournament import draft_teams, run_tournament
+from lib.battle_log import replay_battle, ACTION_KNOCKOUT
+
+
+def test_bouts_between_one_players_monsters_credit_nobody(session, make_player):
+    ash, ash_monsters = make_player("ash", 3, 3, 3, 3, 3, 3)
+    misty, misty_monsters = make_player("misty", 3, 3)
+    teams = [ash_monsters[0:2], ash_monsters[2:4], ash_monsters[4:6], misty_monsters]
+
+    result = run_tournament(session, teams, seed=3, workers=1)
+    battles = session.scalars(select(Battle)).all()
+    assert len(battles) == result['battles'] == 6
+
+    own = [b for b in battles if b.player1_id == b.player2_id]
+    rival = [b for b in battles if b.player1_id != b.player2_id]
+    assert own and rival
+    assert all(b.winner_id is None for b in own)
+    assert all(b.winner_id in (ash, misty) for b in rival)
+    assert session.scalar(select(func.count(XpGrant.id))) == 2 * len(rival)
+
+
+def test_a_monster_is_drafted_into_one_team_at_most(session, make_player):
+    make_player("ash", 1, 1, 1, 1, 1)
+
+    teams = draft_teams(session, 8, "easy", team_size=3)
+    drafted = [monster_id for team in teams for monster_id in team]
+    assert drafted and len(drafted) == len(set(drafted))
+
+
+def test_tournament_bouts_can_be_replayed(session, make_player):
+    _, ash_monsters = make_player("ash", 4, 2)
+    _, misty_monsters = make_player("misty", 3, 5, species_id=2)
+
+    run_tournament(session, [ash_monsters, misty_monsters], seed=1, workers=1)
+    for battle_id in session.scalars(select(Battle.id)):
+        turns = list(replay_battle(session, battle_id))
+        assert turns and turns[-1].action == ACTION_KNOCKOUT
@@ -0,0 +1,115 @@
+from sqlalchemy import select
+from lib.models import Player, PlayerMonster, Trade
+from lib.helpers import propose_trade
+from lib.trading import settle_trade, accept_trades, settle_trade_queue, find_trade_cycles
+
+
+def owners(session, *monster_ids):
+    session.expire_all()
+    return [session.get(PlayerMonster, monster_id).player_id for monster_id in monster_ids]
+
+
+def status(session, trade_id):
+    session.expire_all()
+    return session.get(Trade, trade_id).status
+
+
+def test_settle_trade_swaps_monsters_once(session, make_player):
+    ash, (a,) = make_player("ash", 1)
+    misty, (m,) = make_player("misty", 1)
+    trade = propose_trade(session, ash, misty, a, m)
+
+    assert settle_trade(session, trade.id)
+    assert owners(session, a, m) == [misty, ash]
+    assert status(session, trade.id) == "completed"
+    # Already claimed: a second settlement finds nothing to do
+    assert not settle_trade(session, trade.id)
+    assert owners(session, a, m) == [misty, ash]
+
+
+def test_settle_trade_marks_stale_when_a_monster_moved(session, make_player):
+    ash, (a,) = make_player("ash", 1)
+    misty, (m,) = make_player("misty", 1)
+    brock, _ = make_player("brock")
+    trade = propose_trade(session, ash, misty, a, m)
+    session.get(PlayerMonster, m).player_id = brock
+    session.commit()
+
+    assert not settle_trade(session, trade.id)
+    assert status(session, trade.id) == "stale"
+    assert owners(session, a, m) == [ash, brock]
+
+
+def make_ring(session, make_player):
+    """Three players, each offering their monster for the next player's."""
+    players = [make_player(name, 1) for name in ("ash", "misty", "brock")]
+    trades = []
+    for i, (player_id, (monster_id,)) in enumerate(players):
+        next_id, (next_monster,) = players[(i + 1) % 3]
+        trades.append(propose_trade(session, player_id, next_id, monster_id, next_monster).id)
+    return players, trades
+
+
+def test_ring_settles_as_a_rotation(session, make_player):
+    players, trade_ids = make_ring(session, make_player)
+    pending = session.execute(select(Trade.id, Trade.offered_monster_id, Trade.requested_monster_id)).all()
+    assert [sorted(cycle) for cycle in find_trade_cycles(pending)] == [sorted(trade_ids)]
+
+    for (player_id, _), trade_id in zip(players[1:] + players[:1], trade_ids):
+        assert accept_trades(session, player_id, [trade_id]) == [trade_id]
+    session.commit()
+
+    assert settle_trade_queue(session) == {'completed': 3, 'rejected': 0}
+    # Everyone ends up with the monster they asked for
+    monsters = [monster_ids[0] for _, monster_ids in players]
+    assert owners(session, *monsters) == [players[2][0], players[0][0], players[1][0]]
+
+
+def test_ring_is_all_or_nothing(session, make_player):
+    players, trade_ids = make_ring(session, make_player)
+    for (player_id, _), trade_id in zip(players[1:] + players[:1], trade_ids):
+        accept_trades(session, player_id, [trade_id])
+    # The last monster changes hands before the ring settles
+    outsider, _ = make_player("gary")
+    monsters = [monster_ids[0] for _, monster_ids in players]
+    session.get(PlayerMonster, monsters[2]).player_id = outsider
+    session.commit()
+
+    assert settle_trade_queue(session) == {'completed': 0, 'rejected': 3}
+    assert owners(session, *monsters) == [players[0][0], players[1][0], outsider]
+    assert [status(session, trade_id) for trade_id in trade_ids] == ["stale"] * 3
+
+
+def test_queue_skips_trades_nobody_accepted(session, make_player):
+    ash, (a,) = make_player("ash", 1)
+    misty, (m,) = make_player("misty", 1)
+    declined = propose_trade(session, ash, misty, a, m)
+    # Only the recipient can accept
+    assert accept_trades(session, ash, [declined.id]) == []
+
+    assert settle_trade_queue(session) == {'completed': 0, 'rejected': 0}
+    assert status(session, declined.id) == "pending"
+    assert owners(session, a, m) == [ash, misty]
+
+
+def test_queue_keeps_the_callers_uncommitted_work(session, make_player):
+    ash, (a,) = make_player("ash", 1)
+    misty, (m,) = make_player("misty", 1)
+    trade = propose_trade(session, ash, misty, a, m)
+    accept_trades(session, misty, [trade.id])
+    session.add(Player(username="brock"))
+
+    assert settle_trade_queue(session) == {'completed': 1, 'rejected': 0}
+    assert session.scalar(select(Player.id).where(Player.username == "brock")) is not None
+
+
+def test_trades_command_accepts_and_settles(session, make_player, run_cli, capsys):
+    ash, (a,) = make_player("ash", 1)
+    misty, (m,) = make_player("misty", 1)
+    trade = propose_trade(session, ash, misty, a, m)
+
+    run_cli(["trades", "misty"])
+    assert f"#{trade.id} ash offers #{a} for your #{m}" in capsys.readouterr().out
+    run_cli(["trades", "misty", "--accept", str(trade.id)])
+    assert "1 trades completed" in capsys.readouterr().out
+    assert owners(session, a, m) == [misty, ash]
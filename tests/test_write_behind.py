@@ -0,0 +1,92 @@
+import fcntl
+import os
+import signal
+import subprocess
+import sys
+import threading
+from sqlalchemy import select, func
+from lib.models import PlayerMonster
+from lib.write_behind import WriteBehindQueue, open_locked_journal
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Commits one batch, queues more, then waits to be killed with them unflushed
+CHILD = """
+import sys
+sys.path.insert(0, {root!r})
+from lib.config import make_engine
+from lib.write_behind import WriteBehindQueue
+queue = WriteBehindQueue(make_engine({url!r}), max_batch=1000, max_delay=60)
+for i in range(3):
+    queue.catch({player_id}, 1, f"kept{{i}}")
+queue.flush()
+for i in range(4):
+    queue.catch({player_id}, 2, f"journaled{{i}}")
+queue.level_up({monster_id}, 2)
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def nicknames(session, player_id):
+    session.rollback()
+    return sorted(session.scalars(select(PlayerMonster.nickname).where(PlayerMonster.player_id == player_id)))
+
+
+def test_killed_process_is_replayed_once(engine, session, make_player):
+    player_id, (monster_id,) = make_player("ash", 1)
+    script = CHILD.format(root=ROOT, url=str(engine.url), player_id=player_id, monster_id=monster_id)
+    child = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    assert child.stdout.readline() == "ready\n"
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+    assert len(nicknames(session, player_id)) == 4
+
+    queue = WriteBehindQueue(engine)
+    queue.close()
+    assert queue.recovered == 5
+    assert nicknames(session, player_id) == sorted(
+        ["ash0"] + [f"kept{i}" for i in range(3)] + [f"journaled{i}" for i in range(4)]
+    )
+    assert session.get(PlayerMonster, monster_id).level == 3
+
+    again = WriteBehindQueue(engine)
+    again.close()
+    assert again.recovered == 0
+    assert session.scalar(select(func.count()).select_from(PlayerMonster)) == 8
+    assert not os.path.exists(queue.journal_path)
+
+
+def test_owner_keeps_a_journal_removed_before_it_locked(engine, monkeypatch):
+    path = f"{engine.url.database}-wb-999999.journal"
+    opened, recovered = threading.Event(), threading.Event()
+    real_flock = fcntl.flock
+
+    def flock(journal, operation):
+        # The owner has opened its journal but not locked it yet when recovery runs
+        if threading.current_thread().name == "owner" and not recovered.is_set():
+            opened.set()
+            recovered.wait()
+        return real_flock(journal, operation)
+
+    monkeypatch.setattr(fcntl, "flock", flock)
+    result = {}
+    owner = threading.Thread(target=lambda: result.update(journal=open_locked_journal(path)), name="owner")
+    owner.start()
+    opened.wait()
+    recovering = WriteBehindQueue(engine)
+    assert not os.path.exists(path)   # taken for a dead process's empty journal
+    recovered.set()
+    owner.join()
+    recovering.close()
+
+    journal = result['journal']
+    try:
+        assert os.path.exists(path)
+        assert os.fstat(journal.fileno()).st_ino == os.stat(path).st_ino
+        # Still locked by its owner, so a later recovery leaves it alone
+        WriteBehindQueue(engine).close()
+        assert os.path.exists(path)
+    finally:
+        journal.close()
+        os.remove(path)